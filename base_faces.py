@@ -0,0 +1,265 @@
+"""
+Base de faces empacotada: um arquivo por usuário em vez de uma pasta de PNGs.
+
+    base_faces/
+        indice.json     usuários, contagens, hashes e datas de cada foto
+        0000.u8         cabeçalho (64 bytes) + fotos (n, 300, 300, 3) uint8 BGR
+        0001.u8         (um fragmento por usuário, na ordem de cadastro)
+
+Cada foto ocupa um bloco de tamanho fixo, então acrescentar é escrever no fim
+do arquivo e ler a foto i é mapear o arquivo e indexar, sem decodificar nada.
+O `indice.json` é a fonte da verdade (gravado de forma atômica depois dos
+dados): listar usuários, contar fotos e obter os hashes usados pelo
+treinamento incremental é só ler esse arquivo.
+
+As fotos são referenciadas no manifesto de treino como "<arquivo .u8>#<i>"
+(`ler_imagem` entende tanto essas referências quanto caminhos de imagens).
+
+Conversão da estrutura de pastas:
+    python base_faces.py importar users --base base_faces
+    python base_faces.py exportar base_faces --destino users_exportados
+    python base_faces.py listar base_faces
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import struct
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from publicacao import salvar_json_atomico
+from qualidade import hash_perceptual
+
+PASTA_BASE = 'base_faces'
+ARQUIVO_INDICE = 'indice.json'
+EXTENSAO_FRAGMENTO = '.u8'
+SEPARADOR = '#'
+VERSAO_BASE = 1
+MAGICO = b'FACESU8\0'
+TAMANHO_CABECALHO = 64
+# Fotos guardadas no tamanho em que o cadastro as salva: (altura, largura, canais)
+FORMA_FOTO = (300, 300, 3)
+EXTENSOES_IMAGEM = ('.png', '.jpg', '.jpeg')
+
+
+def eh_base(pasta):
+    return os.path.isfile(os.path.join(pasta, ARQUIVO_INDICE))
+
+
+def ajustar_foto(imagem, forma=FORMA_FOTO):
+    """Converte uma foto (cinza ou BGR, qualquer tamanho) para o bloco fixo da base"""
+    if imagem.ndim == 2:
+        imagem = cv2.cvtColor(imagem, cv2.COLOR_GRAY2BGR)
+    if imagem.shape[:2] != forma[:2]:
+        imagem = cv2.resize(imagem, (forma[1], forma[0]), interpolation=cv2.INTER_AREA)
+    return np.ascontiguousarray(imagem, np.uint8)
+
+
+def _ler_forma(arquivo):
+    with open(arquivo, 'rb') as f:
+        cabecalho = f.read(TAMANHO_CABECALHO)
+    if cabecalho[:len(MAGICO)] != MAGICO:
+        raise ValueError(f"{arquivo} não é um fragmento da base de faces")
+    return struct.unpack('<3I', cabecalho[len(MAGICO):len(MAGICO) + 12])
+
+
+@lru_cache(maxsize=64)
+def _mapear(arquivo, tamanho_arquivo):
+    """Fotos do fragmento mapeadas em memória (o tamanho na chave renova o mapa após acréscimos)"""
+    forma = _ler_forma(arquivo)
+    n = (tamanho_arquivo - TAMANHO_CABECALHO) // int(np.prod(forma))
+    return np.memmap(arquivo, dtype=np.uint8, mode='r', offset=TAMANHO_CABECALHO, shape=(n,) + tuple(forma))
+
+
+def eh_referencia(caminho):
+    arquivo, _, indice = caminho.rpartition(SEPARADOR)
+    return arquivo.endswith(EXTENSAO_FRAGMENTO) and indice.isdigit()
+
+
+def ler_imagem(caminho):
+    """Foto BGR de um caminho de imagem ou de uma referência "<fragmento>#<i>" (None se não existir)"""
+    if not eh_referencia(caminho):
+        return cv2.imread(caminho, cv2.IMREAD_COLOR)
+    arquivo, _, indice = caminho.rpartition(SEPARADOR)
+    if not os.path.isfile(arquivo):
+        return None
+    fotos = _mapear(arquivo, os.path.getsize(arquivo))
+    indice = int(indice)
+    return np.array(fotos[indice]) if indice < fotos.shape[0] else None
+
+
+class BaseFaces:
+    """Base empacotada em `pasta`; com `criar=True` cria uma base vazia se ela não existir"""
+
+    def __init__(self, pasta=PASTA_BASE, criar=False):
+        self.pasta = pasta
+        if eh_base(pasta):
+            self.recarregar()
+        elif criar:
+            os.makedirs(pasta, exist_ok=True)
+            self.indice = {'versao': VERSAO_BASE, 'forma': list(FORMA_FOTO), 'usuarios': {}}
+            self._salvar_indice()
+        else:
+            raise FileNotFoundError(f"Base de faces não encontrada em {pasta}")
+
+    def recarregar(self):
+        with open(os.path.join(self.pasta, ARQUIVO_INDICE), 'r', encoding='utf-8') as f:
+            self.indice = json.load(f)
+        if self.indice['versao'] != VERSAO_BASE:
+            raise ValueError(f"Versão da base de faces não suportada: {self.indice['versao']}")
+
+    def _salvar_indice(self):
+        salvar_json_atomico(os.path.join(self.pasta, ARQUIVO_INDICE), self.indice, indent=1, ensure_ascii=False)
+
+    @property
+    def forma(self):
+        return tuple(self.indice['forma'])
+
+    def usuarios(self):
+        """[(usuario, quantidade de fotos)] em ordem alfabética"""
+        return sorted((nome, len(dados['fotos'])) for nome, dados in self.indice['usuarios'].items())
+
+    def total(self, usuario):
+        dados = self.indice['usuarios'].get(usuario)
+        return len(dados['fotos']) if dados else 0
+
+    def arquivo(self, usuario):
+        return os.path.join(self.pasta, self.indice['usuarios'][usuario]['arquivo'])
+
+    def referencia(self, usuario, i):
+        return f"{self.arquivo(usuario)}{SEPARADOR}{i}"
+
+    def escanear(self):
+        """{usuario: {referencia: hash}}, no formato de `manifesto_treino.escanear_usuarios`"""
+        return {usuario: {self.referencia(usuario, i): foto['hash']
+                          for i, foto in enumerate(self.indice['usuarios'][usuario]['fotos'])}
+                for usuario, _ in self.usuarios()}
+
+    def hashes_perceptuais(self, usuario):
+        dados = self.indice['usuarios'].get(usuario)
+        return [int(foto['dhash'], 16) for foto in dados['fotos']] if dados else []
+
+    def fotos(self, usuario):
+        """Fotos do usuário (n, altura, largura, 3), mapeadas do disco e somente leitura"""
+        n = self.total(usuario)
+        if n == 0:
+            return np.empty((0,) + self.forma, np.uint8)
+        return np.memmap(self.arquivo(usuario), dtype=np.uint8, mode='r', offset=TAMANHO_CABECALHO,
+                         shape=(n,) + self.forma)
+
+    def acrescentar(self, usuario, fotos, hashes_perceptuais=None):
+        """
+        Acrescenta fotos ao fim do fragmento do usuário (criando-o se preciso)
+        e só depois atualiza o índice. Retorna as referências das novas fotos.
+        """
+        fotos = [ajustar_foto(foto, self.forma) for foto in fotos]
+        if not fotos:
+            return []
+        dados = self.indice['usuarios'].get(usuario)
+        if dados is None:
+            dados = {'arquivo': f"{len(self.indice['usuarios']):04d}{EXTENSAO_FRAGMENTO}", 'fotos': []}
+        arquivo = os.path.join(self.pasta, dados['arquivo'])
+        inicio = len(dados['fotos'])
+        modo = 'r+b' if os.path.exists(arquivo) else 'w+b'
+        with open(arquivo, modo) as f:
+            if modo == 'w+b':
+                f.write(MAGICO + struct.pack('<3I', *self.forma).ljust(TAMANHO_CABECALHO - len(MAGICO), b'\0'))
+            # Sobras de uma escrita interrompida (além do que o índice conhece) são sobrescritas
+            f.seek(TAMANHO_CABECALHO + inicio * fotos[0].nbytes)
+            for foto in fotos:
+                f.write(foto.tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+        agora = datetime.datetime.now().isoformat(timespec='seconds')
+        hashes_perceptuais = hashes_perceptuais or [hash_perceptual(foto) for foto in fotos]
+        for foto, dhash in zip(fotos, hashes_perceptuais):
+            dados['fotos'].append({'hash': hashlib.sha1(foto.tobytes()).hexdigest(), 'dhash': f"{dhash:016x}",
+                                   'data': agora})
+        self.indice['usuarios'][usuario] = dados
+        self._salvar_indice()
+        return [self.referencia(usuario, i) for i in range(inicio, inicio + len(fotos))]
+
+
+def importar(origem, pasta_base=PASTA_BASE):
+    """Importa users/<nome>/*.png para a base; fotos já presentes (mesmo conteúdo) são ignoradas"""
+    base = BaseFaces(pasta_base, criar=True)
+    importadas = 0
+    for usuario in sorted(os.listdir(origem)):
+        caminho_usuario = os.path.join(origem, usuario)
+        if not os.path.isdir(caminho_usuario):
+            continue
+        conhecidos = {foto['hash'] for foto in base.indice['usuarios'].get(usuario, {}).get('fotos', [])}
+        novas = []
+        for arquivo in sorted(os.listdir(caminho_usuario)):
+            if not arquivo.lower().endswith(EXTENSOES_IMAGEM):
+                continue
+            imagem = cv2.imread(os.path.join(caminho_usuario, arquivo), cv2.IMREAD_COLOR)
+            if imagem is None:
+                print(f"Imagem ilegível ignorada: {arquivo}")
+                continue
+            foto = ajustar_foto(imagem, base.forma)
+            hash_foto = hashlib.sha1(foto.tobytes()).hexdigest()
+            if hash_foto not in conhecidos:
+                conhecidos.add(hash_foto)
+                novas.append(foto)
+        base.acrescentar(usuario, novas)
+        importadas += len(novas)
+        print(f"{usuario:<20} {len(novas):4d} fotos importadas ({base.total(usuario)} na base)")
+    return base, importadas
+
+
+def exportar(pasta_base, destino, sobrescrever=False):
+    """
+    Grava as fotos da base como users/<nome>/<nome>_001.png, ... (o layout do
+    cadastro). Recusa um `destino` que já tenha arquivos, a menos que
+    `sobrescrever` seja True: as fotos exportadas substituiriam as de mesmo nome.
+    """
+    if os.path.isdir(destino) and os.listdir(destino) and not sobrescrever:
+        raise FileExistsError(f"{destino} não está vazio; use --sobrescrever para exportar mesmo assim")
+    base = BaseFaces(pasta_base)
+    for usuario, total in base.usuarios():
+        pasta_usuario = os.path.join(destino, usuario)
+        os.makedirs(pasta_usuario, exist_ok=True)
+        for i, foto in enumerate(base.fotos(usuario)):
+            cv2.imwrite(os.path.join(pasta_usuario, f"{usuario}_{i + 1:03d}.png"), foto)
+        print(f"{usuario:<20} {total:4d} fotos exportadas para {pasta_usuario}")
+    return base
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Base de faces empacotada (um arquivo por usuário)")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    p = comandos.add_parser('importar', help="Importa a estrutura de pastas users/<nome>/ para a base")
+    p.add_argument('origem', nargs='?', default='users')
+    p.add_argument('--base', default=PASTA_BASE)
+    p = comandos.add_parser('exportar', help="Exporta a base para a estrutura de pastas")
+    p.add_argument('base', nargs='?', default=PASTA_BASE)
+    p.add_argument('--destino', default='users')
+    p.add_argument('--sobrescrever', action='store_true',
+                   help="Exporta mesmo se o destino já tiver arquivos (substitui as fotos de mesmo nome)")
+    p = comandos.add_parser('listar', help="Lista os usuários e a quantidade de fotos")
+    p.add_argument('base', nargs='?', default=PASTA_BASE)
+    args = parser.parse_args(argv)
+
+    if args.comando == 'importar':
+        base, importadas = importar(args.origem, args.base)
+        print(f"✓ {importadas} fotos importadas para {args.base}")
+    elif args.comando == 'exportar':
+        try:
+            exportar(args.base, args.destino, args.sobrescrever)
+        except FileExistsError as e:
+            parser.error(str(e))
+    else:
+        base = BaseFaces(args.base)
+        for usuario, total in base.usuarios():
+            print(f"{usuario:<20} {total:4d} fotos")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Benchmarks de desempenho (rodar da raiz do projeto: python -m benchmarks.<nome>)"""
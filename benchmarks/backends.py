@@ -0,0 +1,154 @@
+"""
+Escolha do backend de detecção (`deteccao.BACKENDS`) por benchmark.
+
+Roda cada backend disponível no `DetectorFaces`, com a mesma redução e os
+mesmos limites de face, sobre quadros gravados da porta, e mede o tempo de
+detecção por quadro e o recall contra a referência (`--referencia`, por
+padrão o Haar em resolução cheia, que é a detecção usada até aqui).
+Backends cujo modelo não está em `deteccao.PASTA_MODELOS` são pulados (a
+YuNet também aceita o caminho do .onnx em `--modelo-yunet`).
+
+O mais rápido com recall >= `--recall-minimo` é gravado em
+`deteccao.ARQUIVO_CONFIG`, junto com a redução e os tamanhos de face com que
+foi medido. O detector, o cadastro e o serviço passam a usá-lo quando
+`--backend` não é informado, e o detector e o serviço também usam esses
+parâmetros como padrão, para que o recall medido valha em produção.
+
+Exemplo:
+    python -m benchmarks.backends --fonte gravacao.mp4 --largura 320 --face-min 80
+    python -m benchmarks.backends --fonte sintetico:200 --sem-gravar
+    python -m benchmarks.backends --modelo-yunet ~/modelos/face_detection_yunet_2023mar.onnx
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+
+import cv2
+
+from benchmarks.deteccao import comparar, ler_quadros
+from deteccao import ARQUIVO_CONFIG, ARQUIVO_YUNET, BACKENDS, DetectorFaces, criar_backend
+from publicacao import salvar_json_atomico
+
+
+def medir(quadros, backend, parametros):
+    """
+    (caixas de cada quadro, ms por quadro). A primeira passada aquece o
+    backend e guarda as caixas; só a segunda é cronometrada.
+    """
+    detector = DetectorFaces(backend=backend, **parametros)
+    caixas = [detector.detectar(gray) for gray in quadros]
+    inicio = time.perf_counter()
+    for gray in quadros:
+        detector.detectar(gray)
+    return caixas, 1000.0 * (time.perf_counter() - inicio) / max(1, len(quadros))
+
+
+def disponiveis(nomes, opcoes=None):
+    """
+    Backends que puderam ser criados (nome -> instância), com as opções de
+    `opcoes` (nome -> kwargs de `criar_backend`); avisa sobre os que faltam
+    """
+    backends = {}
+    for nome in nomes:
+        try:
+            backends[nome] = criar_backend(nome, **(opcoes or {}).get(nome, {}))
+        except (OSError, RuntimeError, cv2.error) as e:
+            print(f"⚠️ Backend {nome} pulado, modelo indisponível: {e}")
+    return backends
+
+
+def escolher(resultados, recall_minimo):
+    """Nome do backend mais rápido com recall aceitável, ou None"""
+    aceitos = [(r['ms_por_quadro'], nome) for nome, r in resultados.items() if r['recall'] >= recall_minimo]
+    return min(aceitos)[1] if aceitos else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara os backends de detecção e grava o mais rápido aceitável")
+    parser.add_argument('--fonte', default='sintetico:200',
+                        help="Vídeo, pasta de imagens ou 'sintetico[:N]' (padrão: sintetico:200)")
+    parser.add_argument('--max-quadros', type=int, default=None)
+    parser.add_argument('--backends', default=','.join(BACKENDS),
+                        help=f"Backends comparados, separados por vírgula (padrão: {','.join(BACKENDS)})")
+    parser.add_argument('--referencia', choices=list(BACKENDS), default='haar',
+                        help="Backend que, em resolução cheia, define as faces esperadas")
+    parser.add_argument('--largura', type=int, default=320, help="Largura do quadro reduzido (0 = resolução cheia)")
+    parser.add_argument('--face-min', type=int, default=80, help="Menor lado de face esperado (pixels)")
+    parser.add_argument('--face-max', type=int, default=None, help="Maior lado de face esperado (pixels)")
+    parser.add_argument('--iou', type=float, default=0.3, help="IoU mínimo para contar uma face como encontrada")
+    parser.add_argument('--recall-minimo', type=float, default=0.95,
+                        help="Recall mínimo para um backend ser escolhido")
+    parser.add_argument('--modelo-yunet', default=None,
+                        help=f"Caminho do modelo da YuNet (padrão: {ARQUIVO_YUNET} em modelos/)")
+    parser.add_argument('--config', default=ARQUIVO_CONFIG, help="Onde gravar o backend escolhido")
+    parser.add_argument('--sem-gravar', action='store_true', help="Só mede, sem gravar a escolha")
+    parser.add_argument('--saida', default=None, help="Grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    quadros = ler_quadros(args.fonte, args.max_quadros)
+    if not quadros:
+        print("Nenhum quadro lido da fonte")
+        return None
+    print(f"{len(quadros)} quadros {quadros[0].shape[1]}x{quadros[0].shape[0]} de {args.fonte}")
+
+    nomes = [nome.strip() for nome in args.backends.split(',') if nome.strip()]
+    opcoes = {'yunet': {'modelo': args.modelo_yunet}} if args.modelo_yunet else {}
+    backends = disponiveis(dict.fromkeys(nomes + [args.referencia]), opcoes)
+    if args.referencia not in backends:
+        print(f"❌ Backend de referência {args.referencia} indisponível")
+        return None
+    referencia, _ = medir(quadros, backends[args.referencia], {})
+    total = sum(len(c) for c in referencia)
+    if not total:
+        print(f"⚠️ A referência ({args.referencia}) não encontrou faces; o recall não diz nada nesta fonte")
+
+    parametros = {chave: valor for chave, valor in (('largura_deteccao', args.largura or None),
+                                                    ('face_min', args.face_min), ('face_max', args.face_max))
+                  if valor is not None}
+    resultados = {}
+    for nome in nomes:
+        if nome not in backends:
+            continue
+        caixas, ms_quadro = medir(quadros, backends[nome], parametros)
+        encontradas, extras = comparar(referencia, caixas, args.iou)
+        resultados[nome] = {
+            'ms_por_quadro': round(ms_quadro, 3),
+            'recall': round(encontradas / total, 4) if total else 1.0,
+            'faces_referencia': total,
+            'deteccoes_extras': extras,
+        }
+
+    escolhido = escolher(resultados, args.recall_minimo)
+    print(f"\n{'backend':<8} {'ms/quadro':>10} {'recall':>7} {'extras':>7}")
+    for nome, r in resultados.items():
+        marca = '  ← escolhido' if nome == escolhido else ''
+        print(f"{nome:<8} {r['ms_por_quadro']:>10.2f} {r['recall']:>7.3f} {r['deteccoes_extras']:>7}{marca}")
+
+    if escolhido is None:
+        print(f"\n❌ Nenhum backend atingiu recall {args.recall_minimo}; configuração mantida")
+    elif args.sem_gravar:
+        print(f"\n✓ Mais rápido aceitável: {escolhido} (não gravado)")
+    else:
+        salvar_json_atomico(args.config, {
+            'backend': escolhido,
+            'opcoes': opcoes.get(escolhido, {}),
+            'parametros': parametros,
+            'ms_por_quadro': resultados[escolhido]['ms_por_quadro'],
+            'recall': resultados[escolhido]['recall'],
+            'referencia': args.referencia,
+            'fonte': str(args.fonte),
+            'quadros': len(quadros),
+            'data': datetime.datetime.now().isoformat(timespec='seconds'),
+        }, indent=2)
+        print(f"\n✅ Backend {escolhido} gravado em {args.config}")
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump({'escolhido': escolhido, 'backends': resultados}, f, indent=2)
+    return resultados
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
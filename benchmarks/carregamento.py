@@ -0,0 +1,110 @@
+"""
+Benchmark do tempo de carregamento do modelo: .yml do OpenCV contra o
+formato binário mapeado em memória (float32 e float16).
+
+Sem `--modelo`, gera uma galeria sintética com `--amostras` histogramas
+(o tamanho do modelo é o que pesa, não o conteúdo). Para cada formato mede o
+tamanho do arquivo, o tempo até o modelo estar pronto e o tempo da primeira
+consulta (quando as páginas do arquivo mapeado são lidas de fato), e confere
+se as decisões são as mesmas do modelo .yml.
+
+Exemplo:
+    python -m benchmarks.carregamento --amostras 5000
+    python -m benchmarks.carregamento --modelo classificador.yml
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.lbph import faces_base, gerar_consultas
+from lbph import MotorLBPH, salvar_modelo_yml
+from modelo_binario import converter_yml
+
+
+def gerar_modelo(caminho, amostras, identidades, semente=0):
+    """Modelo .yml sintético: histogramas esparsos normalizados como os do LBPH"""
+    rng = np.random.default_rng(semente)
+    motor = MotorLBPH()
+    histogramas = np.zeros((amostras, motor.n_bins), np.float32)
+    celulas = motor.grid_x * motor.grid_y
+    padroes = 2 ** motor.vizinhos
+    for c in range(celulas):
+        # Poucos padrões dominantes por célula, como nas faces reais
+        bins = rng.choice(padroes, 40, replace=False)
+        pesos = rng.dirichlet(np.ones(40), amostras).astype(np.float32)
+        histogramas[:, c * padroes + bins] = pesos
+    rotulos = np.arange(amostras, dtype=np.int32) % identidades
+    salvar_modelo_yml(caminho, histogramas, rotulos, limiar=115.0)
+
+
+def cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+def carregar_opencv(caminho):
+    reconhecedor = cv2.face.LBPHFaceRecognizer_create()
+    reconhecedor.read(caminho)
+    return reconhecedor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carregamento do modelo (.yml x binário)")
+    parser.add_argument('--modelo', default=None, help="Modelo .yml existente (padrão: galeria sintética)")
+    parser.add_argument('--amostras', type=int, default=3000)
+    parser.add_argument('--identidades', type=int, default=50)
+    parser.add_argument('--consultas', type=int, default=10)
+    parser.add_argument('--saida', default=None, help="Grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        modelo = args.modelo
+        if modelo is None:
+            modelo = os.path.join(pasta, 'sintetico.yml')
+            print(f"Gerando modelo sintético com {args.amostras} amostras...")
+            gerar_modelo(modelo, args.amostras, args.identidades)
+
+        binarios = {tipo: converter_yml(modelo, os.path.join(pasta, f'modelo_{tipo}.lbph'), tipo=tipo)
+                    for tipo in ('float32', 'float16')}
+        consultas = gerar_consultas(faces_base(), args.consultas, np.random.default_rng(1))
+
+        carregadores = [
+            ('opencv_yml', modelo, carregar_opencv),
+            ('numpy_yml', modelo, MotorLBPH.carregar_yml),
+            ('binario_float32', binarios['float32'], MotorLBPH.carregar_binario),
+            ('binario_float16', binarios['float16'], MotorLBPH.carregar_binario),
+        ]
+        resultados = {}
+        referencia = None
+        for nome, caminho, carregar in carregadores:
+            tempo_carga, reconhecedor = cronometrar(lambda: carregar(caminho))
+            tempo_primeira, _ = cronometrar(lambda: reconhecedor.predict(consultas[0]))
+            decisoes = [reconhecedor.predict(c)[0] for c in consultas]
+            if referencia is None:
+                referencia = decisoes
+            resultados[nome] = {
+                'tamanho_mb': os.path.getsize(caminho) / 1e6,
+                'carregamento_ms': 1000.0 * tempo_carga,
+                'primeira_consulta_ms': 1000.0 * tempo_primeira,
+                'decisoes_iguais': f"{sum(a == b for a, b in zip(decisoes, referencia))}/{len(consultas)}",
+            }
+
+    print(f"\n{'formato':<17} {'MB':>8} {'carga ms':>10} {'1ª consulta ms':>15} {'decisões':>9}")
+    for nome, r in resultados.items():
+        print(f"{nome:<17} {r['tamanho_mb']:>8.1f} {r['carregamento_ms']:>10.1f} "
+              f"{r['primeira_consulta_ms']:>15.1f} {r['decisoes_iguais']:>9}")
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(resultados, f, indent=2)
+    return resultados
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
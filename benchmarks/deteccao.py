@@ -0,0 +1,129 @@
+"""
+Benchmark do front-end de detecção (`deteccao.DetectorFaces`) contra a
+configuração atual do detector (quadro inteiro em resolução cheia,
+minSize 30).
+
+As caixas da configuração atual servem de referência: para cada
+configuração reporta o recall (faces da referência encontradas com IoU
+>= `--iou`), as detecções a mais e o tempo médio de detecção por quadro.
+
+Exemplo:
+    python -m benchmarks.deteccao --fonte gravacao.mp4 --largura 320 --face-min 80
+    python -m benchmarks.deteccao --roi 160,0,320,480
+"""
+import argparse
+import json
+import sys
+import time
+
+import cv2
+
+from deteccao import DetectorFaces, carregar_cascade, ler_roi
+from fontes import abrir_fonte
+from rastreamento import calcular_iou
+
+
+def ler_quadros(fonte, max_quadros=None):
+    """Quadros em escala de cinza (lidos antes, para não medir a captura)"""
+    cap = abrir_fonte(fonte)
+    if not cap.isOpened():
+        raise RuntimeError(f"Não foi possível abrir a fonte de vídeo: {fonte}")
+    quadros = []
+    while max_quadros is None or len(quadros) < max_quadros:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        quadros.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    cap.release()
+    return quadros
+
+
+def configuracoes(largura, face_min, face_max, roi):
+    """Configurações comparadas; 'atual' é a detecção usada hoje pelo detector"""
+    configs = {
+        'atual': {},
+        'reduzido': {'largura_deteccao': largura},
+        'reduzido_face_min': {'largura_deteccao': largura, 'face_min': face_min, 'face_max': face_max},
+        'janelas': {'largura_deteccao': largura, 'face_min': face_min, 'face_max': face_max, 'janelas': True},
+    }
+    if roi is not None:
+        configs['roi'] = {'largura_deteccao': largura, 'face_min': face_min, 'face_max': face_max, 'roi': roi}
+    return configs
+
+
+def executar(quadros, cascade, parametros):
+    """Retorna (caixas de cada quadro, ms por quadro, varreduras completas)"""
+    detector = DetectorFaces(cascade, **parametros)
+    caixas = []
+    inicio = time.perf_counter()
+    for gray in quadros:
+        caixas.append(detector.detectar(gray))
+    duracao = time.perf_counter() - inicio
+    return caixas, 1000.0 * duracao / max(1, len(quadros)), detector.varreduras
+
+
+def comparar(referencia, caixas, iou_minimo):
+    """(faces da referência encontradas, detecções sem correspondência)"""
+    encontradas = extras = 0
+    for esperadas, obtidas in zip(referencia, caixas):
+        usadas = set()
+        for caixa in esperadas:
+            candidatos = [(calcular_iou(caixa, obtida), j) for j, obtida in enumerate(obtidas) if j not in usadas]
+            melhor = max(candidatos, default=(0.0, None))
+            if melhor[0] >= iou_minimo:
+                encontradas += 1
+                usadas.add(melhor[1])
+        extras += len(obtidas) - len(usadas)
+    return encontradas, extras
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de recall e ms/quadro da detecção Haar")
+    parser.add_argument('--fonte', default='sintetico:200',
+                        help="Vídeo, pasta de imagens ou 'sintetico[:N]' (padrão: sintetico:200)")
+    parser.add_argument('--max-quadros', type=int, default=None)
+    parser.add_argument('--largura', type=int, default=320, help="Largura do quadro reduzido")
+    parser.add_argument('--face-min', type=int, default=80, help="Menor lado de face esperado (pixels)")
+    parser.add_argument('--face-max', type=int, default=None, help="Maior lado de face esperado (pixels)")
+    parser.add_argument('--roi', type=ler_roi, default=None, help="Região de busca 'x,y,largura,altura'")
+    parser.add_argument('--iou', type=float, default=0.3, help="IoU mínimo para contar uma face como encontrada")
+    parser.add_argument('--saida', default=None, help="Grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    quadros = ler_quadros(args.fonte, args.max_quadros)
+    if not quadros:
+        print("Nenhum quadro lido da fonte")
+        return None
+    cascade = carregar_cascade()
+    print(f"{len(quadros)} quadros {quadros[0].shape[1]}x{quadros[0].shape[0]} de {args.fonte}")
+
+    resultados = {}
+    referencia = None
+    for nome, parametros in configuracoes(args.largura, args.face_min, args.face_max, args.roi).items():
+        caixas, ms_quadro, varreduras = executar(quadros, cascade, parametros)
+        if referencia is None:
+            referencia = caixas
+        encontradas, extras = comparar(referencia, caixas, args.iou)
+        total = sum(len(c) for c in referencia)
+        resultados[nome] = {
+            'parametros': {k: v for k, v in parametros.items() if v is not None},
+            'ms_por_quadro': round(ms_quadro, 3),
+            'recall': round(encontradas / total, 4) if total else 1.0,
+            'faces_referencia': total,
+            'deteccoes_extras': extras,
+            'varreduras_completas': varreduras,
+        }
+
+    base = resultados['atual']['ms_por_quadro'] or 1.0
+    print(f"\n{'configuração':<19} {'ms/quadro':>10} {'ganho':>7} {'recall':>7} {'extras':>7} {'varreduras':>11}")
+    for nome, r in resultados.items():
+        print(f"{nome:<19} {r['ms_por_quadro']:>10.2f} {base / (r['ms_por_quadro'] or base):>6.1f}x "
+              f"{r['recall']:>7.3f} {r['deteccoes_extras']:>7} {r['varreduras_completas']:>11}")
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(resultados, f, indent=2)
+    return resultados
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,130 @@
+"""
+Benchmark do armazém de eventos de acesso contra a busca nos logs de texto.
+
+Gera `--eventos` acessos espalhados por um ano (`--pessoas` pessoas, ~20%
+negados), grava-os no banco em lotes do tamanho dos do `RegistradorAcessos`
+e nos logs de texto diários, e mede as perguntas típicas de auditoria nos
+dois formatos, conferindo que as respostas batem:
+
+- todos os acessos negados do último trimestre;
+- todas as entradas de uma pessoa em um mês;
+- eventos por mês (agregação do ano inteiro).
+
+Exemplo:
+    python -m benchmarks.eventos --eventos 500000
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from eventos import ArmazemEventos, evento_para_linha, ler_linha_log
+from registro_acessos import EventoAgrupado
+
+INICIO_ANO = datetime.datetime(2025, 1, 1)
+
+
+def gerar_eventos(quantidade, pessoas, rng):
+    """EventoAgrupado em ordem cronológica ao longo de 2025"""
+    segundos = np.sort(rng.integers(0, 365 * 86400, quantidade))
+    ids = rng.integers(0, pessoas, quantidade)
+    negados = rng.random(quantidade) < 0.2
+    confiancas = rng.uniform(30.0, 120.0, quantidade)
+    return [EventoAgrupado(f"Pessoa{i:03d}" if not negado else "Desconhecido", not negado,
+                           INICIO_ANO + datetime.timedelta(seconds=int(s)), float(c))
+            for s, i, negado, c in zip(segundos, ids, negados, confiancas)]
+
+
+def escrever_texto(eventos, pasta):
+    arquivos = {}
+    for evento in eventos:
+        dia = evento.primeiro.strftime('%Y-%m-%d')
+        arquivos.setdefault(dia, []).append(evento.formatar())
+    for dia, linhas in arquivos.items():
+        with open(os.path.join(pasta, f'log_{dia}.txt'), 'w', encoding='utf-8') as f:
+            f.writelines(linhas)
+
+
+def buscar_texto(pasta, filtro):
+    """O que hoje se faz com grep: ler todos os logs e filtrar linha a linha"""
+    encontrados = []
+    for arquivo in sorted(os.listdir(pasta)):
+        if arquivo.startswith('log_'):
+            with open(os.path.join(pasta, arquivo), 'r', encoding='utf-8') as f:
+                encontrados.extend(linha for linha in map(ler_linha_log, f) if linha is not None and filtro(linha))
+    return encontrados
+
+
+def medir(funcao, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return resultado, 1000.0 * melhor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consultas no armazém de eventos x logs de texto")
+    parser.add_argument('--eventos', type=int, default=200000, help="Eventos gerados ao longo de um ano")
+    parser.add_argument('--pessoas', type=int, default=50)
+    parser.add_argument('--lote', type=int, default=50, help="Eventos por transação (como um flush do registrador)")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', default=None, help="Grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    eventos = gerar_eventos(args.eventos, args.pessoas, np.random.default_rng(args.semente))
+    linhas = [evento_para_linha(evento) for evento in eventos]
+    relatorio = {'eventos': args.eventos}
+
+    with tempfile.TemporaryDirectory() as pasta:
+        escrever_texto(eventos, pasta)
+        with ArmazemEventos(os.path.join(pasta, 'eventos.db')) as armazem:
+            inicio = time.perf_counter()
+            for i in range(0, len(linhas), args.lote):
+                armazem.inserir(linhas[i:i + args.lote])
+            duracao = time.perf_counter() - inicio
+            relatorio['insercao_ms_por_lote'] = round(1000.0 * duracao * args.lote / len(linhas), 3)
+            relatorio['insercao_us_por_evento'] = round(1e6 * duracao / len(linhas), 2)
+            print(f"Inserção: {relatorio['insercao_ms_por_lote']:.3f} ms por lote de {args.lote} "
+                  f"({relatorio['insercao_us_por_evento']:.1f} µs/evento, na thread do registrador)")
+
+            consultas = {
+                'negados_trimestre': (
+                    lambda: armazem.consultar(de='2025-10-01', ate='2025-12-31', permitido=False),
+                    lambda l: l[3] == 0 and '2025-10-01' <= l[0][:10] <= '2025-12-31'),
+                'pessoa_no_mes': (
+                    lambda: armazem.consultar(de='2025-03-01', ate='2025-03-31', pessoa='Pessoa007'),
+                    lambda l: l[2] == 'Pessoa007' and l[0].startswith('2025-03')),
+                'resumo_por_mes': (lambda: armazem.resumo(por='mes'), None),
+            }
+            relatorio['consultas'] = {}
+            iguais = True
+            print(f"\n{'consulta':<20} {'resultados':>10} {'banco (ms)':>11} {'texto (ms)':>11}")
+            for nome, (consulta, filtro) in consultas.items():
+                resultado, ms_banco = medir(consulta)
+                if filtro is not None:
+                    texto, ms_texto = medir(lambda: buscar_texto(pasta, filtro), repeticoes=1)
+                    iguais &= len(texto) == len(resultado)
+                else:
+                    texto, ms_texto = medir(lambda: buscar_texto(pasta, lambda l: True), repeticoes=1)
+                    iguais &= len(texto) == sum(eventos_mes for _, eventos_mes, _ in resultado)
+                relatorio['consultas'][nome] = {'resultados': len(resultado), 'banco_ms': round(ms_banco, 3),
+                                                'texto_ms': round(ms_texto, 1)}
+                print(f"{nome:<20} {len(resultado):>10} {ms_banco:>11.2f} {ms_texto:>11.1f}")
+
+    relatorio['respostas_iguais'] = iguais
+    print(f"\nRespostas iguais às da busca nos logs de texto: {'sim' if iguais else 'NÃO'}")
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    return iguais
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,105 @@
+"""
+Benchmark do índice de identidades em dois níveis (`indice.IndiceIdentidades`).
+
+Gera uma população sintética (um rosto desenhado por identidade, com várias
+amostras ruidosas cada), e compara a busca exata do `MotorLBPH` com a busca
+grossa por protótipos + refinamento exato: latência por consulta e recall@k
+(fração das consultas cuja identidade mais próxima pela busca exata aparece
+entre as k primeiras do índice).
+
+Exemplo:
+    python -m benchmarks.indice --identidades 100 500 --candidatos 5 20
+"""
+import argparse
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from fontes import desenhar_rosto_sintetico
+from indice import IndiceIdentidades
+from lbph import MotorLBPH
+
+
+def variacao(face, rng):
+    """Amostra ruidosa de uma face: deslocamento, brilho e ruído"""
+    dx, dy = rng.integers(-3, 4, 2)
+    matriz = np.float32([[1, 0, dx], [0, 1, dy]])
+    face = cv2.warpAffine(face, matriz, face.shape[::-1], borderMode=cv2.BORDER_REFLECT)
+    face = face.astype(np.float32) * rng.uniform(0.9, 1.1) + rng.normal(0, 2, face.shape)
+    return np.clip(face, 0, 255).astype(np.uint8)
+
+
+def gerar_populacao(identidades, amostras, consultas, tamanho, rng):
+    """Histogramas da galeria e das consultas de uma população sintética"""
+    motor = MotorLBPH()
+    galeria, rotulos, faces_consulta, rotulos_consulta = [], [], [], []
+    for pessoa in range(identidades):
+        base = cv2.cvtColor(desenhar_rosto_sintetico(tamanho, semente=pessoa), cv2.COLOR_BGR2GRAY)
+        lote = np.stack([variacao(base, rng) for _ in range(amostras)])
+        galeria.append(motor.histogramas(lote))
+        rotulos.extend([pessoa] * amostras)
+        if pessoa < consultas:
+            faces_consulta.append(variacao(base, rng))
+            rotulos_consulta.append(pessoa)
+    motor.definir_galeria(np.concatenate(galeria), rotulos)
+    return motor, motor.histogramas(np.stack(faces_consulta)), np.array(rotulos_consulta)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recall@k x latência do índice de identidades")
+    parser.add_argument('--identidades', type=int, nargs='+', default=[100, 300])
+    parser.add_argument('--amostras', type=int, default=10, help="Amostras por identidade na galeria")
+    parser.add_argument('--consultas', type=int, default=50)
+    parser.add_argument('--candidatos', type=int, nargs='+', default=[5, 10, 20])
+    parser.add_argument('--prototipos', type=int, nargs='+', default=[1, 3])
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 5])
+    parser.add_argument('--tamanho-face', type=int, default=100,
+                        help="Lado das faces sintéticas (menor = galerias grandes cabem na memória)")
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.semente)
+    relatorio = {}
+    for identidades in args.identidades:
+        motor, consultas, _ = gerar_populacao(identidades, args.amostras, min(args.consultas, identidades),
+                                              args.tamanho_face, rng)
+        inicio = time.perf_counter()
+        exatos = motor.identidades[motor._por_identidade(motor.distancias(consultas)).argmin(axis=1)]
+        tempo_exato = (time.perf_counter() - inicio) / len(consultas)
+        resultado = {'amostras_galeria': int(motor.galeria.shape[0]),
+                     'exato_ms_por_consulta': round(1000.0 * tempo_exato, 3), 'indice': []}
+
+        for prototipos in args.prototipos:
+            inicio = time.perf_counter()
+            indice = IndiceIdentidades(motor, prototipos).construir(semente=args.semente)
+            tempo_construcao = time.perf_counter() - inicio
+            for candidatos in args.candidatos:
+                indice.candidatos = candidatos
+                inicio = time.perf_counter()
+                rotulos, _ = indice.buscar(consultas, k=max(args.k))
+                tempo = (time.perf_counter() - inicio) / len(consultas)
+                linha = {
+                    'prototipos_por_identidade': prototipos,
+                    'candidatos': candidatos,
+                    'construcao_s': round(tempo_construcao, 3),
+                    'ms_por_consulta': round(1000.0 * tempo, 3),
+                    'aceleracao': round(tempo_exato / tempo, 2) if tempo > 0 else None,
+                }
+                for k in args.k:
+                    acertos = np.any(rotulos[:, :k] == exatos[:, None], axis=1)
+                    linha[f'recall@{k}'] = round(float(acertos.mean()), 4)
+                resultado['indice'].append(linha)
+                print(f"{identidades:5d} identidades | protótipos {prototipos} | candidatos {candidatos:3d} | "
+                      f"{linha['ms_por_consulta']:8.2f} ms (exato {resultado['exato_ms_por_consulta']:.2f}) | "
+                      + " ".join(f"recall@{k}={linha[f'recall@{k}']:.3f}" for k in args.k), file=sys.stderr)
+        relatorio[identidades] = resultado
+
+    print(json.dumps(relatorio, indent=2))
+    return relatorio
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark do motor LBPH em NumPy contra o `cv2.face.LBPHFaceRecognizer`.
+
+Monta galerias de tamanho crescente a partir das fotos de users/ (com
+variações de ruído e brilho), mede o tempo de `predict` de cada
+implementação e confere se as decisões são as mesmas. Com `--modelo`, também
+confere as decisões sobre um modelo já treinado (ex.: classificador.yml).
+
+Exemplo:
+    python -m benchmarks.lbph --tamanhos 100 500 2000 --modelo classificador.yml
+"""
+import argparse
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from detector import classificar_confianca
+from fontes import carregar_rostos, desenhar_rosto_sintetico
+from lbph import MotorLBPH
+from preprocessamento import preprocessar
+
+
+def faces_base(limite=None):
+    """Fotos cadastradas (ou um rosto sintético) em escala de cinza 250x250"""
+    rostos = carregar_rostos(limite=limite) or [desenhar_rosto_sintetico(250, s) for s in range(4)]
+    faces = []
+    for rosto in rostos:
+        face = cv2.resize(cv2.cvtColor(rosto, cv2.COLOR_BGR2GRAY), (250, 250))
+        faces.append(cv2.normalize(cv2.equalizeHist(face), None, 0, 255, cv2.NORM_MINMAX))
+    return faces
+
+
+def gerar_galeria(base, tamanho, identidades, rng):
+    """Amostras com ruído e brilho variados, rotuladas em `identidades` grupos"""
+    faces, rotulos = [], []
+    for i in range(tamanho):
+        face = base[i % len(base)].astype(np.float32) * rng.uniform(0.8, 1.2)
+        face += rng.normal(0, 6, face.shape)
+        faces.append(np.clip(face, 0, 255).astype(np.uint8))
+        rotulos.append((i % len(base)) % identidades)
+    return faces, np.array(rotulos, np.int32)
+
+
+def gerar_consultas(base, quantidade, rng):
+    """Consultas como o detector as vê: recortes de tamanho variado com o pré-processamento do detector"""
+    consultas = []
+    for i in range(quantidade):
+        lado = int(rng.integers(120, 300))
+        face = cv2.resize(base[i % len(base)], (lado, lado))
+        consultas.append(preprocessar(face))
+    return consultas
+
+
+def cronometrar(funcao, repeticoes=1):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / repeticoes, resultado
+
+
+def comparar(reconhecedor, motor, consultas):
+    """Tempo por consulta das duas implementações e concordância das decisões"""
+    t_cv, previstos_cv = cronometrar(lambda: [reconhecedor.predict(c) for c in consultas])
+    t_np, previstos_np = cronometrar(lambda: [motor.predict(c) for c in consultas])
+    t_lote, _ = cronometrar(lambda: motor.prever_lote(consultas))
+
+    decisoes_iguais = 0
+    diferenca_maxima = 0.0
+    for (id_cv, conf_cv), (id_np, conf_np) in zip(previstos_cv, previstos_np):
+        decisao_cv = (id_cv,) + classificar_confianca('', conf_cv)[2:]
+        decisao_np = (id_np,) + classificar_confianca('', conf_np)[2:]
+        decisoes_iguais += decisao_cv == decisao_np
+        if conf_cv < 1e300 and conf_np < 1e300:
+            diferenca_maxima = max(diferenca_maxima, abs(conf_cv - conf_np))
+
+    n = len(consultas)
+    return {
+        'opencv_ms_por_consulta': round(1000.0 * t_cv / n, 3),
+        'numpy_ms_por_consulta': round(1000.0 * t_np / n, 3),
+        'numpy_lote_ms_por_consulta': round(1000.0 * t_lote / n, 3),
+        'aceleracao': round(t_cv / t_np, 2) if t_np > 0 else None,
+        'aceleracao_lote': round(t_cv / t_lote, 2) if t_lote > 0 else None,
+        'decisoes_iguais': f"{decisoes_iguais}/{n}",
+        'diferenca_maxima_distancia': diferenca_maxima,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do motor LBPH em NumPy")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[100, 500, 1000, 2000],
+                        help="Tamanhos de galeria (número de histogramas)")
+    parser.add_argument('--identidades', type=int, default=10)
+    parser.add_argument('--consultas', type=int, default=20)
+    parser.add_argument('--modelo', default=None, help="Modelo do OpenCV para conferir as decisões (opcional)")
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.semente)
+    base = faces_base()
+    consultas = gerar_consultas(base, args.consultas, rng)
+    relatorio = {'galerias': {}}
+    concordancia_total = True
+
+    for tamanho in args.tamanhos:
+        faces, rotulos = gerar_galeria(base, tamanho, args.identidades, rng)
+        reconhecedor = cv2.face.LBPHFaceRecognizer_create(radius=2, neighbors=8, grid_x=8, grid_y=8)
+        reconhecedor.train(faces, rotulos)
+        motor = MotorLBPH.de_reconhecedor(reconhecedor)
+        resultado = comparar(reconhecedor, motor, consultas)
+        relatorio['galerias'][tamanho] = resultado
+        concordancia_total &= resultado['decisoes_iguais'].split('/')[0] == str(len(consultas))
+        print(f"galeria {tamanho:6d}: opencv {resultado['opencv_ms_por_consulta']:8.2f} ms | "
+              f"numpy {resultado['numpy_ms_por_consulta']:8.2f} ms | lote {resultado['numpy_lote_ms_por_consulta']:8.2f} ms"
+              f" | decisões iguais {resultado['decisoes_iguais']}", file=sys.stderr)
+
+    if args.modelo:
+        reconhecedor = cv2.face.LBPHFaceRecognizer_create()
+        reconhecedor.read(args.modelo)
+        motor = MotorLBPH.de_reconhecedor(reconhecedor)
+        relatorio['modelo'] = {'arquivo': args.modelo, 'amostras': int(motor.galeria.shape[0])}
+        relatorio['modelo'].update(comparar(reconhecedor, motor, consultas))
+        concordancia_total &= relatorio['modelo']['decisoes_iguais'].split('/')[0] == str(len(consultas))
+
+    relatorio['decisoes_identicas'] = bool(concordancia_total)
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    return concordancia_total
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,146 @@
+"""
+Benchmark e verificação de consistência do pré-processamento de faces.
+
+Verificação: para cada foto de `--usuarios`, a face preparada pelo caminho do
+treinamento (`preprocessamento.carregar_face`, usado por `treinar.py`) deve
+ser idêntica, byte a byte, à preparada pelo caminho do detector (quadro BGR
+-> cinza -> `PreprocessadorFaces.lote`), também quando várias faces passam
+no mesmo lote e o buffer é reaproveitado. Qualquer diferença faz o comando
+terminar com erro.
+
+Benchmark: ms por quadro para preparar `--faces` recortes de tamanho
+variado com a receita antiga do detector (equalização, blur gaussiano e
+normalização no tamanho do recorte), com a receita única alocando a cada
+face e com o lote sobre buffers reaproveitados.
+
+Exemplo:
+    python -m benchmarks.preprocessamento --faces 1 4 8
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from fontes import desenhar_rosto_sintetico
+from manifesto_treino import EXTENSOES_TREINO
+from preprocessamento import PreprocessadorFaces, carregar_face, para_cinza, preprocessar
+
+
+def receita_antiga(face):
+    """Pré-processamento que o detector usava antes da receita única"""
+    face = cv2.equalizeHist(face)
+    face = cv2.GaussianBlur(face, (5, 5), 0)
+    return cv2.normalize(face, None, 0, 255, cv2.NORM_MINMAX)
+
+
+def listar_fotos(pasta, limite=None):
+    fotos = []
+    if os.path.isdir(pasta):
+        for usuario in sorted(os.listdir(pasta)):
+            caminho_usuario = os.path.join(pasta, usuario)
+            if os.path.isdir(caminho_usuario):
+                fotos.extend(os.path.join(caminho_usuario, arquivo) for arquivo in sorted(os.listdir(caminho_usuario))
+                             if arquivo.lower().endswith(EXTENSOES_TREINO))
+    return fotos[:limite]
+
+
+def verificar_consistencia(fotos):
+    """Retorna (fotos conferidas, lista de divergências)"""
+    preprocessador = PreprocessadorFaces(capacidade=1)
+    treino = [carregar_face(foto) for foto in fotos]
+    quadros = [para_cinza(cv2.imread(foto, cv2.IMREAD_COLOR)) for foto in fotos]
+    divergencias = []
+
+    # Uma face por quadro, como no detector
+    for foto, esperado, gray in zip(fotos, treino, quadros):
+        obtido = preprocessador.lote(gray, [(0, 0, gray.shape[1], gray.shape[0])])[0]
+        if not np.array_equal(esperado, obtido):
+            divergencias.append(f"{foto}: face única difere ({int(np.abs(esperado.astype(int) - obtido).max())})")
+
+    # Várias faces no mesmo quadro: recortes lado a lado em um quadro maior
+    if quadros:
+        altura = max(gray.shape[0] for gray in quadros)
+        mosaico = np.zeros((altura, sum(gray.shape[1] for gray in quadros)), np.uint8)
+        regioes, x = [], 0
+        for gray in quadros:
+            mosaico[:gray.shape[0], x:x + gray.shape[1]] = gray
+            regioes.append((x, 0, gray.shape[1], gray.shape[0]))
+            x += gray.shape[1]
+        lote = preprocessador.lote(mosaico, regioes)
+        for foto, esperado, obtido in zip(fotos, treino, lote):
+            if not np.array_equal(esperado, obtido):
+                divergencias.append(f"{foto}: face em lote difere")
+    return len(fotos), divergencias
+
+
+def gerar_quadros(quantidade, faces_por_quadro, rng):
+    """Quadros 640x480 em cinza com as regiões das faces (recortes de 120 a 300 px)"""
+    quadros = []
+    for q in range(quantidade):
+        gray = rng.integers(0, 256, (480, 640), dtype=np.uint8)
+        regioes = []
+        for i in range(faces_por_quadro):
+            lado = int(rng.integers(120, 300))
+            x, y = int(rng.integers(0, 640 - lado)), int(rng.integers(0, 480 - lado))
+            rosto = cv2.cvtColor(desenhar_rosto_sintetico(lado, q * faces_por_quadro + i), cv2.COLOR_BGR2GRAY)
+            gray[y:y + lado, x:x + lado] = rosto
+            regioes.append((x, y, lado, lado))
+        quadros.append((gray, regioes))
+    return quadros
+
+
+def medir(quadros, preparar):
+    inicio = time.perf_counter()
+    for gray, regioes in quadros:
+        preparar(gray, regioes)
+    return 1000.0 * (time.perf_counter() - inicio) / len(quadros)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consistência e desempenho do pré-processamento de faces")
+    parser.add_argument('--usuarios', default='users', help="Fotos usadas na verificação de consistência")
+    parser.add_argument('--limite', type=int, default=None, help="Máximo de fotos verificadas")
+    parser.add_argument('--faces', type=int, nargs='+', default=[1, 4, 8], help="Faces por quadro no benchmark")
+    parser.add_argument('--quadros', type=int, default=100)
+    parser.add_argument('--saida', default=None, help="Grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        fotos = listar_fotos(args.usuarios, args.limite)
+        if not fotos:
+            # Sem fotos cadastradas: verifica com rostos sintéticos gravados em disco
+            for semente in range(4):
+                fotos.append(os.path.join(pasta, f'sintetico_{semente}.png'))
+                cv2.imwrite(fotos[-1], desenhar_rosto_sintetico(200 + 20 * semente, semente))
+        conferidas, divergencias = verificar_consistencia(fotos)
+    print(f"Consistência treino x detector: {conferidas} fotos, {len(divergencias)} divergências")
+    for divergencia in divergencias:
+        print(f"  ✗ {divergencia}")
+
+    rng = np.random.default_rng(0)
+    resultados = {'consistencia': {'fotos': conferidas, 'divergencias': divergencias}, 'ms_por_quadro': {}}
+    print(f"\n{'faces/quadro':>12} {'antiga':>9} {'receita':>9} {'lote':>9}")
+    for n in args.faces:
+        quadros = gerar_quadros(args.quadros, n, rng)
+        preprocessador = PreprocessadorFaces()
+        tempos = {
+            'antiga': medir(quadros, lambda g, r: [receita_antiga(g[y:y + h, x:x + w]) for x, y, w, h in r]),
+            'receita': medir(quadros, lambda g, r: [preprocessar(g[y:y + h, x:x + w]) for x, y, w, h in r]),
+            'lote': medir(quadros, preprocessador.lote),
+        }
+        resultados['ms_por_quadro'][n] = {nome: round(ms, 3) for nome, ms in tempos.items()}
+        print(f"{n:>12} {tempos['antiga']:>9.2f} {tempos['receita']:>9.2f} {tempos['lote']:>9.2f}")
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+    return not divergencias
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
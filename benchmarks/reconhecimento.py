@@ -0,0 +1,112 @@
+"""
+Benchmark de ponta a ponta do `iniciar_reconhecimento`.
+
+Reproduz um vídeo gravado (ou uma pasta de imagens, ou a fonte sintética)
+sem janela e reporta em JSON: FPS, latência por quadro (p50/p95/p99),
+faces por segundo, tempo de CPU por quadro, quadros ignorados pelo portão de
+movimento e o tempo gasto em cada etapa.
+
+Exemplo:
+    python -m benchmarks.reconhecimento --fonte gravacao.mp4 --modos completo rastreamento
+    python -m benchmarks.reconhecimento --fonte sintetico:600:0.7 --modos completo movimento
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from detector import iniciar_reconhecimento
+
+MODOS = {
+    'completo': {},
+    'rastreamento': {'rastreamento': True},
+    'pipeline': {'pipeline': True},
+    'pipeline_rastreamento': {'pipeline': True, 'rastreamento': True},
+    'movimento': {'movimento': True},
+    'movimento_rastreamento': {'movimento': True, 'rastreamento': True},
+}
+
+
+def resumir(estatisticas):
+    """Converte as estatísticas do detector no relatório do benchmark"""
+    latencias_ms = 1000.0 * np.asarray(estatisticas['latencias'], dtype=np.float64)
+    duracao = estatisticas['duracao']
+    quadros = estatisticas['quadros']
+    total_etapas = sum(estatisticas['tempos'].values()) or 1.0
+
+    relatorio = {
+        'quadros': quadros,
+        'duracao_s': round(duracao, 4),
+        'fps': round(quadros / duracao, 2) if duracao > 0 else 0.0,
+        'faces_por_segundo': round(estatisticas['faces'] / duracao, 2) if duracao > 0 else 0.0,
+        'ignorados': estatisticas['ignorados'],
+        'deteccoes': estatisticas['deteccoes'],
+        'reconhecimentos': estatisticas['reconhecimentos'],
+        'latencia_ms': {},
+        'etapas': {},
+    }
+    if latencias_ms.size:
+        p50, p95, p99 = np.percentile(latencias_ms, [50, 95, 99])
+        relatorio['latencia_ms'] = {
+            'media': round(float(latencias_ms.mean()), 3),
+            'p50': round(float(p50), 3),
+            'p95': round(float(p95), 3),
+            'p99': round(float(p99), 3),
+            'max': round(float(latencias_ms.max()), 3),
+        }
+    for etapa, tempo in sorted(estatisticas['tempos'].items(), key=lambda item: -item[1]):
+        relatorio['etapas'][etapa] = {
+            'total_ms': round(1000.0 * tempo, 3),
+            'ms_por_quadro': round(1000.0 * tempo / quadros, 3) if quadros else 0.0,
+            'percentual': round(100.0 * tempo / total_etapas, 1),
+        }
+    if 'pipeline' in estatisticas:
+        relatorio['pipeline'] = estatisticas['pipeline']
+    return relatorio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de FPS/latência do reconhecimento")
+    parser.add_argument('--fonte', default='sintetico:300',
+                        help="Vídeo, pasta de imagens ou 'sintetico[:N]' (padrão: sintetico:300)")
+    parser.add_argument('--modos', nargs='+', default=['completo'], choices=sorted(MODOS),
+                        help="Modos do detector a comparar")
+    parser.add_argument('--max-quadros', type=int, default=None)
+    parser.add_argument('--modelo', default='classificador.yml')
+    parser.add_argument('--nomes', default='nomes.json')
+    parser.add_argument('--motor', choices=['opencv', 'numpy', 'indice'], default='opencv')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--saida', default=None, help="Arquivo JSON para gravar o relatório (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    relatorio = {'fonte': str(args.fonte), 'modos': {}}
+    # Os logs de acesso do benchmark não devem se misturar aos logs reais
+    with tempfile.TemporaryDirectory() as pasta_logs:
+        for modo in args.modos:
+            cpu = time.process_time()
+            estatisticas = iniciar_reconhecimento(fonte=args.fonte, exibir=False, max_quadros=args.max_quadros,
+                                                  modelo=args.modelo, arquivo_nomes=args.nomes,
+                                                  pasta_logs=pasta_logs, motor=args.motor, workers=args.workers,
+                                                  **MODOS[modo])
+            cpu = time.process_time() - cpu
+            relatorio['modos'][modo] = resumir(estatisticas)
+            relatorio['modos'][modo]['cpu_s'] = round(cpu, 3)
+            relatorio['modos'][modo]['cpu_ms_por_quadro'] = round(1000.0 * cpu / max(1, estatisticas['quadros']), 3)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+        print(f"✓ Relatório salvo em {args.saida}")
+    else:
+        print(texto)
+    return relatorio
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,165 @@
+"""
+Gerador de carga para o serviço de reconhecimento (servico.py).
+
+Sobe o serviço em um processo separado (ou usa um já rodando com `--url`),
+dispara pedidos de `--concorrencia` clientes simultâneos, cada um com a sua
+conexão persistente, e mede vazão e latência (p50/p95/p99) por combinação
+de concorrência e tamanho máximo de micro-lote (`--lotes 1` desliga o
+agrupamento). As imagens são as fotos de users/ (ou rostos sintéticos),
+enviadas como quadros inteiros ou, com `--recortes`, como recortes de face.
+
+Exemplo:
+    python -m benchmarks.servico --modelo classificador.lbph --concorrencia 1 8 32 --lotes 1 8
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+from benchmarks.preprocessamento import listar_fotos
+from fontes import desenhar_rosto_sintetico
+
+ARQUIVO_SERVICO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'servico.py')
+
+
+def carregar_imagens(pasta, limite):
+    """Bytes PNG das fotos de `pasta` (rostos sintéticos se não houver fotos)"""
+    fotos = listar_fotos(pasta, limite)
+    imagens = []
+    for foto in fotos:
+        with open(foto, 'rb') as f:
+            imagens.append(f.read())
+    if imagens:
+        return imagens
+    return [cv2.imencode('.png', desenhar_rosto_sintetico(240, semente))[1].tobytes() for semente in range(8)]
+
+
+def aguardar(url, timeout=30.0):
+    alvo = urlparse(url)
+    prazo = time.monotonic() + timeout
+    while time.monotonic() < prazo:
+        try:
+            conexao = http.client.HTTPConnection(alvo.hostname, alvo.port, timeout=1.0)
+            conexao.request('GET', '/saude')
+            if conexao.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def iniciar_servico(args, porta, lote_max):
+    comando = [sys.executable, ARQUIVO_SERVICO, '--porta', str(porta), '--modelo', args.modelo, '--nomes', args.nomes,
+               '--motor', args.motor, '--workers', str(args.workers), '--lote-max', str(lote_max),
+               '--espera-max-ms', str(args.espera_max_ms), '--recarregar-a-cada', '0']
+    processo = subprocess.Popen(comando, stdout=subprocess.DEVNULL)
+    if not aguardar(f'http://127.0.0.1:{porta}'):
+        processo.kill()
+        raise RuntimeError("O serviço não respondeu a tempo")
+    return processo
+
+
+def cliente(url, imagens, pedidos, recortes, latencias, erros, inicio):
+    alvo = urlparse(url)
+    caminho = '/reconhecer?recorte=1' if recortes else '/reconhecer'
+    conexao = http.client.HTTPConnection(alvo.hostname, alvo.port, timeout=30.0)
+    inicio.wait()
+    for i in range(pedidos):
+        t = time.perf_counter()
+        try:
+            conexao.request('POST', caminho, body=imagens[i % len(imagens)],
+                            headers={'Content-Type': 'application/octet-stream'})
+            resposta = conexao.getresponse()
+            resposta.read()
+            if resposta.status != 200:
+                erros.append(resposta.status)
+                continue
+        except OSError as erro:
+            erros.append(str(erro))
+            conexao.close()
+            conexao = http.client.HTTPConnection(alvo.hostname, alvo.port, timeout=30.0)
+            continue
+        latencias.append(time.perf_counter() - t)
+    conexao.close()
+
+
+def gerar_carga(url, imagens, concorrencia, pedidos, recortes):
+    latencias, erros = [], []
+    inicio = threading.Event()
+    clientes = [threading.Thread(target=cliente, args=(url, imagens[c:] + imagens[:c], pedidos, recortes, latencias,
+                                                       erros, inicio))
+                for c in range(concorrencia)]
+    for c in clientes:
+        c.start()
+    t = time.perf_counter()
+    inicio.set()
+    for c in clientes:
+        c.join()
+    duracao = time.perf_counter() - t
+    ms = 1000.0 * np.array(latencias) if latencias else np.zeros(1)
+    return {
+        'concorrencia': concorrencia,
+        'pedidos': len(latencias),
+        'erros': len(erros),
+        'pedidos_por_segundo': round(len(latencias) / duracao, 1),
+        'p50_ms': round(float(np.percentile(ms, 50)), 2),
+        'p95_ms': round(float(np.percentile(ms, 95)), 2),
+        'p99_ms': round(float(np.percentile(ms, 99)), 2),
+        'max_ms': round(float(ms.max()), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga concorrente no serviço de reconhecimento")
+    parser.add_argument('--url', default=None, help="Serviço já em execução (senão um é iniciado por configuração)")
+    parser.add_argument('--modelo', default='classificador.yml')
+    parser.add_argument('--nomes', default='nomes.json')
+    parser.add_argument('--motor', choices=['opencv', 'numpy', 'indice'], default='numpy')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--lotes', type=int, nargs='+', default=[1, 8], help="Valores de --lote-max comparados")
+    parser.add_argument('--espera-max-ms', type=float, default=2.0)
+    parser.add_argument('--concorrencia', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--pedidos', type=int, default=50, help="Pedidos por cliente")
+    parser.add_argument('--usuarios', default='users', help="Fotos enviadas ao serviço")
+    parser.add_argument('--limite', type=int, default=32)
+    parser.add_argument('--recortes', action='store_true', help="Envia recortes de face (sem detecção no serviço)")
+    parser.add_argument('--porta', type=int, default=8181)
+    parser.add_argument('--saida', default=None, help="Grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    imagens = carregar_imagens(args.usuarios, args.limite)
+    configuracoes = [None] if args.url else args.lotes
+    resultados = []
+    print(f"{'lote_max':>8} {'clientes':>8} {'pedidos/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erros':>6}")
+    for lote_max in configuracoes:
+        processo = None if args.url else iniciar_servico(args, args.porta, lote_max)
+        url = args.url or f'http://127.0.0.1:{args.porta}'
+        try:
+            gerar_carga(url, imagens, 1, 5, args.recortes)  # aquecimento
+            for concorrencia in args.concorrencia:
+                r = gerar_carga(url, imagens, concorrencia, args.pedidos, args.recortes)
+                r['lote_max'] = lote_max
+                resultados.append(r)
+                print(f"{str(lote_max or '-'):>8} {concorrencia:>8} {r['pedidos_por_segundo']:>10.1f} "
+                      f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['erros']:>6}")
+        finally:
+            if processo is not None:
+                processo.terminate()
+                processo.wait()
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+    return resultados
+
+
+if __name__ == '__main__':
+    main()
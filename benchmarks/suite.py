@@ -0,0 +1,312 @@
+"""
+Suíte de micro-benchmarks dos caminhos quentes do treinamento e do
+reconhecimento, com linha de base e detecção de regressões.
+
+Roda sem câmera e sem fotos: gera uma base sintética users/<nome>/*.png
+(rostos desenhados por `fontes.desenhar_rosto_sintetico`, com variações de
+brilho, ruído, rotação e deslocamento) em uma pasta temporária e mede:
+
+- `aumentar_dados`: ms por face;
+- `get_imagens_e_labels`: ms por foto (leitura, receita e aumento);
+- treino (`train` do OpenCV e `MotorLBPH.treinar`): ms por face;
+- `predict` contra galerias de tamanho crescente (OpenCV e `prever_lote`):
+  ms por consulta;
+- `detectMultiScale` em várias resoluções e conjuntos de parâmetros: ms por
+  quadro;
+- carregamento do modelo (.yml do OpenCV e .lbph mapeado): ms.
+
+Cada medida é o menor tempo de `--repeticoes` execuções (o menos afetado
+por ruído da máquina). O resultado vai para JSON (`--saida`); com
+`--linha-de-base`, cada medida é comparada com a gravada e a suíte termina
+com código 1 se alguma ficar mais lenta que a base além de `--tolerancia`
+(e de `--piso-ms`, para não acusar ruído em medidas de microssegundos).
+A linha de base depende da máquina: grave-a com `--gravar-linha-de-base`
+na máquina onde as comparações serão feitas.
+
+Exemplo:
+    python -m benchmarks.suite --gravar-linha-de-base benchmarks/linha_de_base.json
+    python -m benchmarks.suite --linha-de-base benchmarks/linha_de_base.json --tolerancia 0.2
+    python -m benchmarks.suite --rapido --casos predicao deteccao
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from deteccao import carregar_cascade
+from fontes import FonteSintetica, desenhar_rosto_sintetico
+from lbph import MotorLBPH, salvar_modelo_yml
+from treinar import PARAMETROS_LBPH, aumentar_dados, criar_motor, criar_reconhecedor, get_imagens_e_labels
+
+VERSAO_SUITE = 1
+
+RESOLUCOES = ((320, 240), (640, 480), (1280, 720))
+
+# Conjuntos de parâmetros do detectMultiScale: o atual do detector e variações mais baratas
+PARAMETROS_DETECCAO = {
+    'padrao': {'scaleFactor': 1.1, 'minNeighbors': 5, 'minSize': (30, 30)},
+    'escala_1.2': {'scaleFactor': 1.2, 'minNeighbors': 5, 'minSize': (30, 30)},
+    'min_80': {'scaleFactor': 1.1, 'minNeighbors': 5, 'minSize': (80, 80)},
+}
+
+PADRAO = {'identidades': 10, 'fotos': 8, 'galerias': [250, 1000, 3000], 'consultas': 20, 'quadros': 10}
+RAPIDO = {'identidades': 4, 'fotos': 4, 'galerias': [100, 500], 'consultas': 10, 'quadros': 4}
+
+
+def gerar_dataset(pasta, identidades, fotos, tamanho=240, semente=0, variacao=1.0):
+    """
+    Base sintética no formato de users/: `identidades` pastas com `fotos`
+    variações (brilho, ruído, rotação e deslocamento) de um rosto desenhado.
+    `variacao` multiplica a intensidade das variações (fotos mais difíceis).
+    """
+    rng = np.random.default_rng(semente)
+    for i in range(identidades):
+        rosto = desenhar_rosto_sintetico(tamanho, semente + i)
+        pasta_usuario = os.path.join(pasta, f'Pessoa{i:03d}')
+        os.makedirs(pasta_usuario, exist_ok=True)
+        for j in range(fotos):
+            matriz = cv2.getRotationMatrix2D((tamanho / 2, tamanho / 2), variacao * rng.uniform(-8, 8),
+                                             1.0 + variacao * rng.uniform(-0.05, 0.05))
+            matriz[:, 2] += variacao * rng.uniform(-6, 6, 2)
+            foto = cv2.warpAffine(rosto, matriz, (tamanho, tamanho), borderMode=cv2.BORDER_REFLECT)
+            brilho = 1.0 + variacao * rng.uniform(-0.25, 0.25)
+            foto = foto.astype(np.float32) * brilho + rng.normal(0, 5 * variacao, foto.shape)
+            cv2.imwrite(os.path.join(pasta_usuario, f'{j:03d}.png'), np.clip(foto, 0, 255).astype(np.uint8))
+    return pasta
+
+
+def medir(funcao, repeticoes):
+    """Menor tempo (ms) de `repeticoes` chamadas e o resultado da última"""
+    melhor = float('inf')
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return 1000.0 * melhor, resultado
+
+
+def ampliar_galeria(histogramas, rotulos, tamanho):
+    """Repete a galeria real até `tamanho` amostras; cada repetição vira um novo grupo de identidades"""
+    indices = np.arange(tamanho) % len(histogramas)
+    deslocamento = (np.arange(tamanho) // len(histogramas)) * (int(rotulos.max()) + 1)
+    return histogramas[indices], (rotulos[indices] + deslocamento).astype(np.int32)
+
+
+class Contexto:
+    """Base sintética e faces preparadas uma vez, compartilhadas pelos casos"""
+
+    def __init__(self, pasta, tamanhos, repeticoes, semente=0):
+        self.pasta = pasta
+        self.tamanhos = tamanhos
+        self.repeticoes = repeticoes
+        self.usuarios = gerar_dataset(os.path.join(pasta, 'users'), tamanhos['identidades'], tamanhos['fotos'],
+                                      semente=semente)
+        self.fotos = tamanhos['identidades'] * tamanhos['fotos']
+        faces, ids, _ = get_imagens_e_labels(self.usuarios)
+        self.faces = faces
+        self.rotulos = np.asarray(ids, np.int32)
+        rng = np.random.default_rng(semente + 1)
+        self.consultas = [faces[i] for i in rng.choice(len(faces), tamanhos['consultas'], replace=False)]
+        self.histogramas = criar_motor().histogramas(self.faces)
+
+
+def caso_aumento(ctx):
+    ms, _ = medir(lambda: [aumentar_dados(face) for face in ctx.consultas], ctx.repeticoes)
+    return {'ms_por_face': ms / len(ctx.consultas)}
+
+
+def caso_imagens_e_labels(ctx):
+    ms, _ = medir(lambda: get_imagens_e_labels(ctx.usuarios), ctx.repeticoes)
+    return {'ms_por_foto': ms / ctx.fotos}
+
+
+def caso_treino(ctx):
+    faces = list(ctx.faces)
+    ms_cv, _ = medir(lambda: criar_reconhecedor().train(faces, ctx.rotulos), ctx.repeticoes)
+    ms_np, _ = medir(lambda: criar_motor().treinar(faces, ctx.rotulos), ctx.repeticoes)
+    return {'opencv/ms_por_face': ms_cv / len(faces), 'numpy/ms_por_face': ms_np / len(faces)}
+
+
+def caso_predicao(ctx):
+    """predict e carregamento do modelo contra galerias de tamanho crescente"""
+    medidas = {}
+    consultas = ctx.consultas
+    for tamanho in ctx.tamanhos['galerias']:
+        histogramas, rotulos = ampliar_galeria(ctx.histogramas, ctx.rotulos, tamanho)
+        yml = os.path.join(ctx.pasta, f'galeria_{tamanho}.yml')
+        binario = os.path.join(ctx.pasta, f'galeria_{tamanho}.lbph')
+        salvar_modelo_yml(yml, histogramas, rotulos, PARAMETROS_LBPH['radius'], PARAMETROS_LBPH['neighbors'],
+                          PARAMETROS_LBPH['grid_x'], PARAMETROS_LBPH['grid_y'], PARAMETROS_LBPH['threshold'])
+        motor = criar_motor()
+        motor.definir_galeria(histogramas, rotulos)
+        motor.salvar_binario(binario)
+
+        def carregar_opencv():
+            reconhecedor = criar_reconhecedor()
+            reconhecedor.read(yml)
+            return reconhecedor
+
+        ms_yml, reconhecedor = medir(carregar_opencv, ctx.repeticoes)
+        ms_lbph, motor = medir(lambda: MotorLBPH.carregar_binario(binario), ctx.repeticoes)
+        ms_cv, _ = medir(lambda: [reconhecedor.predict(c) for c in consultas], ctx.repeticoes)
+        ms_np, _ = medir(lambda: [motor.predict(c) for c in consultas], ctx.repeticoes)
+        ms_lote, _ = medir(lambda: motor.prever_lote(consultas), ctx.repeticoes)
+        medidas.update({
+            f'galeria={tamanho}/opencv/ms_por_consulta': ms_cv / len(consultas),
+            f'galeria={tamanho}/numpy/ms_por_consulta': ms_np / len(consultas),
+            f'galeria={tamanho}/numpy_lote/ms_por_consulta': ms_lote / len(consultas),
+            f'galeria={tamanho}/carregar_yml/ms': ms_yml,
+            f'galeria={tamanho}/carregar_lbph/ms': ms_lbph,
+        })
+        os.remove(yml)
+        os.remove(binario)
+    return medidas
+
+
+def caso_deteccao(ctx):
+    cascade = carregar_cascade()
+    medidas = {}
+    for largura, altura in RESOLUCOES:
+        fonte = FonteSintetica(ctx.tamanhos['quadros'], largura, altura, [desenhar_rosto_sintetico(200, 0)])
+        quadros = []
+        while True:
+            ret, frame = fonte.read()
+            if not ret:
+                break
+            quadros.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        for nome, parametros in PARAMETROS_DETECCAO.items():
+            ms, _ = medir(lambda: [cascade.detectMultiScale(q, **parametros) for q in quadros], ctx.repeticoes)
+            medidas[f'{largura}x{altura}/{nome}/ms_por_quadro'] = ms / len(quadros)
+    return medidas
+
+
+CASOS = {
+    'aumento': caso_aumento,
+    'imagens_e_labels': caso_imagens_e_labels,
+    'treino': caso_treino,
+    'predicao': caso_predicao,
+    'deteccao': caso_deteccao,
+}
+
+
+def ambiente():
+    """O que torna as medidas comparáveis (ou não) entre execuções"""
+    return {
+        'suite': VERSAO_SUITE,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'processador': platform.processor() or platform.machine(),
+        'nucleos': os.cpu_count(),
+        'sistema': platform.platform(),
+    }
+
+
+def executar(casos, tamanhos, repeticoes, semente=0):
+    """Roda os `casos` e retorna {'ambiente', 'tamanhos', 'medidas': {caso/medida: ms}}"""
+    medidas = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        print(f"Gerando base sintética ({tamanhos['identidades']} pessoas x {tamanhos['fotos']} fotos)...")
+        ctx = Contexto(pasta, tamanhos, repeticoes, semente)
+        for nome in casos:
+            inicio = time.perf_counter()
+            for medida, valor in CASOS[nome](ctx).items():
+                medidas[f'{nome}/{medida}'] = round(valor, 4)
+            print(f"✓ {nome} ({time.perf_counter() - inicio:.1f} s)")
+    return {'ambiente': ambiente(), 'tamanhos': tamanhos, 'medidas': medidas}
+
+
+def comparar(resultado, base, tolerancia, piso_ms):
+    """
+    Compara as medidas com a linha de base. Retorna uma lista de
+    (medida, base_ms, atual_ms, variacao) e a lista das regressões: medidas
+    mais lentas que a base por mais de `tolerancia` (fração) e `piso_ms`.
+    """
+    linhas, regressoes = [], []
+    for medida, atual in resultado['medidas'].items():
+        anterior = base['medidas'].get(medida)
+        if anterior is None:
+            continue
+        variacao = atual / anterior - 1.0 if anterior > 0 else 0.0
+        linha = (medida, anterior, atual, variacao)
+        linhas.append(linha)
+        if variacao > tolerancia and atual - anterior > piso_ms:
+            regressoes.append(linha)
+    return linhas, regressoes
+
+
+def imprimir(resultado, linhas=None):
+    variacoes = {medida: (anterior, variacao) for medida, anterior, _, variacao in linhas or []}
+    print(f"\n{'medida':<52} {'ms':>10} {'base ms':>10} {'variação':>9}")
+    for medida, valor in resultado['medidas'].items():
+        if medida in variacoes:
+            anterior, variacao = variacoes[medida]
+            print(f"{medida:<52} {valor:>10.3f} {anterior:>10.3f} {100.0 * variacao:>+8.1f}%")
+        else:
+            print(f"{medida:<52} {valor:>10.3f} {'-':>10} {'-':>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suíte de micro-benchmarks com linha de base")
+    parser.add_argument('--casos', nargs='+', choices=list(CASOS), default=list(CASOS))
+    parser.add_argument('--rapido', action='store_true', help="Base e galerias menores (verificação rápida)")
+    parser.add_argument('--galerias', type=int, nargs='+', default=None, help="Tamanhos de galeria do predict")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--linha-de-base', default=None, help="JSON de uma execução anterior para comparar")
+    parser.add_argument('--gravar-linha-de-base', default=None, help="Grava este resultado como linha de base")
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help="Piora relativa aceita antes de acusar regressão (0.25 = 25%%)")
+    parser.add_argument('--piso-ms', type=float, default=0.05,
+                        help="Piora absoluta mínima (ms) para acusar regressão")
+    parser.add_argument('--saida', default=None, help="Grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    tamanhos = dict(RAPIDO if args.rapido else PADRAO)
+    if args.galerias:
+        tamanhos['galerias'] = args.galerias
+    cv2.setNumThreads(1)
+    resultado = executar(args.casos, tamanhos, args.repeticoes, args.semente)
+
+    regressoes = []
+    linhas = None
+    if args.linha_de_base:
+        with open(args.linha_de_base, 'r') as f:
+            base = json.load(f)
+        if base.get('ambiente') != resultado['ambiente']:
+            print("⚠️  A linha de base foi gravada em outro ambiente; as diferenças podem não ser regressões")
+        if base.get('tamanhos') != resultado['tamanhos']:
+            print("⚠️  A linha de base usou outros tamanhos (--rapido/--galerias); só as medidas em comum são comparadas")
+        linhas, regressoes = comparar(resultado, base, args.tolerancia, args.piso_ms)
+        resultado['comparacao'] = {'linha_de_base': args.linha_de_base, 'tolerancia': args.tolerancia,
+                                   'regressoes': [medida for medida, *_ in regressoes]}
+    imprimir(resultado, linhas)
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+    if args.gravar_linha_de_base:
+        with open(args.gravar_linha_de_base, 'w') as f:
+            json.dump({k: resultado[k] for k in ('ambiente', 'tamanhos', 'medidas')}, f, indent=2,
+                      ensure_ascii=False)
+        print(f"✓ Linha de base gravada em {args.gravar_linha_de_base}")
+
+    if regressoes:
+        print(f"\n⚠️  {len(regressoes)} regressão(ões) acima de {100.0 * args.tolerancia:.0f}%:")
+        for medida, anterior, atual, variacao in regressoes:
+            print(f"  {medida}: {anterior:.3f} -> {atual:.3f} ms ({100.0 * variacao:+.1f}%)")
+        return False
+    if linhas is not None:
+        print(f"\n✅ Nenhuma regressão acima de {100.0 * args.tolerancia:.0f}% em {len(linhas)} medidas")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,100 @@
+"""
+Memória do supervisor de câmeras contra detectores independentes.
+
+Mede, com fontes sintéticas, a memória de:
+
+- `--cameras` processos `detector.py` independentes, cada um lendo o modelo
+  .yml com o LBPH do OpenCV (o jeito de atender várias entradas antes do
+  supervisor): soma do PSS de todos;
+- o supervisor com as mesmas câmeras: PSS do supervisor mais o de cada
+  processo de câmera, que compartilham o modelo .lbph mapeado e as páginas
+  das bibliotecas herdadas no fork.
+
+O PSS divide cada página compartilhada entre os processos que a usam, então
+as somas são comparáveis. Só funciona no Linux (/proc/<pid>/smaps_rollup).
+
+Exemplo:
+    python -m benchmarks.supervisor --modelo classificador.yml --cameras 1 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from supervisor import Supervisor, memoria_processo, modelo_compartilhado
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pico_pss(pids, duracao, passo=0.5):
+    """Maior soma de PSS (MB) dos `pids` observada durante `duracao` segundos"""
+    pico = 0.0
+    fim = time.monotonic() + duracao
+    while time.monotonic() < fim:
+        medidas = [memoria_processo(pid) for pid in pids()]
+        pico = max(pico, sum(m[1] for m in medidas if m and m[1] is not None))
+        time.sleep(passo)
+    return pico
+
+
+def medir_independentes(args, cameras, pasta_logs):
+    comando = [sys.executable, os.path.join(RAIZ, 'detector.py'), '--sem-janela', '--fonte', 'sintetico:100000',
+               '--modelo', args.modelo, '--nomes', args.nomes, '--pasta-logs', pasta_logs, '--sem-eventos',
+               '--recarregar-a-cada', '0']
+    processos = [subprocess.Popen(comando, stdout=subprocess.DEVNULL) for _ in range(cameras)]
+    try:
+        return pico_pss(lambda: [p.pid for p in processos], args.duracao)
+    finally:
+        for p in processos:
+            p.terminate()
+            p.wait()
+
+
+def medir_supervisor(args, cameras, pasta_logs):
+    opcoes = {'modelo': modelo_compartilhado(args.modelo), 'arquivo_nomes': args.nomes, 'motor': 'numpy',
+              'pasta_logs': pasta_logs, 'arquivo_eventos': None, 'recarregar_a_cada': 0}
+    supervisor = Supervisor([{'fonte': 'sintetico:100000'} for _ in range(cameras)], opcoes,
+                            intervalo=args.duracao).iniciar()
+    try:
+        return pico_pss(lambda: [os.getpid()] + [c.processo.pid for c in supervisor.cameras], args.duracao)
+    finally:
+        supervisor.encerrar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memória do supervisor x detectores independentes")
+    parser.add_argument('--modelo', default='classificador.yml', help="Modelo .yml (o .lbph correspondente deve existir)")
+    parser.add_argument('--nomes', default='nomes.json')
+    parser.add_argument('--cameras', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--duracao', type=float, default=8.0, help="Segundos de medição por configuração")
+    parser.add_argument('--pasta-logs', default=os.path.join('logs', 'benchmark_supervisor'))
+    parser.add_argument('--saida', default=None, help="Grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    if memoria_processo(os.getpid()) is None:
+        print("Sem /proc/<pid>/smaps_rollup: a medição de memória só funciona no Linux")
+        return None
+    resultados = []
+    print(f"{'câmeras':>7} {'independentes MB':>17} {'supervisor MB':>14} {'MB por câmera extra':>20}")
+    base = None
+    for n in args.cameras:
+        independentes = medir_independentes(args, n, args.pasta_logs)
+        supervisionado = medir_supervisor(args, n, args.pasta_logs)
+        if base is None:
+            base = (n, supervisionado)
+        extra = (supervisionado - base[1]) / (n - base[0]) if n > base[0] else float('nan')
+        resultados.append({'cameras': n, 'independentes_pss_mb': round(independentes, 1),
+                           'supervisor_pss_mb': round(supervisionado, 1),
+                           'mb_por_camera_extra': None if extra != extra else round(extra, 1)})
+        print(f"{n:>7} {independentes:>17.1f} {supervisionado:>14.1f} {extra:>20.1f}")
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+    return resultados
+
+
+if __name__ == '__main__':
+    main()
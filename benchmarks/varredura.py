@@ -0,0 +1,262 @@
+"""
+Varredura de parâmetros do LBPH (resolução, raio, vizinhos, grade e conjunto
+de aumento de dados) com calibração dos limiares de decisão e fronteira de
+Pareto entre custo e acurácia.
+
+As fotos de users/ (ou da base empacotada) são divididas em:
+
+- identidades cadastradas: cada uma tem `--fracao-teste` das fotos
+  separadas para teste; o resto treina o modelo;
+- impostores: `--impostores` identidades que ficam fora do treino e só
+  aparecem como consultas (quem deve ser negado).
+
+Com menos de 3 identidades em `--usuarios`, usa a base sintética da suíte
+(`--sintetico` pessoas). Para cada configuração mede o tempo de treino
+(receita + aumento + histogramas), o tamanho do modelo .lbph, a latência de
+um `predict` e, com os limiares calibrados, a acurácia de identificação, a
+FAR (impostores aceitos), as trocas (cadastrados aceitos como outra pessoa) e
+a FRR (cadastrados negados).
+
+Os limiares são calibrados por configuração a partir das distâncias
+observadas: `verificar` é o maior limiar com FAR e trocas até `--far-alvo`
+(fronteira entre PERMITIDO e NEGADO), `permitido` o maior com um décimo
+disso e `alta` o maior sem nenhuma falsa aceitação, que fazem o papel dos
+níveis 70/50/30 de `detector.classificar_confianca`.
+
+Exemplo:
+    python -m benchmarks.varredura --tamanhos 100 150 250 --raios 1 2 --grades 8x8 4x4 --acuracia-alvo 0.95
+    python -m benchmarks.varredura --usuarios users --aumentos nenhum completo --saida varredura.json
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from base_faces import ler_imagem
+from benchmarks.suite import gerar_dataset
+from lbph import MotorLBPH
+from manifesto_treino import escanear_usuarios
+from preprocessamento import para_cinza, preprocessar
+from treinar import RECEITAS_AUMENTO, aplicar_receita
+
+CONJUNTOS_AUMENTO = {
+    'nenhum': (('original',),),
+    'leve': (('original',), ('rotacao', -5), ('rotacao', 5), ('gamma', 0.8), ('gamma', 1.2)),
+    'completo': RECEITAS_AUMENTO,
+}
+
+
+def ler_grade(texto):
+    """Converte "8x8" em (grid_x, grid_y)"""
+    try:
+        grid_x, grid_y = (int(v) for v in texto.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Grade inválida: {texto} (use LARGURAxALTURA, ex.: 8x8)")
+    return grid_x, grid_y
+
+
+def dividir(fotos, fracao_teste, impostores, rng):
+    """
+    Separa {usuario: [fotos]} em treino [(usuario, foto)], teste dos
+    cadastrados [(usuario, foto)] e consultas de impostores [foto].
+    """
+    usuarios = sorted(u for u, lista in fotos.items() if lista)
+    ordem = list(rng.permutation(len(usuarios)))
+    fora = {usuarios[i] for i in ordem[:impostores]}
+    treino, teste, consultas_impostores = [], [], []
+    for usuario in usuarios:
+        lista = sorted(fotos[usuario])
+        if usuario in fora:
+            consultas_impostores.extend(lista)
+            continue
+        lista = [lista[i] for i in rng.permutation(len(lista))]
+        n_teste = min(len(lista) - 1, max(1, round(fracao_teste * len(lista))))
+        teste.extend((usuario, foto) for foto in lista[:n_teste])
+        treino.extend((usuario, foto) for foto in lista[n_teste:])
+    return treino, teste, consultas_impostores
+
+
+def limiar_para(distancias_falsas, total, alvo):
+    """Maior limiar que aceita no máximo `alvo` * `total` das `distancias_falsas` (inf se não há o que barrar)"""
+    permitidas = int(math.floor(alvo * total + 1e-9))
+    falsas = np.sort(distancias_falsas)
+    return float(falsas[permitidas]) if permitidas < len(falsas) else math.inf
+
+
+def calibrar(genuinos, corretos, impostores, alvo):
+    """
+    Limiares (aceita se distância < limiar) para os níveis de confiança.
+    `genuinos`/`corretos`: distância e acerto da identidade de cada consulta
+    de cadastrado; `impostores`: distâncias das consultas de impostores.
+    """
+    trocas = genuinos[~corretos]
+
+    def limiar(a):
+        return min(limiar_para(impostores, len(impostores), a), limiar_para(trocas, len(genuinos), a))
+
+    return {'alta': limiar(0.0), 'permitido': limiar(alvo / 10.0), 'verificar': limiar(alvo)}
+
+
+def taxas(genuinos, corretos, impostores, limiar):
+    aceitos = genuinos < limiar
+    return {
+        'acuracia': float(np.mean(aceitos & corretos)) if len(genuinos) else 0.0,
+        'frr': float(np.mean(~aceitos)) if len(genuinos) else 0.0,
+        'trocas': float(np.mean(aceitos & ~corretos)) if len(genuinos) else 0.0,
+        'far': float(np.mean(impostores < limiar)) if len(impostores) else 0.0,
+    }
+
+
+def fronteira_pareto(resultados, custo='predict_ms', ganho='acuracia'):
+    """Índices das configurações que nenhuma outra supera em custo e ganho ao mesmo tempo"""
+    fronteira = []
+    for i, r in enumerate(resultados):
+        dominada = any(o[custo] <= r[custo] and o[ganho] >= r[ganho] and (o[custo] < r[custo] or o[ganho] > r[ganho])
+                       for o in resultados)
+        if not dominada:
+            fronteira.append(i)
+    return sorted(fronteira, key=lambda i: resultados[i][custo])
+
+
+def avaliar(configuracao, cinzas, treino, teste, impostores, pasta, far_alvo, repeticoes):
+    """Treina e avalia uma configuração; retorna o dicionário de medidas"""
+    tamanho, raio, vizinhos, (grid_x, grid_y), aumento = configuracao
+    receitas = CONJUNTOS_AUMENTO[aumento]
+    motor = MotorLBPH(raio, vizinhos, grid_x, grid_y)
+
+    inicio = time.perf_counter()
+    faces, rotulos = [], []
+    ids = {usuario: i for i, usuario in enumerate(sorted({u for u, _ in treino}))}
+    for usuario, foto in treino:
+        face = preprocessar(cinzas[foto], tamanho=(tamanho, tamanho))
+        for receita in receitas:
+            faces.append(aplicar_receita(face, receita))
+            rotulos.append(ids[usuario])
+    motor.treinar(faces, rotulos)
+    treino_s = time.perf_counter() - inicio
+
+    arquivo = os.path.join(pasta, 'modelo.lbph')
+    motor.salvar_binario(arquivo)
+    tamanho_mb = os.path.getsize(arquivo) / 1e6
+
+    consultas = [preprocessar(cinzas[foto], tamanho=(tamanho, tamanho)) for _, foto in teste]
+    consultas_impostores = [preprocessar(cinzas[foto], tamanho=(tamanho, tamanho)) for foto in impostores]
+    previstos, genuinos = motor.prever_lote(consultas)
+    corretos = previstos == np.array([ids[usuario] for usuario, _ in teste])
+    _, distancias_impostores = motor.prever_lote(consultas_impostores) if consultas_impostores else (None, np.empty(0))
+
+    melhor = math.inf
+    amostra = (consultas + consultas_impostores)[:20]
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for consulta in amostra:
+            motor.predict(consulta)
+        melhor = min(melhor, (time.perf_counter() - inicio) / len(amostra))
+
+    limiares = calibrar(genuinos, corretos, distancias_impostores, far_alvo)
+    resultado = {
+        'tamanho': tamanho, 'raio': raio, 'vizinhos': vizinhos, 'grade': f'{grid_x}x{grid_y}', 'aumento': aumento,
+        'amostras': len(faces),
+        'treino_s': round(treino_s, 3),
+        'modelo_mb': round(tamanho_mb, 2),
+        'predict_ms': round(1000.0 * melhor, 3),
+        'acuracia_rank1': round(float(np.mean(corretos)), 4),
+        'limiares': {nivel: (None if math.isinf(v) else round(v, 2)) for nivel, v in limiares.items()},
+    }
+    resultado.update({k: round(v, 4) for k, v in taxas(genuinos, corretos, distancias_impostores,
+                                                        limiares['verificar']).items()})
+    return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Varredura de parâmetros do LBPH com calibração de limiares")
+    parser.add_argument('--usuarios', default='users', help="Pasta users/ ou base empacotada")
+    parser.add_argument('--sintetico', type=int, default=12,
+                        help="Pessoas da base sintética usada quando --usuarios tem menos de 3 identidades")
+    parser.add_argument('--fotos-sinteticas', type=int, default=10)
+    parser.add_argument('--variacao', type=float, default=3.0,
+                        help="Intensidade das variações entre as fotos sintéticas de uma pessoa")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[100, 150, 250], help="Lado da face (px)")
+    parser.add_argument('--raios', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--vizinhos', type=int, nargs='+', default=[8])
+    parser.add_argument('--grades', type=ler_grade, nargs='+', default=[(8, 8), (4, 4)])
+    parser.add_argument('--aumentos', nargs='+', choices=list(CONJUNTOS_AUMENTO), default=list(CONJUNTOS_AUMENTO))
+    parser.add_argument('--fracao-teste', type=float, default=0.3, help="Fotos de cada cadastrado usadas no teste")
+    parser.add_argument('--impostores', type=int, default=None,
+                        help="Identidades fora do treino (padrão: 1/4 das identidades)")
+    parser.add_argument('--far-alvo', type=float, default=0.01, help="FAR e trocas máximas no limiar de decisão")
+    parser.add_argument('--acuracia-alvo', type=float, default=None,
+                        help="Indica a configuração mais rápida com pelo menos esta acurácia")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', default=None, help="Grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        fotos = {u: list(arquivos) for u, arquivos in escanear_usuarios(args.usuarios).items()} \
+            if os.path.exists(args.usuarios) else {}
+        origem = args.usuarios
+        if len([u for u, lista in fotos.items() if lista]) < 3:
+            print(f"⚠️  {args.usuarios} tem menos de 3 identidades: usando base sintética "
+                  f"({args.sintetico} pessoas x {args.fotos_sinteticas} fotos)")
+            origem = gerar_dataset(os.path.join(pasta, 'users'), args.sintetico, args.fotos_sinteticas,
+                                   semente=args.semente, variacao=args.variacao)
+            fotos = {u: list(arquivos) for u, arquivos in escanear_usuarios(origem).items()}
+
+        impostores = args.impostores if args.impostores is not None else max(1, len(fotos) // 4)
+        treino, teste, consultas_impostores = dividir(fotos, args.fracao_teste, impostores,
+                                                      np.random.default_rng(args.semente))
+        if not teste or not treino:
+            print("❌ Fotos insuficientes: cada identidade cadastrada precisa de pelo menos 2 fotos")
+            return None
+        cinzas = {foto: para_cinza(ler_imagem(foto)) for lista in fotos.values() for foto in lista}
+        print(f"Treino: {len(treino)} fotos | teste: {len(teste)} fotos de cadastrados, "
+              f"{len(consultas_impostores)} de {impostores} impostor(es)")
+
+        configuracoes = [(t, r, v, g, a) for t in args.tamanhos for r in args.raios for v in args.vizinhos
+                         for g in args.grades for a in args.aumentos]
+        resultados = []
+        for i, configuracao in enumerate(configuracoes, 1):
+            resultados.append(avaliar(configuracao, cinzas, treino, teste, consultas_impostores, pasta,
+                                      args.far_alvo, args.repeticoes))
+            print(f"\r{i}/{len(configuracoes)} configurações", end='', flush=True)
+        print()
+
+    pareto = fronteira_pareto(resultados)
+    for i, r in enumerate(resultados):
+        r['pareto'] = i in pareto
+
+    print(f"\n{'tam':>4} {'raio':>4} {'viz':>3} {'grade':>5} {'aumento':>9} {'treino s':>8} {'MB':>6} "
+          f"{'predict ms':>10} {'acurácia':>8} {'FAR':>6} {'FRR':>6} {'limiar':>7}  pareto")
+    for r in sorted(resultados, key=lambda r: r['predict_ms']):
+        limiar = r['limiares']['verificar']
+        print(f"{r['tamanho']:>4} {r['raio']:>4} {r['vizinhos']:>3} {r['grade']:>5} {r['aumento']:>9} "
+              f"{r['treino_s']:>8.2f} {r['modelo_mb']:>6.2f} {r['predict_ms']:>10.2f} {r['acuracia']:>8.3f} "
+              f"{r['far']:>6.3f} {r['frr']:>6.3f} {'-' if limiar is None else f'{limiar:.1f}':>7}  "
+              f"{'*' if r['pareto'] else ''}")
+
+    escolhida = None
+    if args.acuracia_alvo is not None:
+        candidatas = [resultados[i] for i in pareto if resultados[i]['acuracia'] >= args.acuracia_alvo]
+        if candidatas:
+            escolhida = candidatas[0]
+            print(f"\n✅ Mais rápida com acurácia >= {args.acuracia_alvo:.2f}: tamanho {escolhida['tamanho']}, "
+                  f"raio {escolhida['raio']}, vizinhos {escolhida['vizinhos']}, grade {escolhida['grade']}, "
+                  f"aumento {escolhida['aumento']} (limiares {escolhida['limiares']})")
+        else:
+            print(f"\n⚠️  Nenhuma configuração atingiu acurácia {args.acuracia_alvo:.2f}")
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump({'origem': origem, 'far_alvo': args.far_alvo, 'configuracoes': resultados,
+                       'escolhida': escolhida}, f, indent=2, ensure_ascii=False)
+    return resultados
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,152 @@
+"""
+Cache em disco dos histogramas LBPH de cada foto de treino.
+
+Quase nenhuma foto de users/<nome>/ muda entre um treinamento e outro, mas
+decodificar, aumentar e calcular o LBP de cada variação é a parte cara do
+`treinar.py`. Aqui os histogramas das variações de cada foto ficam em
+`<pasta>/<parametros>/<hash da foto>.npy`:
+
+- o hash é o do conteúdo da foto (o mesmo do manifesto de treino);
+- `<parametros>` resume a versão da receita de aumento, o tamanho da face e
+  os parâmetros do LBPH; ao mudar qualquer um deles, o cache antigo é apagado;
+- a pasta do cache é só dele: se tiver qualquer outra coisa (por exemplo
+  `--cache .`), o cache se recusa a usá-la em vez de apagar o que não é seu;
+- o tamanho total é limitado a `limite_mb`, descartando primeiro as
+  entradas usadas há mais tempo (LRU pela data de modificação, renovada a
+  cada acerto).
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+
+PASTA_CACHE = '.cache_treino'
+# Marca de uma entrada do cache (gravada dentro de `<pasta>/<parametros>/`)
+ARQUIVO_PARAMETROS = 'parametros.json'
+PADRAO_ENTRADA = re.compile(r'[0-9a-f]{16}')
+
+
+def chave_parametros(parametros):
+    """Resumo curto e estável dos parâmetros que definem os histogramas"""
+    texto = json.dumps(parametros, sort_keys=True)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:16]
+
+
+def entrada_cache(caminho):
+    """Se `caminho` é a pasta de uma entrada do cache (para um conjunto de parâmetros)"""
+    return (PADRAO_ENTRADA.fullmatch(os.path.basename(caminho)) is not None
+            and os.path.isfile(os.path.join(caminho, ARQUIVO_PARAMETROS)))
+
+
+class CacheCaracteristicas:
+    """Histogramas por foto, indexados pelo hash do conteúdo"""
+
+    def __init__(self, parametros, pasta=PASTA_CACHE, limite_mb=2048):
+        self.pasta_raiz = pasta
+        self.pasta = os.path.join(pasta, chave_parametros(parametros))
+        self.limite = int(limite_mb * 1e6)
+        self.acertos = 0
+        self.falhas = 0
+        self.descartados = 0
+        self._invalidar_antigos()
+        os.makedirs(self.pasta, exist_ok=True)
+        with open(os.path.join(self.pasta, ARQUIVO_PARAMETROS), 'w', encoding='utf-8') as f:
+            json.dump(parametros, f)
+
+        # {hash: (momento do último uso, bytes)}
+        self._entradas = {}
+        for arquivo in os.listdir(self.pasta):
+            if arquivo.endswith('.npy'):
+                info = os.stat(os.path.join(self.pasta, arquivo))
+                self._entradas[arquivo[:-4]] = (info.st_mtime, info.st_size)
+        self.tamanho = sum(tamanho for _, tamanho in self._entradas.values())
+        if self.tamanho > self.limite:
+            # O limite pode ter sido reduzido desde a última execução
+            self._despejar()
+
+    def _invalidar_antigos(self):
+        """
+        Apaga os caches gerados com outros parâmetros. Só mexe na pasta se
+        tudo nela for entrada de cache (nome de 16 hexadecimais com
+        `parametros.json` dentro); caso contrário levanta ValueError.
+        """
+        if not os.path.isdir(self.pasta_raiz):
+            return
+        atual = os.path.basename(self.pasta)
+        nomes = os.listdir(self.pasta_raiz)
+        estranhos = [nome for nome in nomes if not entrada_cache(os.path.join(self.pasta_raiz, nome))
+                     and not (nome == atual and os.path.isdir(os.path.join(self.pasta_raiz, nome)))]
+        if estranhos:
+            raise ValueError(f"{self.pasta_raiz} não é uma pasta de cache (contém "
+                             f"{', '.join(sorted(estranhos)[:5])}); use uma pasta vazia e exclusiva para o cache")
+        for nome in nomes:
+            if nome != atual:
+                shutil.rmtree(os.path.join(self.pasta_raiz, nome), ignore_errors=True)
+
+    def _caminho(self, hash_imagem):
+        return os.path.join(self.pasta, hash_imagem + '.npy')
+
+    def __contains__(self, hash_imagem):
+        return hash_imagem in self._entradas
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obter(self, hash_imagem):
+        """Histogramas da foto ou None se não estiverem no cache"""
+        if hash_imagem not in self._entradas:
+            self.falhas += 1
+            return None
+        caminho = self._caminho(hash_imagem)
+        try:
+            histogramas = np.load(caminho)
+            os.utime(caminho)
+        except (OSError, ValueError):
+            # Entrada corrompida ou apagada por fora: trata como ausente
+            self._remover(hash_imagem)
+            self.falhas += 1
+            return None
+        self._entradas[hash_imagem] = (os.stat(caminho).st_mtime, self._entradas[hash_imagem][1])
+        self.acertos += 1
+        return histogramas
+
+    def guardar(self, hash_imagem, histogramas):
+        caminho = self._caminho(hash_imagem)
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as f:
+            np.save(f, np.ascontiguousarray(histogramas, np.float32))
+        os.replace(temporario, caminho)
+        if hash_imagem in self._entradas:
+            self.tamanho -= self._entradas[hash_imagem][1]
+        info = os.stat(caminho)
+        self._entradas[hash_imagem] = (info.st_mtime, info.st_size)
+        self.tamanho += info.st_size
+        if self.tamanho > self.limite:
+            self._despejar()
+
+    def _despejar(self):
+        """Remove as entradas menos usadas até o cache ocupar 90% do limite"""
+        alvo = 0.9 * self.limite
+        for hash_imagem, _ in sorted(self._entradas.items(), key=lambda item: item[1][0]):
+            if self.tamanho <= alvo:
+                break
+            self._remover(hash_imagem)
+            self.descartados += 1
+
+    def _remover(self, hash_imagem):
+        _, tamanho = self._entradas.pop(hash_imagem, (0, 0))
+        self.tamanho -= tamanho
+        try:
+            os.remove(self._caminho(hash_imagem))
+        except OSError:
+            pass
+
+    def resumo(self):
+        consultas = self.acertos + self.falhas
+        taxa = 100.0 * self.acertos / consultas if consultas else 0.0
+        return (f"Cache: {self.acertos} acertos, {self.falhas} faltas ({taxa:.0f}% de acerto), "
+                f"{self.descartados} descartados | {len(self)} fotos, "
+                f"{self.tamanho / 1e6:.1f} de {self.limite / 1e6:.0f} MB em {self.pasta}")
@@ -1,12 +1,21 @@
 # Importa as bibliotecas necessárias
 import cv2
 import os
+import argparse
 import numpy as np
 
-def listar_usuarios(users_folder):
+from base_faces import BaseFaces
+from deteccao import BACKENDS, DetectorFaces, configuracao_deteccao
+from fontes import abrir_fonte
+from qualidade import LIMIAR_REPETICAO, NITIDEZ_MINIMA, hash_perceptual, hashes_da_pasta, mais_proxima, nitidez
+
+def listar_usuarios(users_folder, base=None):
     """
-    Lista todos os usuários cadastrados e suas quantidades de fotos.
+    Lista todos os usuários cadastrados e suas quantidades de fotos
+    (da pasta `users_folder` ou, se informada, da base empacotada `base`).
     """
+    if base is not None:
+        return base.usuarios()
     if not os.path.exists(users_folder):
         return []
     
@@ -20,11 +29,11 @@ def listar_usuarios(users_folder):
     
     return sorted(usuarios)
 
-def mostrar_menu_usuarios(users_folder):
+def mostrar_menu_usuarios(users_folder, base=None):
     """
     Mostra o menu de seleção de usuários.
     """
-    usuarios = listar_usuarios(users_folder)
+    usuarios = listar_usuarios(users_folder, base)
     
     print("\n" + "="*60)
     print("🎯 SISTEMA DE CADASTRO PARA RECONHECIMENTO FACIAL")
@@ -88,20 +97,150 @@ def mostrar_menu_usuarios(users_folder):
             except ValueError:
                 print("❌ Digite apenas números!")
 
-def main():
+def recortar_face(frame, face, margem=0.2, tamanho=(300, 300)):
+    """Recorta a face com `margem` de cada lado e redimensiona para o tamanho das fotos salvas"""
+    (x, y, w, h) = face
+    margin = int(margem * w)
+    x = max(0, x - margin)
+    y = max(0, y - margin)
+    w = min(frame.shape[1] - x, w + 2*margin)
+    h = min(frame.shape[0] - y, h + 2*margin)
+    return cv2.resize(frame[y:y+h, x:x+w], tamanho)
+
+def proximo_arquivo(user_folder, nome_usuario):
+    """Caminho da próxima foto do usuário (nome_001.png, nome_002.png, ...)"""
+    photo_number = len([f for f in os.listdir(user_folder) if f.endswith('.png')]) + 1
+    while os.path.exists(os.path.join(user_folder, f"{nome_usuario}_{photo_number:03d}.png")):
+        photo_number += 1
+    return os.path.join(user_folder, f"{nome_usuario}_{photo_number:03d}.png")
+
+def capturar_rajada(cap, user_folder, nome_usuario, quantidade=10, face_min=100, nitidez_minima=NITIDEZ_MINIMA,
+                    limiar_repeticao=LIMIAR_REPETICAO, exibir=True, max_quadros=None, detector=None, base=None,
+                    backend='haar', opcoes_backend=None):
+    """
+    Modo rajada: captura sozinho, do vídeo ao vivo, até `quantidade` fotos
+    boas e diferentes entre si. Cada quadro com exatamente um rosto é
+    avaliado e descartado se:
+    
+    - o rosto tiver menos de `face_min` pixels de lado (pessoa longe);
+    - a nitidez (variância do Laplaciano) ficar abaixo de `nitidez_minima`;
+    - o hash perceptual estiver a `limiar_repeticao` bits ou menos de alguma
+      foto já salva do usuário (inclusive as desta rajada).
+    
+    Com `base` (BaseFaces) as fotos são acrescentadas à base empacotada em
+    vez de gravadas em `user_folder`. Sem `detector`, a detecção usa o
+    `backend` (ver `deteccao.BACKENDS`). Retorna (arquivos ou referências
+    salvos, rejeições por motivo).
+    """
+    # Detecta também rostos menores que `face_min` para poder pedir que a pessoa se aproxime
+    detector = detector or DetectorFaces(largura_deteccao=320, face_min=min(60, face_min), backend=backend,
+                                         opcoes_backend=opcoes_backend)
+    hashes = base.hashes_perceptuais(nome_usuario) if base is not None else hashes_da_pasta(user_folder)
+    salvos = []
+    rejeicoes = {'sem_rosto': 0, 'multiplos': 0, 'pequeno': 0, 'borrado': 0, 'repetido': 0}
+    mensagens = {'sem_rosto': "Nenhum rosto", 'multiplos': "Apenas uma pessoa por vez", 'pequeno': "Aproxime-se",
+                 'borrado': "Fique parado (foto borrada)", 'repetido': "Mude um pouco a pose"}
+    quadros = 0
+    print(f"\n📸 Modo rajada: capturando {quantidade} fotos de {nome_usuario} (Q para parar)")
+    
+    while len(salvos) < quantidade and (max_quadros is None or quadros < max_quadros):
+        ret, frame = cap.read()
+        if not ret:
+            print("Fim da fonte de vídeo")
+            break
+        quadros += 1
+        
+        faces = detector.detectar(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        motivo = None
+        if len(faces) != 1:
+            motivo = 'sem_rosto' if len(faces) == 0 else 'multiplos'
+        elif min(faces[0][2], faces[0][3]) < face_min:
+            motivo = 'pequeno'
+        else:
+            face_img = recortar_face(frame, faces[0])
+            valor = nitidez(face_img)
+            if valor < nitidez_minima:
+                motivo = 'borrado'
+            else:
+                hash_face = hash_perceptual(face_img)
+                distancia = mais_proxima(hash_face, hashes)
+                if distancia is not None and distancia <= limiar_repeticao:
+                    motivo = 'repetido'
+                else:
+                    if base is not None:
+                        filepath = base.acrescentar(nome_usuario, [face_img], [hash_face])[0]
+                    else:
+                        filepath = proximo_arquivo(user_folder, nome_usuario)
+                        cv2.imwrite(filepath, face_img)
+                    hashes.append(hash_face)
+                    salvos.append(filepath)
+                    print(f"✅ {len(salvos)}/{quantidade} {os.path.basename(filepath)} "
+                          f"(nitidez {valor:.0f}, distância {'-' if distancia is None else distancia})")
+        if motivo is not None:
+            rejeicoes[motivo] += 1
+        
+        if exibir:
+            for (x, y, w, h) in faces:
+                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0) if motivo is None else (0, 165, 255), 2)
+            cv2.putText(frame, f"RAJADA {len(salvos)}/{quantidade}", (20, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+            if motivo is not None:
+                cv2.putText(frame, mensagens[motivo], (20, 65), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2)
+            cv2.imshow('Webcam Feed', frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    
+    print(f"📊 {len(salvos)} fotos salvas em {quadros} quadros | rejeitados: "
+          + ", ".join(f"{motivo} {total}" for motivo, total in rejeicoes.items()))
+    return salvos, rejeicoes
+
+def main(fonte=0, rajada=False, quantidade=10, face_min=100, nitidez_minima=NITIDEZ_MINIMA,
+         limiar_repeticao=LIMIAR_REPETICAO, base=None, backend=None, exibir=True, max_quadros=None,
+         modelo_yunet=None, usuario=None):
     """
     Função principal para capturar e exibir o feed da webcam.
+    `fonte` aceita também um arquivo de vídeo ou uma pasta de imagens (ver `fontes.abrir_fonte`).
+    Com `rajada=True` as fotos são capturadas automaticamente (ver `capturar_rajada`).
+    Com `base` (pasta) as fotos vão para a base empacotada em vez de users/<nome>/.
+    `backend` escolhe o detector de faces; None usa o mesmo do reconhecimento
+    (ver `deteccao.configuracao_deteccao`), mas com a redução e os tamanhos
+    de face próprios do cadastro; `modelo_yunet` é o .onnx da YuNet.
+    Com `usuario` as fotos vão para esse usuário (existente ou novo) sem
+    passar pelo menu interativo.
+    Com `exibir=False` não abre janela; só o modo rajada funciona assim, já
+    que o manual depende das teclas, e o `usuario` é obrigatório para o
+    cadastro rodar sem ninguém no terminal. `max_quadros` encerra a captura
+    depois desse número de quadros.
     """
-    # Carrega o classificador para detecção facial
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    if not exibir and not rajada:
+        print("❌ O cadastro manual precisa da janela de vídeo (teclas ESPAÇO/Q); use --rajada com --sem-janela")
+        return
+    if not exibir and usuario is None:
+        print("❌ Sem janela, informe o usuário com --usuario (o menu interativo não é usado)")
+        return
+    if usuario is not None:
+        usuario = usuario.strip()
+        if not usuario or usuario in ('.', '..') or os.sep in usuario or '/' in usuario:
+            print(f"❌ Nome de usuário inválido: {usuario!r}")
+            return
+    backend, opcoes_backend, _ = configuracao_deteccao(backend, modelo_yunet=modelo_yunet)
+    # Detector facial: no cadastro a face ocupa boa parte do quadro, então a
+    # detecção roda em 320 px de largura só para faces de 100 px ou mais
+    detector = DetectorFaces(largura_deteccao=320, face_min=100, backend=backend, opcoes_backend=opcoes_backend)
     
-    # Cria a pasta 'users' se ela não existir
+    # Cria a pasta 'users' (ou a base empacotada) se ela não existir
     users_folder = "users"
-    if not os.path.exists(users_folder):
+    if base is not None:
+        base = BaseFaces(base, criar=True)
+    elif not os.path.exists(users_folder):
         os.makedirs(users_folder)
     
-    # Mostra o menu de seleção de usuários
-    nome_usuario = mostrar_menu_usuarios(users_folder)
+    # Mostra o menu de seleção de usuários (a menos que o usuário já tenha sido informado)
+    if usuario is not None:
+        nome_usuario = usuario
+        fotos = dict(listar_usuarios(users_folder, base)).get(usuario)
+        print(f"\n✅ Usuário: {usuario} ({'novo' if fotos is None else f'{fotos} fotos'})")
+    else:
+        nome_usuario = mostrar_menu_usuarios(users_folder, base)
     
     if nome_usuario is None:
         print("\n👋 Programa encerrado.")
@@ -109,7 +248,7 @@ def main():
     
     # Inicializa a captura de vídeo da webcam padrão (geralmente o índice 0)
     # Se você tiver mais de uma webcam, pode precisar usar 1, 2, etc.
-    cap = cv2.VideoCapture(0)
+    cap = abrir_fonte(fonte)
 
     # Verifica se a webcam foi aberta corretamente
     if not cap.isOpened():
@@ -118,21 +257,37 @@ def main():
 
     # Cria a pasta do usuário se ela não existir
     user_folder = os.path.join(users_folder, nome_usuario)
-    if not os.path.exists(user_folder):
+    if base is None and not os.path.exists(user_folder):
         os.makedirs(user_folder)
     
     # Conta fotos existentes
-    existing_photos = len([f for f in os.listdir(user_folder) if f.endswith('.png')])
+    if base is not None:
+        existing_photos = base.total(nome_usuario)
+    else:
+        existing_photos = len([f for f in os.listdir(user_folder) if f.endswith('.png')])
     
     print(f"\n📷 Modo de captura iniciado para: {nome_usuario}")
     print(f"📊 Fotos existentes: {existing_photos}")
+    
+    if rajada:
+        capturar_rajada(cap, user_folder, nome_usuario, quantidade, face_min, nitidez_minima, limiar_repeticao,
+                        exibir=exibir, max_quadros=max_quadros, base=base, backend=backend,
+                        opcoes_backend=opcoes_backend)
+        cap.release()
+        if exibir:
+            cv2.destroyAllWindows()
+        print("Feed encerrado.")
+        return
+    
     print("\nControles:")
     print("ESPAÇO - Capturar nova foto")
     print("Q - Sair do programa")
     print("\n* Mantenha o foco na janela do vídeo para usar os controles *")
 
-    # Loop infinito para ler os frames da webcam
-    while True:
+    # Loop infinito para ler os frames da webcam (ou até `max_quadros`)
+    quadros = 0
+    while max_quadros is None or quadros < max_quadros:
+        quadros += 1
         # Lê um único frame da webcam
         # 'ret' é um booleano (True/False) que indica se a leitura foi bem-sucedida
         # 'frame' é a imagem (array NumPy) capturada
@@ -162,12 +317,7 @@ def main():
             gray = cv2.cvtColor(captured_photo, cv2.COLOR_BGR2GRAY)
             
             # Detecta faces na imagem
-            faces = face_cascade.detectMultiScale(
-                gray,
-                scaleFactor=1.1,
-                minNeighbors=5,
-                minSize=(100, 100)  # Tamanho mínimo da face
-            )
+            faces = detector.detectar(gray)
             
             if len(faces) == 0:
                 # Se nenhuma face for detectada, mostra mensagem e continua
@@ -186,21 +336,8 @@ def main():
                 cv2.waitKey(2000)  # Mostra por 2 segundos
                 continue
             
-            # Pega a primeira (e única) face detectada
-            (x, y, w, h) = faces[0]
-            
-            # Adiciona uma margem ao redor do rosto (20% de cada lado)
-            margin = int(0.2 * w)
-            x = max(0, x - margin)
-            y = max(0, y - margin)
-            w = min(captured_photo.shape[1] - x, w + 2*margin)
-            h = min(captured_photo.shape[0] - y, h + 2*margin)
-            
-            # Recorta apenas a região do rosto com a margem
-            face_img = captured_photo[y:y+h, x:x+w]
-
-            # Redimensiona para um tamanho padrão (por exemplo, 300x300)
-            face_img = cv2.resize(face_img, (300, 300))
+            # Recorta a primeira (e única) face detectada, com 20% de margem de cada lado, em 300x300
+            face_img = recortar_face(captured_photo, faces[0])
             
             # Atualiza a foto capturada para conter apenas o rosto
             captured_photo = face_img.copy()
@@ -248,7 +385,12 @@ def main():
                     print("="*50)
                     nome_pessoa = nome_usuario
                     
-                    if nome_pessoa:
+                    if nome_pessoa and base is not None:
+                        # Acrescenta a foto ao arquivo do usuário na base empacotada
+                        filepath = base.acrescentar(nome_pessoa, [captured_photo])[0]
+                        filename = os.path.basename(filepath)
+                        photo_number = base.total(nome_pessoa)
+                    elif nome_pessoa:
                         # Cria uma pasta para o usuário se ela não existir
                         user_folder = os.path.join(users_folder, nome_pessoa)
                         if not os.path.exists(user_folder):
@@ -262,7 +404,8 @@ def main():
                         filename = f"{nome_pessoa}_{photo_number:03d}.png"
                         filepath = os.path.join(user_folder, filename)
                         cv2.imwrite(filepath, captured_photo)
-                        
+                    
+                    if nome_pessoa:
                         # Mostra confirmação na tela
                         confirm_image = captured_photo.copy()
                         cv2.putText(confirm_image, f"FOTO {photo_number} SALVA!", (50, 50), font, 0.8, (0, 255, 0), 2)
@@ -306,4 +449,28 @@ def main():
     print("Feed encerrado.")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cadastro de fotos para o reconhecimento facial")
+    parser.add_argument('--fonte', default=0,
+                        help="Índice da câmera, arquivo de vídeo ou pasta de imagens")
+    parser.add_argument('--rajada', action='store_true',
+                        help="Captura automática: salva fotos nítidas e diferentes até atingir --quantidade")
+    parser.add_argument('--quantidade', type=int, default=10, help="Fotos a coletar no modo rajada")
+    parser.add_argument('--face-min', type=int, default=100, help="Menor lado de rosto aceito no modo rajada (pixels)")
+    parser.add_argument('--nitidez-min', dest='nitidez_minima', type=float, default=NITIDEZ_MINIMA,
+                        help="Nitidez mínima (variância do Laplaciano) no modo rajada")
+    parser.add_argument('--limiar-repeticao', type=int, default=LIMIAR_REPETICAO,
+                        help="Distância máxima (bits do hash perceptual) para considerar a foto repetida")
+    parser.add_argument('--base', default=None,
+                        help="Salva as fotos na base empacotada desta pasta (ver base_faces.py) em vez de users/")
+    parser.add_argument('--backend', choices=list(BACKENDS), default=None,
+                        help="Detector de faces (padrão: o gravado por benchmarks.backends em deteccao.json, ou haar)")
+    parser.add_argument('--modelo-yunet', default=None,
+                        help="Caminho do modelo .onnx da YuNet (padrão: o de deteccao.json ou modelos/)")
+    parser.add_argument('--usuario', default=None,
+                        help="Cadastra fotos deste usuário (existente ou novo) sem o menu interativo")
+    parser.add_argument('--sem-janela', dest='exibir', action='store_false',
+                        help="Roda sem exibir a janela de vídeo (só com --rajada e --usuario; servidores sem display)")
+    parser.add_argument('--max-quadros', type=int, default=None,
+                        help="Encerra a captura após este número de quadros")
+    args = parser.parse_args()
+    main(**vars(args))
\ No newline at end of file
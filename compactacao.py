@@ -0,0 +1,259 @@
+"""
+Compactação da galeria do LBPH depois do treinamento.
+
+Cada foto cadastrada vira FATOR_AUMENTO histogramas na galeria, e as
+variações de gamma/exposição de uma mesma foto ficam a distâncias de 1-3
+entre si (fotos diferentes da mesma pessoa ficam a 25 ou mais). O `predict`
+e o tamanho do modelo crescem com todas elas. A compactação:
+
+1. remove histogramas idênticos e quase idênticos (distância qui-quadrado
+   abaixo de `limiar_duplicata` de uma amostra já mantida entre as
+   `janela` anteriores: as variações de uma foto ficam vizinhas na galeria);
+2. reduz cada identidade a no máximo `prototipos` amostras: k-médias
+   qui-quadrado (`indice.agrupar_prototipos`) e, de cada grupo, a amostra
+   mais próxima do centro (medoide). Os protótipos são histogramas reais,
+   então as distâncias e os limiares do detector continuam na mesma escala.
+
+O modelo compacto substitui os arquivos do modelo treinado (.yml, .lbph com
+os nomes embutidos e índice, cada um gravado de forma atômica) e uma nova
+versão desse mesmo modelo é publicada: detectores, serviço e supervisor em
+execução passam a usá-lo sem reiniciar. `--saida` grava em outro modelo. O
+treinamento faz o mesmo com `python treinar.py --compactar 16`. A
+compactação vem com um relatório de tamanho, latência e da diferença de
+acurácia medida em fotos separadas do treino (`--usuarios`).
+
+Depois da compactação a galeria não corresponde mais ao manifesto de
+treino, então o próximo `treinar.py --incremental` com mudanças refaz o
+treinamento completo (com os histogramas vindos do cache).
+
+Uso:
+    python compactacao.py --modelo classificador.yml --prototipos 16
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from detector import classificar_confianca
+from indice import IndiceIdentidades, agrupar_prototipos, caminho_indice
+from lbph import MotorLBPH, distancia_qui_quadrado
+from manifesto_treino import escanear_usuarios
+from modelo_binario import caminho_binario
+from preprocessamento import carregar_face
+from publicacao import publicar_versao, salvar_json_atomico
+from treinar import FATOR_AUMENTO, criar_motor, processar_imagem
+
+PROTOTIPOS_PADRAO = 16
+# Abaixo desta distância qui-quadrado duas amostras são consideradas a mesma
+LIMIAR_DUPLICATA = 3.0
+
+
+def remover_duplicatas(amostras, limiar=LIMIAR_DUPLICATA, janela=FATOR_AUMENTO):
+    """Índices das amostras mantidas: sem repetidas e sem quase repetidas das `janela` anteriores"""
+    amostras = np.asarray(amostras, np.float32)
+    _, primeiras = np.unique(amostras, axis=0, return_index=True)
+    unicas = np.zeros(len(amostras), bool)
+    unicas[primeiras] = True
+    mantidas = []
+    for i in np.flatnonzero(unicas):
+        vizinhas = [j for j in mantidas[-janela:] if i - j <= janela]
+        if vizinhas and distancia_qui_quadrado(amostras[i], amostras[vizinhas]).min() < limiar:
+            continue
+        mantidas.append(i)
+    return np.asarray(mantidas, np.int64)
+
+
+def medoides(amostras, k, semente=0):
+    """Índices de até `k` amostras representativas (a mais próxima de cada centro do k-médias)"""
+    if len(amostras) <= k:
+        return np.arange(len(amostras))
+    centros = agrupar_prototipos(amostras, k, semente=semente)
+    distancias = distancia_qui_quadrado(centros, amostras)
+    escolhidas = []
+    for linha in distancias:
+        for j in np.argsort(linha):
+            if j not in escolhidas:
+                escolhidas.append(int(j))
+                break
+    return np.sort(np.asarray(escolhidas, np.int64))
+
+
+def compactar(motor, prototipos=PROTOTIPOS_PADRAO, limiar_duplicata=LIMIAR_DUPLICATA, janela=FATOR_AUMENTO,
+              semente=0):
+    """
+    Retorna (motor_compacto, estatisticas). `prototipos` None ou 0 só remove
+    as duplicatas.
+    """
+    fins = np.append(motor.inicios[1:], motor.galeria.shape[0])
+    selecionadas = []
+    duplicatas = 0
+    for inicio, fim in zip(motor.inicios, fins):
+        amostras = np.asarray(motor.galeria[inicio:fim], np.float32)
+        mantidas = remover_duplicatas(amostras, limiar_duplicata, janela)
+        duplicatas += len(amostras) - len(mantidas)
+        if prototipos:
+            mantidas = mantidas[medoides(amostras[mantidas], prototipos, semente)]
+        selecionadas.append(inicio + mantidas)
+    indices = np.concatenate(selecionadas) if selecionadas else np.empty(0, np.int64)
+
+    compacto = MotorLBPH(motor.raio, motor.vizinhos, motor.grid_x, motor.grid_y, motor.limiar)
+    compacto.definir_galeria(np.asarray(motor.galeria[indices], np.float32), motor.rotulos[indices])
+    compacto.nomes = motor.nomes
+    estatisticas = {'amostras_antes': int(motor.galeria.shape[0]), 'duplicatas': int(duplicatas),
+                    'amostras_depois': int(compacto.galeria.shape[0]), 'identidades': int(len(motor.identidades))}
+    return compacto, estatisticas
+
+
+def salvar_compacto(motor, destino, nomes):
+    """Grava o modelo compacto como os do treinamento (.yml, .lbph e índice); a versão é publicada à parte"""
+    motor.salvar_yml(destino)
+    motor.salvar_binario(caminho_binario(destino), nomes)
+    IndiceIdentidades(motor).construir().salvar(caminho_indice(destino))
+
+
+def publicar_compacto(destino, nomes, estatisticas):
+    """Publica uma nova versão de `destino`, com as estatísticas da compactação no selo"""
+    return publicar_versao(destino, modo='compactacao', amostras=estatisticas['amostras_depois'], pessoas=len(nomes),
+                           **{k: v for k, v in estatisticas.items() if k != 'amostras_depois'})
+
+
+def latencia_ms(motor, histogramas, repeticoes=3):
+    """Menor tempo médio (ms) da busca de uma consulta, sem o cálculo do LBP"""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for h in histogramas:
+            motor.prever_histogramas(h)
+        melhor = min(melhor, (time.perf_counter() - inicio) / len(histogramas))
+    return 1000.0 * melhor
+
+
+def acertos(motor, histogramas, esperados):
+    """Consultas reconhecidas como a pessoa certa e liberadas pelo `classificar_confianca` do detector"""
+    rotulos, distancias = motor.prever_histogramas(histogramas)
+    return sum(int(r) == e and classificar_confianca('', float(d))[3]
+               for r, d, e in zip(rotulos, distancias, esperados))
+
+
+def validar(path, prototipos, limiar_duplicata, fracao_teste=0.3, semente=0):
+    """
+    Treina em parte das fotos de `path`, compacta e compara os dois modelos
+    nas fotos separadas. Retorna o relatório e os histogramas de teste.
+    """
+    rng = np.random.default_rng(semente)
+    treino, teste = [], []
+    for id_usuario, (usuario, arquivos) in enumerate(sorted(escanear_usuarios(path).items())):
+        fotos = sorted(arquivos)
+        if len(fotos) < 2:
+            continue
+        fotos = [fotos[i] for i in rng.permutation(len(fotos))]
+        n_teste = min(len(fotos) - 1, max(1, round(fracao_teste * len(fotos))))
+        teste.extend((id_usuario, foto) for foto in fotos[:n_teste])
+        treino.extend((id_usuario, foto) for foto in fotos[n_teste:])
+    if not teste:
+        return None, None
+
+    faces, rotulos = [], []
+    for id_usuario, foto in treino:
+        variacoes = processar_imagem(foto)
+        faces.extend(variacoes)
+        rotulos.extend([id_usuario] * len(variacoes))
+    completo = criar_motor()
+    completo.treinar(faces, rotulos)
+    compacto, _ = compactar(completo, prototipos, limiar_duplicata, semente=semente)
+
+    histogramas = completo.histogramas([carregar_face(foto) for _, foto in teste])
+    esperados = [id_usuario for id_usuario, _ in teste]
+    rotulos_completo, _ = completo.prever_histogramas(histogramas)
+    rotulos_compacto, _ = compacto.prever_histogramas(histogramas)
+    acuracia_antes = acertos(completo, histogramas, esperados) / len(teste)
+    acuracia_depois = acertos(compacto, histogramas, esperados) / len(teste)
+    return {
+        'fotos_treino': len(treino),
+        'fotos_teste': len(teste),
+        'acuracia_antes': round(acuracia_antes, 4),
+        'acuracia_depois': round(acuracia_depois, 4),
+        'delta_acuracia': round(acuracia_depois - acuracia_antes, 4),
+        'identidades_iguais': f"{int(np.sum(rotulos_completo == rotulos_compacto))}/{len(teste)}",
+    }, histogramas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compactação da galeria do LBPH em protótipos por identidade")
+    parser.add_argument('--modelo', default='classificador.yml', help="Modelo treinado (.yml ou .lbph)")
+    parser.add_argument('--nomes', default='nomes.json')
+    parser.add_argument('--saida', default=None,
+                        help="Grava o modelo compacto em outro lugar (padrão: substitui o --modelo e publica a versão)")
+    parser.add_argument('--prototipos', type=int, default=PROTOTIPOS_PADRAO,
+                        help="Amostras mantidas por identidade (0 = só remove duplicatas)")
+    parser.add_argument('--limiar-duplicata', type=float, default=LIMIAR_DUPLICATA,
+                        help="Distância abaixo da qual duas amostras são consideradas a mesma")
+    parser.add_argument('--usuarios', default='users', help="Fotos usadas na validação (separadas em treino/teste)")
+    parser.add_argument('--fracao-teste', type=float, default=0.3)
+    parser.add_argument('--sem-validacao', action='store_true', help="Não mede a diferença de acurácia")
+    parser.add_argument('--relatorio', default=None, help="Relatório JSON (padrão: <saida>.compactacao.json)")
+    args = parser.parse_args(argv)
+
+    modelo = args.modelo
+    destino = os.path.splitext(args.saida or modelo)[0] + '.yml'
+    original_lbph = caminho_binario(modelo)
+    tamanho_antes = os.path.getsize(original_lbph) if os.path.exists(original_lbph) else os.path.getsize(modelo)
+    motor = MotorLBPH.carregar(modelo)
+    nomes = motor.nomes
+    if nomes is None:
+        with open(args.nomes, 'r') as f:
+            nomes = json.load(f)
+
+    inicio = time.perf_counter()
+    compacto, estatisticas = compactar(motor, args.prototipos, args.limiar_duplicata)
+    print(f"✓ Galeria compactada em {time.perf_counter() - inicio:.1f} s: {estatisticas['amostras_antes']} -> "
+          f"{estatisticas['amostras_depois']} amostras ({estatisticas['duplicatas']} duplicatas)")
+    salvar_compacto(compacto, destino, nomes)
+    selo = publicar_compacto(destino, nomes, estatisticas)
+    print(f"✓ Modelo compacto salvo em {destino} e {caminho_binario(destino)} (versão {selo['versao']} publicada)")
+
+    relatorio = {
+        'modelo': modelo,
+        'compacto': caminho_binario(destino),
+        'prototipos': args.prototipos,
+        'limiar_duplicata': args.limiar_duplicata,
+        **estatisticas,
+        'modelo_mb_antes': round(tamanho_antes / 1e6, 2),
+        'modelo_mb_depois': round(os.path.getsize(caminho_binario(destino)) / 1e6, 2),
+    }
+
+    consultas = None
+    if not args.sem_validacao and os.path.exists(args.usuarios):
+        print(f"Validando em fotos separadas de {args.usuarios}...")
+        relatorio['validacao'], consultas = validar(args.usuarios, args.prototipos, args.limiar_duplicata,
+                                                    args.fracao_teste)
+    if consultas is None:
+        # Sem fotos de teste, a latência é medida com amostras da própria galeria
+        consultas = np.asarray(motor.galeria[::max(1, motor.galeria.shape[0] // 20)][:20], np.float32)
+    relatorio['busca_ms_antes'] = round(latencia_ms(motor, consultas), 3)
+    relatorio['busca_ms_depois'] = round(latencia_ms(compacto, consultas), 3)
+
+    print(f"\n{'':<22} {'antes':>10} {'depois':>10}")
+    print(f"{'amostras':<22} {relatorio['amostras_antes']:>10} {relatorio['amostras_depois']:>10}")
+    print(f"{'modelo (MB)':<22} {relatorio['modelo_mb_antes']:>10.2f} {relatorio['modelo_mb_depois']:>10.2f}")
+    print(f"{'busca por face (ms)':<22} {relatorio['busca_ms_antes']:>10.3f} {relatorio['busca_ms_depois']:>10.3f}")
+    validacao = relatorio.get('validacao')
+    if validacao:
+        print(f"{'acurácia (validação)':<22} {validacao['acuracia_antes']:>10.3f} "
+              f"{validacao['acuracia_depois']:>10.3f}")
+        print(f"\nDiferença de acurácia: {100.0 * validacao['delta_acuracia']:+.1f} pontos em "
+              f"{validacao['fotos_teste']} fotos fora do treino "
+              f"(mesma identidade em {validacao['identidades_iguais']})")
+    elif not args.sem_validacao:
+        print("⚠️  Sem fotos suficientes para validar (cada pessoa precisa de pelo menos 2 fotos)")
+
+    arquivo_relatorio = args.relatorio or os.path.splitext(destino)[0] + '.compactacao.json'
+    salvar_json_atomico(arquivo_relatorio, relatorio, indent=2, ensure_ascii=False)
+    print(f"✓ Relatório salvo em {arquivo_relatorio}")
+    return relatorio
+
+
+if __name__ == '__main__':
+    main()
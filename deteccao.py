@@ -0,0 +1,311 @@
+"""
+Front-end da detecção de faces.
+
+Rodar o `detectMultiScale` no quadro inteiro em resolução cheia gasta quase
+todo o tempo em níveis da pirâmide que não interessam numa porta, onde as
+faces são grandes. O `DetectorFaces`:
+
+- reduz o quadro antes da detecção e devolve as caixas na resolução cheia;
+- escolhe a redução e os limites de tamanho (minSize/maxSize) a partir do
+  tamanho esperado das faces, para nunca perder faces acima de `face_min`;
+- pode restringir a busca a uma região de interesse (`roi`);
+- pode procurar só em janelas ao redor das últimas faces encontradas,
+  com uma varredura completa a cada `varredura_a_cada` quadros.
+
+O detector em si é um backend trocável (`BACKENDS`): o cascade Haar de
+sempre, o cascade LBP (mais rápido) ou a rede `cv2.FaceDetectorYN` (YuNet,
+mais precisa com pose e iluminação ruins). O pacote do OpenCV não traz esses
+modelos: o `lbpcascade_frontalface_improved.xml` (dos dados do OpenCV 4.10)
+fica em `PASTA_MODELOS`; o `face_detection_yunet_2023mar.onnx` (do
+opencv_zoo) deve ser copiado para lá ou indicado com `--modelo-yunet`. O
+backend escolhido pelo `benchmarks.backends` fica em `ARQUIVO_CONFIG` e é o
+padrão do detector, do cadastro e do serviço.
+"""
+import json
+import os
+
+import cv2
+import numpy as np
+
+ARQUIVO_CASCADE = 'haarcascade_frontalface_default.xml'
+ARQUIVO_LBP = 'lbpcascade_frontalface_improved.xml'
+ARQUIVO_YUNET = 'face_detection_yunet_2023mar.onnx'
+PASTA_MODELOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modelos')
+# Backend de detecção escolhido pelo benchmark (ver benchmarks/backends.py)
+ARQUIVO_CONFIG = 'deteccao.json'
+
+
+def carregar_cascade(arquivo=ARQUIVO_CASCADE):
+    return cv2.CascadeClassifier(cv2.data.haarcascades + arquivo)
+
+
+def caminho_modelo(arquivo):
+    """Procura `arquivo` em PASTA_MODELOS e nos dados do OpenCV (haarcascades/ e lbpcascades/)"""
+    pastas = [PASTA_MODELOS, cv2.data.haarcascades,
+              os.path.join(os.path.dirname(os.path.normpath(cv2.data.haarcascades)), 'lbpcascades')]
+    for pasta in pastas:
+        caminho = os.path.join(pasta, arquivo)
+        if os.path.exists(caminho):
+            return caminho
+    raise FileNotFoundError(f"Modelo de detecção {arquivo} não encontrado; copie-o para {PASTA_MODELOS}")
+
+
+class BackendCascade:
+    """Cascade do OpenCV (Haar ou LBP): `detectar(gray, min_lado, max_lado)` -> (n, 4) int32"""
+
+    def __init__(self, cascade, scale_factor=1.1, min_neighbors=5):
+        if isinstance(cascade, str):
+            cascade = cv2.CascadeClassifier(cascade)
+        if cascade.empty():
+            raise RuntimeError("Não foi possível carregar o cascade de detecção")
+        self.cascade = cascade
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        # Menor face que o cascade encontra, em pixels
+        self.tamanho_janela = min(cascade.getOriginalWindowSize()) or 24
+
+    def detectar(self, gray, min_lado, max_lado=0):
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+                                              minSize=(min_lado, min_lado), maxSize=(max_lado, max_lado))
+        return np.asarray(faces, np.int32).reshape(-1, 4)
+
+
+class BackendYuNet:
+    """
+    Rede `cv2.FaceDetectorYN` (YuNet). Recebe o quadro em cinza como o
+    cascade (replicado em 3 canais num buffer reaproveitado) e devolve só as
+    caixas com lado entre `min_lado` e `max_lado`. `modelo` é o caminho do
+    .onnx (padrão: `ARQUIVO_YUNET` em `PASTA_MODELOS`). Não é thread-safe.
+    """
+    tamanho_janela = 16
+
+    def __init__(self, modelo=None, limiar=0.8, nms=0.3, max_faces=50):
+        modelo = modelo or caminho_modelo(ARQUIVO_YUNET)
+        if not os.path.exists(modelo):
+            raise FileNotFoundError(f"Modelo YuNet {modelo} não encontrado")
+        self.modelo = modelo
+        self.detector = cv2.FaceDetectorYN.create(modelo, '', (320, 320), limiar, nms, max_faces)
+        self._tamanho = None
+        self._bgr = None
+
+    def detectar(self, gray, min_lado, max_lado=0):
+        altura, largura = gray.shape[:2]
+        if self._tamanho != (largura, altura):
+            self.detector.setInputSize((largura, altura))
+            self._tamanho = (largura, altura)
+            self._bgr = np.empty((altura, largura, 3), np.uint8)
+        cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=self._bgr)
+        _, faces = self.detector.detect(self._bgr)
+        return filtrar_caixas(faces, min_lado, max_lado)
+
+
+def filtrar_caixas(faces, min_lado, max_lado=0):
+    """
+    Caixas (x, y, w, h) int32 de uma saída do `FaceDetectorYN` (None ou
+    (n, 15) float32), cortadas na borda do quadro e limitadas por tamanho
+    """
+    if faces is None or len(faces) == 0:
+        return np.empty((0, 4), np.int32)
+    caixas = np.round(faces[:, :4]).astype(np.int32)
+    # A rede pode devolver caixas que passam da borda do quadro
+    caixas[:, 2] += np.minimum(caixas[:, 0], 0)
+    caixas[:, 3] += np.minimum(caixas[:, 1], 0)
+    caixas[:, :2] = np.maximum(caixas[:, :2], 0)
+    manter = caixas[:, 2:].min(axis=1) >= min_lado
+    if max_lado:
+        manter &= caixas[:, 2:].max(axis=1) <= max_lado
+    return caixas[manter]
+
+
+BACKENDS = {
+    'haar': lambda scale_factor=1.1, min_neighbors=5: BackendCascade(
+        carregar_cascade(), scale_factor, min_neighbors),
+    'lbp': lambda scale_factor=1.1, min_neighbors=5: BackendCascade(
+        caminho_modelo(ARQUIVO_LBP), scale_factor, min_neighbors),
+    'yunet': lambda modelo=None, limiar=0.8, nms=0.3: BackendYuNet(modelo, limiar, nms),
+}
+
+
+def criar_backend(nome='haar', **opcoes):
+    """Instancia um backend de `BACKENDS` (um por thread: nenhum é thread-safe)"""
+    if nome not in BACKENDS:
+        raise ValueError(f"Backend de detecção desconhecido: {nome} (use {', '.join(BACKENDS)})")
+    return BACKENDS[nome](**opcoes)
+
+
+def configuracao_deteccao(backend=None, arquivo=ARQUIVO_CONFIG, modelo_yunet=None, **parametros):
+    """
+    Resolve o backend e os parâmetros do `DetectorFaces`. Com `backend` None
+    vale o gravado em `arquivo` pelo `benchmarks.backends`, e os parâmetros
+    medidos junto com ele (`largura_deteccao`, `face_min`, `face_max`)
+    preenchem os que vierem None em `parametros`. Se o modelo desse backend
+    não puder ser carregado, volta ao Haar com os parâmetros padrão.
+    `modelo_yunet` (caminho do .onnx) substitui o gravado quando o backend
+    é o 'yunet'.
+
+    Retorna (backend, opções do backend, parâmetros sem os None).
+    """
+    opcoes = {}
+    if backend is None:
+        config = {}
+        if arquivo and os.path.exists(arquivo):
+            with open(arquivo, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        backend = config.get('backend', 'haar')
+        opcoes = dict(config.get('opcoes', {}))
+        if backend == 'yunet' and modelo_yunet:
+            opcoes['modelo'] = modelo_yunet
+        try:
+            criar_backend(backend, **opcoes)
+        except (OSError, RuntimeError, ValueError, cv2.error) as e:
+            print(f"⚠️ Backend {backend} de {arquivo} indisponível ({e}); usando haar")
+            backend, opcoes = 'haar', {}
+        else:
+            for chave, valor in config.get('parametros', {}).items():
+                if parametros.get(chave) is None:
+                    parametros[chave] = valor
+    elif backend == 'yunet' and modelo_yunet:
+        opcoes = {'modelo': modelo_yunet}
+    return backend, opcoes, {chave: valor for chave, valor in parametros.items() if valor is not None}
+
+
+def ler_roi(texto):
+    """Converte "x,y,w,h" em tupla de inteiros (None para texto vazio)"""
+    if not texto:
+        return None
+    valores = [int(v) for v in str(texto).split(',')]
+    if len(valores) != 4 or valores[2] <= 0 or valores[3] <= 0:
+        raise ValueError(f"ROI inválida: {texto} (use x,y,largura,altura)")
+    return tuple(valores)
+
+
+def recortar_regiao(regiao, limite):
+    """Interseção de (x, y, w, h) com a área `limite`; None se ficar vazia"""
+    x, y, w, h = regiao
+    lx, ly, lw, lh = limite
+    x0, y0 = max(lx, int(x)), max(ly, int(y))
+    x1, y1 = min(lx + lw, int(x + w)), min(ly + lh, int(y + h))
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def unir_regioes(regioes):
+    """Junta regiões que se sobrepõem, para não detectar a mesma face duas vezes"""
+    regioes = [list(r) for r in regioes]
+    unidas = True
+    while unidas and len(regioes) > 1:
+        unidas = False
+        for i in range(len(regioes)):
+            for j in range(i + 1, len(regioes)):
+                ax, ay, aw, ah = regioes[i]
+                bx, by, bw, bh = regioes[j]
+                if ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah:
+                    x0, y0 = min(ax, bx), min(ay, by)
+                    x1, y1 = max(ax + aw, bx + bw), max(ay + ah, by + bh)
+                    regioes[i] = [x0, y0, x1 - x0, y1 - y0]
+                    del regioes[j]
+                    unidas = True
+                    break
+            if unidas:
+                break
+    return [tuple(r) for r in regioes]
+
+
+class DetectorFaces:
+    """
+    Detecção em quadro reduzido, com ROI e janelas ao redor das últimas
+    faces. `detectar(gray)` retorna um array (n, 4) de (x, y, w, h) na
+    resolução do quadro original, como o `detectMultiScale`.
+
+    - `backend`: nome em `BACKENDS` ou objeto com `detectar(gray, min_lado,
+      max_lado)` e `tamanho_janela` (padrão: Haar com `scale_factor` e
+      `min_neighbors`; `cascade` aceita um `CascadeClassifier` já carregado);
+    - `largura_deteccao`: largura do quadro (ou da ROI) na detecção; None
+      ou 0 mantém a resolução original;
+    - `face_min`/`face_max`: menor/maior lado de face esperado, em pixels do
+      quadro original. A redução nunca vai além do ponto em que `face_min`
+      ficaria menor que a menor face do backend (24 px no Haar, 16 na YuNet);
+    - `roi`: (x, y, w, h) onde procurar faces (None = quadro inteiro);
+    - `janelas`: procura só ao redor das últimas faces (ampliadas por
+      `margem_janela`) e faz a varredura completa a cada `varredura_a_cada`
+      quadros ou quando não há faces conhecidas.
+    """
+
+    def __init__(self, cascade=None, largura_deteccao=None, face_min=30, face_max=None, roi=None,
+                 janelas=False, margem_janela=0.5, varredura_a_cada=10, scale_factor=1.1, min_neighbors=5,
+                 backend=None, opcoes_backend=None):
+        if backend is None:
+            backend = BackendCascade(cascade if cascade is not None else carregar_cascade(), scale_factor,
+                                     min_neighbors)
+        elif isinstance(backend, str):
+            backend = criar_backend(backend, **(opcoes_backend or {}))
+        self.backend = backend
+        self.largura_deteccao = largura_deteccao or None
+        self.face_min = face_min
+        self.face_max = face_max
+        self.roi = roi
+        self.janelas = janelas
+        self.margem_janela = margem_janela
+        self.varredura_a_cada = max(1, varredura_a_cada)
+        self.tamanho_janela = backend.tamanho_janela
+        self.ultimas = np.empty((0, 4), np.int32)
+        self.quadros = 0
+        self.varreduras = 0
+
+    def escala(self, largura):
+        """Fator de redução para uma região de `largura` pixels"""
+        if not self.largura_deteccao or largura <= self.largura_deteccao:
+            return 1.0
+        escala = self.largura_deteccao / largura
+        if self.face_min:
+            # Abaixo disso a menor face esperada ficaria menor do que o backend encontra
+            escala = max(escala, self.tamanho_janela / self.face_min)
+        return min(1.0, escala)
+
+    def _detectar_em(self, gray, regiao):
+        """Detecta faces em uma região do quadro; retorna as caixas no quadro original"""
+        x0, y0, w, h = regiao
+        recorte = gray[y0:y0 + h, x0:x0 + w]
+        escala = self.escala(w)
+        if escala < 1.0:
+            recorte = cv2.resize(recorte, (max(1, round(w * escala)), max(1, round(h * escala))),
+                                 interpolation=cv2.INTER_AREA)
+        min_lado = max(self.tamanho_janela, int((self.face_min or 0) * escala))
+        max_lado = int(self.face_max * escala) if self.face_max else 0
+        if min(recorte.shape[:2]) < min_lado:
+            return np.empty((0, 4), np.int32)
+        faces = self.backend.detectar(recorte, min_lado, max_lado)
+        if len(faces) == 0:
+            return np.empty((0, 4), np.int32)
+        faces = np.asarray(faces, np.float64) / escala
+        faces[:, 0] += x0
+        faces[:, 1] += y0
+        return np.round(faces).astype(np.int32)
+
+    def regioes_busca(self, largura, altura):
+        """Regiões onde procurar neste quadro (e se é uma varredura completa)"""
+        area = recortar_regiao(self.roi or (0, 0, largura, altura), (0, 0, largura, altura))
+        if area is None:
+            return [], True
+        varredura = (not self.janelas or len(self.ultimas) == 0
+                     or self.quadros % self.varredura_a_cada == 0)
+        if varredura:
+            return [area], True
+        regioes = []
+        for x, y, w, h in self.ultimas:
+            mx, my = int(w * self.margem_janela), int(h * self.margem_janela)
+            janela = recortar_regiao((x - mx, y - my, w + 2 * mx, h + 2 * my), area)
+            if janela is not None:
+                regioes.append(janela)
+        return unir_regioes(regioes), False
+
+    def detectar(self, gray):
+        altura, largura = gray.shape[:2]
+        regioes, varredura = self.regioes_busca(largura, altura)
+        self.quadros += 1
+        self.varreduras += varredura
+        partes = [self._detectar_em(gray, regiao) for regiao in regioes]
+        faces = np.concatenate(partes) if partes else np.empty((0, 4), np.int32)
+        self.ultimas = faces
+        return faces
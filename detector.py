@@ -2,8 +2,28 @@ import cv2
 import json
 import datetime
 import os
+import argparse
+import time
+from collections import deque, namedtuple
+
+from deteccao import BACKENDS, DetectorFaces, configuracao_deteccao, ler_roi
+from fontes import abrir_fonte, eh_camera
+from indice import carregar_com_indice
+from lbph import MotorLBPH
+from metricas import METRICAS, servir
+from modelo_binario import eh_modelo_binario
+from movimento import IGNORADO, PortaoMovimento
+from pipeline import MAX_LATENCIAS, PipelineReconhecimento
+from preprocessamento import PreprocessadorFaces
+from publicacao import ModeloAtivo
+from rastreamento import RastreadorFaces
+from registro_acessos import RegistradorAcessos
+
+# Distâncias acima deste valor indicam que o LBPH não encontrou nenhuma face abaixo do limiar
+LIMITE_ERRO = 1000
 
 def registrar_log(nome, acesso_permitido):
+    """Registro síncrono de um acesso (o detector usa o `RegistradorAcessos`)"""
     # Cria o diretório de logs se não existir
     if not os.path.exists('logs'):
         os.makedirs('logs')
@@ -21,118 +41,559 @@ def registrar_log(nome, acesso_permitido):
     with open(arquivo_log, 'a', encoding='utf-8') as f:
         f.write(mensagem)
 
-def iniciar_reconhecimento():
-    # Carrega o classificador para detecção facial
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    
-    # Carrega o modelo treinado
+NOME_JANELA = 'Reconhecimento Facial'
+
+
+def expandir_regiao(x, y, w, h, largura, altura, fator=0.1):
+    """Expande a região do rosto em `fator` para cada lado, sem sair da imagem"""
+    expand_x = int(w * fator)
+    expand_y = int(h * fator)
+
+    new_x = max(0, x - expand_x)
+    new_y = max(0, y - expand_y)
+    new_w = min(largura - new_x, w + 2 * expand_x)
+    new_h = min(altura - new_y, h + 2 * expand_y)
+    return new_x, new_y, new_w, new_h
+
+
+def classificar_confianca(nome, confianca):
+    """
+    Traduz a distância do LBPH em decisão de acesso.
+    Retorna (nome, cor, status, acesso_permitido).
+    """
+    # Define os níveis de confiança (valores ajustados para escala real do LBPH)
+    if confianca > LIMITE_ERRO:  # Provavelmente um erro no reconhecimento
+        return "Desconhecido", (0, 0, 255), "ERRO - Reconhecimento falhou", False
+    elif confianca < 30:  # Reconhecimento muito confiável
+        return nome, (0, 255, 0), "PERMITIDO (Alta Confiança)", True
+    elif confianca < 50:  # Reconhecimento bom
+        return nome, (0, 255, 128), "PERMITIDO", True
+    elif confianca < 70:  # Reconhecimento aceitável
+        return nome, (0, 255, 255), "PERMITIDO (Verificar)", True
+    else:  # Reconhecimento duvidoso
+        return nome, (0, 0, 255), "NEGADO", False
+
+
+def acumular_tempo(estatisticas, etapa, inicio):
+    """
+    Soma o tempo decorrido desde `inicio` à etapa e retorna o instante atual.
+    A duração também entra no histograma da etapa em `metricas.METRICAS`.
+    """
+    agora = time.perf_counter()
+    METRICAS.observar(etapa, agora - inicio)
+    if estatisticas is not None:
+        tempos = estatisticas['tempos']
+        tempos[etapa] = tempos.get(etapa, 0.0) + (agora - inicio)
+    return agora
+
+
+def reconhecer_faces(reconhecedor, nomes, preprocessador, gray, regioes, estatisticas=None):
+    """
+    Reconhece as faces contidas em `regioes` (já expandidas) do quadro em
+    escala de cinza. Todas passam juntas pelo pré-processamento do
+    treinamento (`preprocessamento.PreprocessadorFaces`) e, se o reconhecedor
+    aceitar lotes, por uma única consulta.
+    Retorna uma lista de (nome, confianca, cor, status, acesso_permitido).
+    """
+    if not regioes:
+        return []
+    t = time.perf_counter()
+    faces = preprocessador.lote(gray, regioes)
+    acumular_tempo(estatisticas, 'preprocessamento', t)
+    return prever_faces(reconhecedor, nomes, faces, estatisticas)
+
+
+def prever_faces(reconhecedor, nomes, faces, estatisticas=None):
+    """
+    Consulta o LBPH para faces já pré-processadas (n, altura, largura), em um
+    único lote quando o reconhecedor aceita. Retorna uma lista de
+    (nome, confianca, cor, status, acesso_permitido).
+    """
+    if len(faces) == 0:
+        return []
+    t = time.perf_counter()
+    if hasattr(reconhecedor, 'prever_lote'):
+        previsoes = zip(*reconhecedor.prever_lote(faces))
+    else:
+        previsoes = [reconhecedor.predict(face) for face in faces]
+    acumular_tempo(estatisticas, 'predicao', t)
+
+    resultados = []
+    for id_previsto, confianca in previsoes:
+        nome = nomes.get(str(id_previsto), "Desconhecido")
+        nome, cor, status, permitido = classificar_confianca(nome, float(confianca))
+        METRICAS.incrementar('predicoes', status=status)
+        resultados.append((nome, float(confianca), cor, status, permitido))
+    return resultados
+
+
+def desenhar_resultado(frame, regiao, nome, status, confianca, cor, fonte=cv2.FONT_HERSHEY_SIMPLEX):
+    """Desenha o retângulo e os textos de nome, status e confiança"""
+    x, y, w, h = regiao
+    cv2.rectangle(frame, (x, y), (x+w, y+h), cor, 2)
+
+    # Mostra o nome e status
+    cv2.putText(frame, f"Status: {status}", (x, y-10), fonte, 0.5, cor, 2)
+    # Mostra o nome detectado
+    cv2.putText(frame, f"Nome: {nome}", (x, y-25), fonte, 0.5, cor, 2)
+    # Mostra a pontuação de confiança
+    cv2.putText(frame, f"Confianca: {confianca:.1f}", (x, y-40), fonte, 0.5, cor, 2)
+
+
+# Resultado da análise de uma face; `novo` indica se o LBPH foi consultado neste quadro
+Resultado = namedtuple('Resultado', ['regiao', 'nome', 'confianca', 'cor', 'status', 'permitido', 'novo'])
+
+
+def analisar_quadro_completo(gray, detector, reconhecedor, nomes, preprocessador, estatisticas):
+    """Caminho original: detecção e reconhecimento de todas as faces em todo quadro"""
+    t = time.perf_counter()
+    faces = detector.detectar(gray)
+    acumular_tempo(estatisticas, 'deteccao', t)
+    estatisticas['deteccoes'] += 1
+
+    regioes = [expandir_regiao(x, y, w, h, gray.shape[1], gray.shape[0]) for (x, y, w, h) in faces]
+    try:
+        decisoes = reconhecer_faces(reconhecedor, nomes, preprocessador, gray, regioes, estatisticas)
+    except Exception as e:
+        print(f"Erro no reconhecimento: {str(e)}")
+        return []
+    estatisticas['reconhecimentos'] += len(decisoes)
+    return [Resultado(regiao, nome, confianca, cor, status, permitido, True)
+            for regiao, (nome, confianca, cor, status, permitido) in zip(regioes, decisoes)]
+
+
+def analisar_quadro_rastreado(gray, indice_quadro, rastreador, detector, reconhecedor, nomes, preprocessador,
+                              estatisticas):
+    """
+    Caminho com rastreamento: a detecção completa roda só quando o rastreador
+    pede e o LBPH só é consultado para trilhas novas ou com identidade vencida.
+    """
+    t = time.perf_counter()
+    if rastreador.precisa_detectar(indice_quadro):
+        faces = detector.detectar(gray)
+        estatisticas['deteccoes'] += 1
+        rastreador.associar(gray, faces, indice_quadro)
+        acumular_tempo(estatisticas, 'deteccao', t)
+    else:
+        rastreador.rastrear(gray)
+        acumular_tempo(estatisticas, 'rastreamento', t)
+
+    regioes = [expandir_regiao(*trilha.caixa, gray.shape[1], gray.shape[0]) for trilha in rastreador.trilhas]
+    novos = [rastreador.precisa_reconhecer(trilha, indice_quadro) for trilha in rastreador.trilhas]
+    # As trilhas que precisam do LBPH são reconhecidas juntas, em um único lote
+    pendentes = [i for i, novo in enumerate(novos) if novo]
+    falhas = set()
+    try:
+        decisoes = reconhecer_faces(reconhecedor, nomes, preprocessador, gray, [regioes[i] for i in pendentes],
+                                    estatisticas)
+    except Exception as e:
+        print(f"Erro no reconhecimento: {str(e)}")
+        decisoes, falhas = [], set(pendentes)
+    estatisticas['reconhecimentos'] += len(decisoes)
+    for i, (nome, confianca, cor, status, permitido) in zip(pendentes, decisoes):
+        rastreador.trilhas[i].definir_identidade(nome, confianca, status, cor, permitido, indice_quadro)
+
+    return [Resultado(regiao, trilha.nome, trilha.confianca, trilha.cor, trilha.status, trilha.permitido, novo)
+            for i, (trilha, regiao, novo) in enumerate(zip(rastreador.trilhas, regioes, novos)) if i not in falhas]
+
+
+def criar_analisador(detector, modelo, estatisticas, rastreamento=False, detectar_a_cada=5, reverificar_a_cada=15,
+                     portao=None):
+    """
+    Cria a função que analisa um quadro BGR e retorna a lista de `Resultado`.
+    `detector` é um `deteccao.DetectorFaces` e `modelo` um
+    `publicacao.ModeloAtivo` (o par reconhecedor/nomes é lido uma vez por
+    quadro, então uma recarga nunca mistura versões no mesmo quadro). Cada
+    analisador mantém o próprio estado de rastreamento e os próprios buffers
+    de pré-processamento. Com um `movimento.PortaoMovimento`, os quadros sem
+    mudança na cena não passam pela detecção nem pelo reconhecimento.
+    """
+    rastreador = RastreadorFaces(detectar_a_cada, reverificar_a_cada) if rastreamento else None
+    preprocessador = PreprocessadorFaces()
+    faces_anteriores = 0
+
+    def analisar(frame):
+        nonlocal faces_anteriores
+        # Converte para escala de cinza
+        t = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        t = acumular_tempo(estatisticas, 'conversao', t)
+        if portao is not None:
+            decisao = portao.avaliar(gray, faces_anteriores)
+            acumular_tempo(estatisticas, 'movimento', t)
+            METRICAS.incrementar('portao_movimento', decisao=decisao)
+            if decisao == IGNORADO:
+                estatisticas['quadros'] += 1
+                estatisticas['ignorados'] += 1
+                METRICAS.incrementar('quadros')
+                return []
+        reconhecedor, nomes, _ = modelo.atual
+        if rastreador is not None:
+            resultados = analisar_quadro_rastreado(gray, estatisticas['quadros'], rastreador,
+                                                   detector, reconhecedor, nomes, preprocessador, estatisticas)
+        else:
+            resultados = analisar_quadro_completo(gray, detector, reconhecedor, nomes, preprocessador,
+                                                  estatisticas)
+        faces_anteriores = len(resultados)
+        estatisticas['quadros'] += 1
+        estatisticas['faces'] += len(resultados)
+        METRICAS.incrementar('quadros')
+        METRICAS.incrementar('faces', len(resultados))
+        return resultados
+
+    return analisar
+
+
+def registrar_decisoes(resultados, registrador=None, estatisticas=None):
+    """Registra as decisões novas (`novo`) de acesso"""
+    t = time.perf_counter()
+    for r in resultados:
+        if r.novo:
+            if registrador is not None:
+                confianca = r.confianca if r.confianca <= LIMITE_ERRO else None
+                registrador.registrar(r.nome, r.permitido, confianca)
+            else:
+                registrar_log(r.nome, r.permitido)
+    acumular_tempo(estatisticas, 'registro', t)
+
+
+def desenhar_resultados(frame, resultados, estatisticas=None):
+    """Desenha todas as faces no quadro"""
+    t = time.perf_counter()
+    for r in resultados:
+        desenhar_resultado(frame, r.regiao, r.nome, r.status, r.confianca, r.cor)
+    acumular_tempo(estatisticas, 'desenho', t)
+
+
+def apresentar_resultados(frame, resultados, registrador=None, estatisticas=None):
+    """Registra as decisões novas e desenha todas as faces no quadro"""
+    registrar_decisoes(resultados, registrador, estatisticas)
+    desenhar_resultados(frame, resultados, estatisticas)
+
+
+def analisador_registrando(analisar, registrador=None, estatisticas=None):
+    """
+    Envolve `analisar` para registrar as decisões novas logo na inferência.
+    No pipeline a saída pode descartar resultados (fila "último quadro
+    vence" e quadros fora de ordem); com o rastreamento a decisão de uma
+    trilha só aparece num quadro, então ela não pode esperar pela saída.
+    """
+    def analisar_e_registrar(frame):
+        resultados = analisar(frame)
+        registrar_decisoes(resultados, registrador, estatisticas)
+        return resultados
+
+    return analisar_e_registrar
+
+
+def carregar_reconhecedor(modelo='classificador.yml', motor='opencv'):
+    """
+    Carrega o modelo treinado. `motor='numpy'` usa o `MotorLBPH` vetorizado,
+    que dá as mesmas decisões do LBPH do OpenCV com a galeria em uma matriz contígua;
+    `motor='indice'` usa a busca em dois níveis do `IndiceIdentidades`
+    (para galerias com muitas pessoas).
+
+    Um modelo no formato binário (classificador.lbph, ver `modelo_binario`)
+    é mapeado do disco e sempre usa o `MotorLBPH` (o LBPH do OpenCV só lê .yml).
+    """
+    if motor == 'indice':
+        return carregar_com_indice(modelo)
+    if motor == 'numpy' or eh_modelo_binario(modelo):
+        return MotorLBPH.carregar(modelo)
     reconhecedor = cv2.face.LBPHFaceRecognizer_create()
-    reconhecedor.read('classificador.yml')
-    
-    # Carrega o dicionário de nomes
-    with open('nomes.json', 'r') as f:
-        nomes = json.load(f)
+    reconhecedor.read(modelo)
+    return reconhecedor
+
+
+def carregador_modelo(modelo='classificador.yml', arquivo_nomes='nomes.json', motor='opencv'):
+    """Função que carrega (reconhecedor, nomes), no formato esperado por `publicacao.ModeloAtivo`"""
+    def carregar_modelo():
+        # Carrega o modelo treinado
+        reconhecedor = carregar_reconhecedor(modelo, motor)
+        # Carrega o dicionário de nomes (o modelo binário já traz o seu)
+        nomes = getattr(getattr(reconhecedor, 'motor', reconhecedor), 'nomes', None)
+        if nomes is None:
+            with open(arquivo_nomes, 'r') as f:
+                nomes = json.load(f)
+        return reconhecedor, nomes
+    return carregar_modelo
+
+
+def novas_estatisticas():
+    return {'quadros': 0, 'ignorados': 0, 'deteccoes': 0, 'reconhecimentos': 0, 'faces': 0, 'tempos': {}}
+
+
+def somar_estatisticas(parciais):
+    """Junta as estatísticas de vários workers/etapas"""
+    total = novas_estatisticas()
+    for parcial in parciais:
+        for chave, valor in parcial.items():
+            if chave == 'tempos':
+                for etapa, tempo in valor.items():
+                    total['tempos'][etapa] = total['tempos'].get(etapa, 0.0) + tempo
+            elif chave in total:
+                total[chave] += valor
+    return total
+
+
+def iniciar_reconhecimento(fonte=0, exibir=True, max_quadros=None, modelo='classificador.yml',
+                           arquivo_nomes='nomes.json', pasta_logs='logs', motor='opencv',
+                           rastreamento=False, detectar_a_cada=5, reverificar_a_cada=15,
+                           pipeline=False, workers=2, tamanho_fila=2, janela_log=5.0,
+                           largura_deteccao=None, face_min=None, face_max=None, roi=None, janelas_faces=False,
+                           recarregar_a_cada=2.0, porta_metricas=None, metricas_json=None,
+                           arquivo_eventos='eventos.db', movimento=False, movimento_limiar=25,
+                           movimento_area=0.005, batimento_a_cada=30, backend=None, modelo_yunet=None):
+    """
+    Inicia o reconhecimento a partir de `fonte` (câmera, vídeo, pasta de
+    imagens ou "sintetico", ver `fontes.abrir_fonte`). Com `exibir=False` roda
+    sem janela (servidores sem display) e `max_quadros` limita a execução.
+    `motor` escolhe o LBPH do OpenCV ('opencv'), o vetorizado ('numpy') ou
+    a busca em dois níveis ('indice'), ver `carregar_reconhecedor`.
+
+    Com `rastreamento=True` a detecção Haar roda a cada `detectar_a_cada`
+    quadros (ou quando o rastreio perde confiança) e a identidade de cada face
+    acompanhada só é reverificada a cada `reverificar_a_cada` quadros.
+
+    Com `pipeline=True` captura, inferência (`workers` threads) e exibição rodam
+    em etapas separadas ligadas por filas de `tamanho_fila` quadros, descartando
+    os quadros mais antigos quando uma etapa fica para trás. As decisões de
+    acesso são registradas na inferência, antes de qualquer descarte; a
+    saída só desenha e exibe.
+
+    A detecção Haar (ver `deteccao.DetectorFaces`) pode rodar num quadro
+    reduzido a `largura_deteccao` pixels, limitada a faces entre `face_min` e
+    `face_max` pixels, restrita à região `roi` (x, y, w, h) e, com
+    `janelas_faces=True`, só ao redor das faces do quadro anterior. Os valores
+    padrão reproduzem a detecção no quadro inteiro em resolução cheia, com
+    `face_min` 30. `backend` escolhe o detector ('haar', 'lbp' ou 'yunet',
+    ver `deteccao.BACKENDS`, com o modelo da YuNet em `modelo_yunet`); None usa o gravado em `deteccao.ARQUIVO_CONFIG`
+    pelo `benchmarks.backends`, com a redução e os tamanhos de face medidos
+    junto como padrão (ou o Haar, se não houver).
+
+    Com `movimento=True` um `movimento.PortaoMovimento` deixa de lado os
+    quadros em que a cena não mudou (fração menor que `movimento_area` dos
+    pixels, em um quadro reduzido, mudando mais que `movimento_limiar` níveis
+    de cinza), com uma detecção de batimento a cada `batimento_a_cada`
+    quadros parados. Os quadros ignorados são contados em `ignorados`.
+
+    A cada `recarregar_a_cada` segundos (0 desativa) o selo de versão do
+    modelo é verificado; quando o treinamento publica uma nova versão, o
+    modelo e os nomes são carregados em segundo plano e trocados sem parar a
+    captura (ver `publicacao.ModeloAtivo`).
+
+    O tempo de cada etapa e os contadores de quadros, faces, descartes e
+    predições por status ficam em `metricas.METRICAS`; com `porta_metricas`
+    eles são servidos em http://127.0.0.1:<porta>/metrics (Prometheus) e com
+    `metricas_json` gravados nesse arquivo ao final.
+
+    Os acessos são gravados em segundo plano; decisões repetidas da mesma
+    pessoa dentro de `janela_log` segundos viram uma única linha no log.
+    Cada linha também vai para o armazém de eventos `arquivo_eventos` (dentro
+    de `pasta_logs`, None desativa), consultado com `eventos.py`.
+
+    Retorna as estatísticas da execução (contadores, tempo por etapa e
+    latência dos últimos `pipeline.MAX_LATENCIAS` quadros).
+    """
+    modelo_ativo = ModeloAtivo(modelo, carregador_modelo(modelo, arquivo_nomes, motor), recarregar_a_cada)
     
     # Inicia a captura de vídeo
-    cap = cv2.VideoCapture(0)
+    cap = abrir_fonte(fonte)
+    if not cap.isOpened():
+        raise RuntimeError(f"Não foi possível abrir a fonte de vídeo: {fonte}")
+    
+    if exibir:
+        print("Pressione 'q' para sair")
+    print(f"Modo: {'rastreamento' if rastreamento else 'detecção por quadro'}"
+          f"{f' | pipeline com {workers} workers' if pipeline else ''}")
+    
+    backend, opcoes_backend, parametros_deteccao = configuracao_deteccao(
+        backend, modelo_yunet=modelo_yunet, largura_deteccao=largura_deteccao, face_min=face_min,
+        face_max=face_max)
+    print(f"Backend de detecção: {backend} {parametros_deteccao or ''}")
     
-    # Configura a fonte para o texto na tela
-    fonte = cv2.FONT_HERSHEY_SIMPLEX
+    def criar_detector():
+        return DetectorFaces(roi=roi, janelas=janelas_faces, backend=backend, opcoes_backend=opcoes_backend,
+                             **parametros_deteccao)
     
-    print("Pressione 'q' para sair")
+    def criar_portao():
+        if not movimento:
+            return None
+        return PortaoMovimento(movimento_limiar, movimento_area, batimento_a_cada=batimento_a_cada)
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Erro ao capturar imagem da câmera")
-            break
+    registrador = RegistradorAcessos(pasta=pasta_logs, janela_agrupamento=janela_log,
+                                     arquivo_eventos=arquivo_eventos and os.path.join(pasta_logs, arquivo_eventos))
+    registrador.iniciar()
+    modelo_ativo.iniciar()
+    servidor_metricas = servir(porta_metricas) if porta_metricas else None
+    estatisticas_saida = novas_estatisticas()
+    latencias = deque(maxlen=MAX_LATENCIAS)
+    quadros_saida = 0
+    
+    def saida(frame, resultados):
+        nonlocal quadros_saida
+        if pipeline:
+            # As decisões já foram registradas na inferência (ver `analisador_registrando`)
+            desenhar_resultados(frame, resultados, estatisticas_saida)
+        else:
+            apresentar_resultados(frame, resultados, registrador, estatisticas_saida)
+        quadros_saida += 1
+        if max_quadros is not None and quadros_saida >= max_quadros:
+            return False
+        if not exibir:
+            return True
+        # Mostra o frame
+        t = time.perf_counter()
+        cv2.imshow(NOME_JANELA, frame)
+        # Verifica se a tecla 'q' foi pressionada para sair
+        tecla = cv2.waitKey(1) & 0xFF
+        acumular_tempo(estatisticas_saida, 'exibicao', t)
+        return tecla != ord('q')
+    
+    parciais = [estatisticas_saida]
+    inicio = time.perf_counter()
+    
+    try:
+        if pipeline:
+            if rastreamento and workers > 1:
+                # O rastreador depende da ordem dos quadros
+                print("Modo rastreamento usa um único worker de inferência")
+                workers = 1
         
-        # Converte para escala de cinza
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            def criar_processador():
+                # Cada worker tem o próprio detector (o CascadeClassifier não é thread-safe);
+                # o modelo ativo é só lido e pode ser compartilhado
+                estatisticas = novas_estatisticas()
+                parciais.append(estatisticas)
+                analisar = criar_analisador(criar_detector(), modelo_ativo, estatisticas,
+                                            rastreamento, detectar_a_cada, reverificar_a_cada, criar_portao())
+                return analisador_registrando(analisar, registrador, estatisticas)
         
-        # Detecta faces na imagem
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+            executor = PipelineReconhecimento(cap.read, criar_processador, saida, workers, tamanho_fila)
+            resumo_pipeline = executor.executar()
+            latencias = executor.latencias
+        else:
+            estatisticas = novas_estatisticas()
+            parciais.append(estatisticas)
+            analisar = criar_analisador(criar_detector(), modelo_ativo, estatisticas,
+                                        rastreamento, detectar_a_cada, reverificar_a_cada, criar_portao())
+            resumo_pipeline = None
         
-        for (x, y, w, h) in faces:
-            # Expande a região do rosto em 10% para cada lado
-            expand_x = int(w * 0.1)
-            expand_y = int(h * 0.1)
+            while True:
+                t = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    print("Erro ao capturar imagem da câmera" if eh_camera(fonte) else "Fim da fonte de vídeo")
+                    break
+                t = acumular_tempo(estatisticas, 'captura', t)
             
-            # Calcula novas coordenadas com a expansão, garantindo que não ultrapassem os limites da imagem
-            new_x = max(0, x - expand_x)
-            new_y = max(0, y - expand_y)
-            new_w = min(frame.shape[1] - new_x, w + 2 * expand_x)
-            new_h = min(frame.shape[0] - new_y, h + 2 * expand_y)
-            
-            # Extrai a região da face expandida
-            face_roi = gray[new_y:new_y+new_h, new_x:new_x+new_w]
-            
-            try:
-                # Aplica o mesmo pré-processamento usado no treinamento
-                face_roi = cv2.equalizeHist(face_roi)
-                face_roi = cv2.GaussianBlur(face_roi, (5, 5), 0)
-                face_roi = cv2.normalize(face_roi, None, 0, 255, cv2.NORM_MINMAX)
-                
-                # Tenta reconhecer a face
-                id_previsto, confianca = reconhecedor.predict(face_roi)
-                
-                # Define um limiar de confiança (quanto menor, mais preciso é o reconhecimento)
-                nome = nomes.get(str(id_previsto), "Desconhecido")
-                
-                # Define os níveis de confiança (valores ajustados para escala real do LBPH)
-                if confianca > 1000:  # Provavelmente um erro no reconhecimento
-                    nome = "Desconhecido"
-                    cor = (0, 0, 255)  # Vermelho
-                    status = "ERRO - Reconhecimento falhou"
-                    registrar_log(nome, False)
-                elif confianca < 30:  # Reconhecimento muito confiável
-                    cor = (0, 255, 0)  # Verde
-                    status = "PERMITIDO (Alta Confiança)"
-                    registrar_log(nome, True)
-                elif confianca < 50:  # Reconhecimento bom
-                    cor = (0, 255, 128)  # Verde claro
-                    status = "PERMITIDO"
-                    registrar_log(nome, True)
-                elif confianca < 70:  # Reconhecimento aceitável
-                    cor = (0, 255, 255)  # Amarelo
-                    status = "PERMITIDO (Verificar)"
-                    registrar_log(nome, True)
-                else:  # Reconhecimento duvidoso
-                    cor = (0, 0, 255)  # Vermelho
-                    status = "NEGADO"
-                    registrar_log(nome, False)
-                
-                # Desenha o retângulo e textos usando as coordenadas expandidas
-                cv2.rectangle(frame, (new_x, new_y), (new_x+new_w, new_y+new_h), cor, 2)
-                
-                # Mostra o nome e status
-                texto_status = f"Status: {status}"
-                cv2.putText(frame, texto_status, (new_x, new_y-10), fonte, 0.5, cor, 2)
-                
-                # Mostra o nome detectado
-                texto_nome = f"Nome: {nome}"
-                cv2.putText(frame, texto_nome, (new_x, new_y-25), fonte, 0.5, cor, 2)
-                
-                # Mostra a pontuação de confiança
-                texto_confianca = f"Confianca: {confianca:.1f}"
-                cv2.putText(frame, texto_confianca, (new_x, new_y-40), fonte, 0.5, cor, 2)
-                
-            except Exception as e:
-                print(f"Erro no reconhecimento: {str(e)}")
-        
-        # Mostra o frame
-        cv2.imshow('Reconhecimento Facial', frame)
-        
-        # Verifica se a tecla 'q' foi pressionada para sair
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+                continuar = saida(frame, analisar(frame))
+                latencias.append(time.perf_counter() - t)
+                METRICAS.observar('quadro', latencias[-1])
+                if not continuar:
+                    break
+    finally:
+        # Libera os recursos também em erro ou Ctrl+C: os acessos ainda na fila do registrador são gravados
+        cap.release()
+        if exibir:
+            cv2.destroyAllWindows()
+        registrador.encerrar()
+        modelo_ativo.encerrar()
+        if servidor_metricas is not None:
+            servidor_metricas.shutdown()
+        if metricas_json:
+            METRICAS.salvar_json(metricas_json)
+            print(f"✓ Métricas salvas em {metricas_json}")
+    
+    duracao = time.perf_counter() - inicio
+    estatisticas = somar_estatisticas(parciais)
+    estatisticas['duracao'] = duracao
+    estatisticas['latencias'] = latencias
+    estatisticas['fps'] = estatisticas['quadros'] / duracao if duracao > 0 else 0.0
+    print(f"Quadros: {estatisticas['quadros']} | FPS médio: {estatisticas['fps']:.1f} | "
+          f"Detecções: {estatisticas['deteccoes']} | Reconhecimentos: {estatisticas['reconhecimentos']}")
+    if movimento:
+        processados = estatisticas['quadros'] - estatisticas['ignorados']
+        print(f"Portão de movimento: {processados} quadros processados | {estatisticas['ignorados']} ignorados "
+              f"({100.0 * estatisticas['ignorados'] / max(1, estatisticas['quadros']):.0f}%)")
+    estatisticas['recargas'] = modelo_ativo.recargas
+    if modelo_ativo.recargas:
+        print(f"Modelo recarregado {modelo_ativo.recargas} vez(es) | versão em uso: "
+              f"{(modelo_ativo.atual.selo or {}).get('versao')}")
     
-    # Libera os recursos
-    cap.release()
-    cv2.destroyAllWindows()
+    if resumo_pipeline is not None:
+        estatisticas['pipeline'] = resumo_pipeline
+        for etapa in ('captura', 'inferencia', 'saida'):
+            c = resumo_pipeline[etapa]
+            print(f"  {etapa:<10} {c['itens_por_segundo']:6.1f} itens/s | {c['ms_por_item']:6.1f} ms/item | "
+                  f"{c['descartados']} descartados")
+    return estatisticas
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Reconhecimento facial em tempo real")
+    parser.add_argument('--fonte', default=0,
+                        help="Índice da câmera, arquivo de vídeo, pasta de imagens ou 'sintetico[:N]'")
+    parser.add_argument('--sem-janela', dest='exibir', action='store_false',
+                        help="Roda sem exibir a janela de vídeo (servidores sem display)")
+    parser.add_argument('--max-quadros', type=int, default=None,
+                        help="Encerra após processar este número de quadros")
+    parser.add_argument('--modelo', default='classificador.yml', help="Modelo LBPH treinado (.yml do OpenCV ou binário .lbph)")
+    parser.add_argument('--nomes', dest='arquivo_nomes', default='nomes.json', help="Mapeamento de IDs para nomes")
+    parser.add_argument('--motor', choices=['opencv', 'numpy', 'indice'], default='opencv',
+                        help="Implementação do LBPH usada no reconhecimento")
+    parser.add_argument('--pasta-logs', default='logs', help="Pasta dos logs de acesso")
+    parser.add_argument('--rastreamento', action='store_true',
+                        help="Detecta a cada N quadros e rastreia as faces entre as detecções")
+    parser.add_argument('--detectar-a-cada', type=int, default=5,
+                        help="Intervalo (em quadros) entre detecções completas no modo rastreamento")
+    parser.add_argument('--reverificar-a-cada', type=int, default=15,
+                        help="Intervalo (em quadros) para reverificar a identidade de cada face rastreada")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Separa captura, inferência e exibição em threads com filas limitadas")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="Número de threads de inferência no modo pipeline")
+    parser.add_argument('--tamanho-fila', type=int, default=2,
+                        help="Capacidade das filas entre as etapas do pipeline")
+    parser.add_argument('--eventos', dest='arquivo_eventos', default='eventos.db',
+                        help="Armazém SQLite de eventos de acesso, dentro da pasta de logs (ver eventos.py)")
+    parser.add_argument('--sem-eventos', dest='arquivo_eventos', action='store_const', const=None,
+                        help="Grava só o log de texto, sem o armazém de eventos")
+    parser.add_argument('--janela-log', type=float, default=5.0,
+                        help="Segundos para agrupar decisões repetidas da mesma pessoa no log (0 desativa)")
+    parser.add_argument('--largura-deteccao', type=int, default=None,
+                        help="Reduz o quadro a esta largura antes da detecção (padrão: deteccao.json ou resolução cheia)")
+    parser.add_argument('--face-min', type=int, default=None,
+                        help="Menor lado de face a detectar, em pixels do quadro original (padrão: deteccao.json ou 30)")
+    parser.add_argument('--face-max', type=int, default=None,
+                        help="Maior lado de face a detectar, em pixels do quadro original (padrão: deteccao.json)")
+    parser.add_argument('--roi', type=ler_roi, default=None,
+                        help="Região de busca 'x,y,largura,altura' (padrão: quadro inteiro)")
+    parser.add_argument('--janelas-faces', action='store_true',
+                        help="Procura só ao redor das faces do quadro anterior, com varredura completa periódica")
+    parser.add_argument('--backend', choices=list(BACKENDS), default=None,
+                        help="Detector de faces (padrão: o gravado por benchmarks.backends em deteccao.json, ou haar)")
+    parser.add_argument('--modelo-yunet', default=None,
+                        help="Caminho do modelo .onnx da YuNet (padrão: o de deteccao.json ou modelos/)")
+    parser.add_argument('--movimento', action='store_true',
+                        help="Só detecta/reconhece quando a cena muda (portão de movimento, ver movimento.py)")
+    parser.add_argument('--movimento-limiar', type=int, default=25,
+                        help="Diferença de nível de cinza para um pixel contar como mudança (menor = mais sensível)")
+    parser.add_argument('--movimento-area', type=float, default=0.005,
+                        help="Fração dos pixels que precisa mudar para acordar a detecção (menor = mais sensível)")
+    parser.add_argument('--batimento-a-cada', type=int, default=30,
+                        help="Com --movimento, detecta mesmo sem mudança a cada N quadros parados (0 desativa)")
+    parser.add_argument('--recarregar-a-cada', type=float, default=2.0,
+                        help="Segundos entre verificações de nova versão do modelo publicada pelo treino (0 desativa)")
+    parser.add_argument('--porta-metricas', type=int, default=None,
+                        help="Expõe as métricas em http://127.0.0.1:PORTA/metrics (formato Prometheus)")
+    parser.add_argument('--metricas-json', default=None, help="Grava as métricas neste arquivo JSON ao encerrar")
+    return parser
+
 
 if __name__ == "__main__":
+    args = criar_parser().parse_args()
     try:
-        iniciar_reconhecimento()
+        iniciar_reconhecimento(**vars(args))
     except Exception as e:
         print(f"Erro ao iniciar o reconhecimento: {str(e)}")
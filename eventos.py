@@ -0,0 +1,307 @@
+"""
+Armazém de eventos de acesso em SQLite, com consultas por período e pessoa.
+
+Cada linha do log de acessos (um `registro_acessos.EventoAgrupado`) vira uma
+linha da tabela `eventos`, com índices por momento, por pessoa e por status,
+então "todos os acessos negados do último trimestre" ou "todas as entradas
+do Ivan em março" são buscas em índice em vez de varrer meses de texto.
+A tabela `totais_diarios` (dia, pessoa, status) é atualizada na mesma
+transação de cada lote, então resumos por dia, mês, pessoa ou status de um
+ano inteiro leem alguns milhares de linhas em vez de todos os eventos.
+
+O `RegistradorAcessos` grava os eventos na thread de escrita, no mesmo lote
+das linhas de texto (uma transação por lote): o loop de vídeo continua só
+enfileirando. O banco usa WAL, então consultas não bloqueiam a escrita.
+
+`importar` traz os logs de texto antigos (ou escritos sem o armazém); linhas
+que o registrador já gravou ao vivo são reconhecidas e não entram duas vezes.
+
+Exemplos:
+    python eventos.py importar logs
+    python eventos.py consultar --de 2025-07-01 --ate 2025-07-31 --pessoa Ivan
+    python eventos.py consultar --status negado --de 2025-04-01 --limite 20
+    python eventos.py resumo --por mes --status negado
+"""
+import argparse
+import datetime
+import os
+import re
+import sqlite3
+import time
+
+ARQUIVO_EVENTOS = os.path.join('logs', 'eventos.db')
+FORMATO_MOMENTO = '%Y-%m-%d %H:%M:%S'
+AGRUPAMENTOS = {
+    'pessoa': 'pessoa',
+    'status': "CASE permitido WHEN 1 THEN 'PERMITIDO' ELSE 'NEGADO' END",
+    'dia': 'substr(inicio, 1, 10)',
+    'mes': 'substr(inicio, 1, 7)',
+    'hora': 'substr(inicio, 12, 2)',
+}
+# Os mesmos agrupamentos sobre a tabela de totais por dia (sem 'hora')
+AGRUPAMENTOS_DIARIOS = {
+    'pessoa': 'pessoa',
+    'status': AGRUPAMENTOS['status'],
+    'dia': 'dia',
+    'mes': 'substr(dia, 1, 7)',
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS eventos (
+    id INTEGER PRIMARY KEY,
+    inicio TEXT NOT NULL,
+    fim TEXT NOT NULL,
+    pessoa TEXT NOT NULL,
+    permitido INTEGER NOT NULL,
+    ocorrencias INTEGER NOT NULL DEFAULT 1,
+    confianca_min REAL,
+    confianca_media REAL,
+    origem TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS eventos_inicio ON eventos (inicio);
+CREATE INDEX IF NOT EXISTS eventos_pessoa ON eventos (pessoa, inicio);
+CREATE INDEX IF NOT EXISTS eventos_status ON eventos (permitido, inicio);
+CREATE TABLE IF NOT EXISTS totais_diarios (
+    dia TEXT NOT NULL,
+    pessoa TEXT NOT NULL,
+    permitido INTEGER NOT NULL,
+    eventos INTEGER NOT NULL,
+    ocorrencias INTEGER NOT NULL,
+    PRIMARY KEY (dia, pessoa, permitido)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS importacoes (
+    arquivo TEXT PRIMARY KEY,
+    linhas INTEGER NOT NULL
+);
+"""
+SQL_INSERIR = ('INSERT INTO eventos (inicio, fim, pessoa, permitido, ocorrencias, confianca_min, confianca_media, '
+               'origem) VALUES (?, ?, ?, ?, ?, ?, ?, ?)')
+SQL_TOTAIS = ('INSERT INTO totais_diarios (dia, pessoa, permitido, eventos, ocorrencias) VALUES (?, ?, ?, ?, ?) '
+              'ON CONFLICT (dia, pessoa, permitido) DO UPDATE SET eventos = eventos + excluded.eventos, '
+              'ocorrencias = ocorrencias + excluded.ocorrencias')
+SQL_AO_VIVO = 'SELECT 1 FROM eventos WHERE pessoa = ? AND inicio = ? AND permitido = ? AND origem = ? LIMIT 1'
+# Origem de cada evento: gravado pelo registrador ou importado de um log de texto
+ORIGEM_REGISTRADOR = 'registrador'
+ORIGEM_LOG = 'log'
+
+
+# "[2025-07-03 14:49:26] Acesso NEGADO - Pessoa: Arthur | ocorrencias: 3 | ultimo: 14:49:28 | confianca: 61.2"
+PADRAO_LINHA = re.compile(r'^\[(\d{4}-\d{2}-\d{2}) (\d{2}:\d{2}:\d{2})\] Acesso (PERMITIDO|NEGADO) - Pessoa: (.*)$')
+PADRAO_ARQUIVO_LOG = re.compile(r'^log_\d{4}-\d{2}-\d{2}\.txt$')
+
+
+def evento_para_linha(evento):
+    """(inicio, fim, pessoa, permitido, ocorrencias, confianca_min, confianca_media) de um EventoAgrupado"""
+    media = evento.confianca_soma / evento.confiancas if evento.confiancas else None
+    return (evento.primeiro.strftime(FORMATO_MOMENTO), evento.ultimo.strftime(FORMATO_MOMENTO), evento.nome,
+            int(evento.acesso_permitido), evento.ocorrencias, evento.confianca_min, media)
+
+
+def ler_linha_log(texto):
+    """Converte uma linha do log de texto em linha da tabela (None se não for um acesso)"""
+    partes = texto.rstrip('\n').split(' | ')
+    casamento = PADRAO_LINHA.match(partes[0])
+    if casamento is None:
+        return None
+    data, hora, status, pessoa = casamento.groups()
+    fim, ocorrencias, confianca_min, confianca_media = hora, 1, None, None
+    for parte in partes[1:]:
+        chave, _, valor = parte.partition(': ')
+        if chave == 'ocorrencias':
+            ocorrencias = int(valor)
+        elif chave == 'ultimo':
+            fim = valor
+        elif chave == 'confianca':
+            confianca_min = confianca_media = float(valor)
+        elif chave == 'confianca min':
+            minimo, _, media = valor.partition(' media: ')
+            confianca_min, confianca_media = float(minimo), float(media)
+    return (f'{data} {hora}', f'{data} {fim}', pessoa, int(status == 'PERMITIDO'), ocorrencias,
+            confianca_min, confianca_media)
+
+
+def _momento(valor, fim=False):
+    """Aceita 'AAAA-MM-DD', 'AAAA-MM-DD HH:MM[:SS]' ou datetime; com `fim` uma data vale o dia inteiro"""
+    if valor is None or isinstance(valor, str) and len(valor) > 10:
+        return valor
+    if isinstance(valor, datetime.datetime):
+        return valor.strftime(FORMATO_MOMENTO)
+    return f'{valor} 23:59:59' if fim else f'{valor} 00:00:00'
+
+
+def _dia_inteiro(valor):
+    return valor is None or isinstance(valor, datetime.date) and not isinstance(valor, datetime.datetime) \
+        or isinstance(valor, str) and len(valor) == 10
+
+
+class ArmazemEventos:
+    """
+    Conexão com o banco de eventos. Como toda conexão SQLite, deve ser usada
+    na thread que a criou (o `RegistradorAcessos` abre a sua na thread de escrita).
+    """
+
+    def __init__(self, caminho=ARQUIVO_EVENTOS):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        # Com WAL, NORMAL só pode perder o último lote numa queda de energia, nunca corromper o banco
+        self.conexao.execute('PRAGMA synchronous=NORMAL')
+        self.conexao.executescript(ESQUEMA)
+
+    def fechar(self):
+        self.conexao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def inserir(self, linhas, origem=ORIGEM_REGISTRADOR):
+        """Grava um lote de linhas (ver `evento_para_linha`) numa única transação"""
+        with self.conexao:
+            self._gravar(linhas, origem)
+
+    def _gravar(self, linhas, origem):
+        """Insere os eventos e soma-os aos totais diários (chamado dentro de uma transação)"""
+        self.conexao.executemany(SQL_INSERIR, [linha + (origem,) for linha in linhas])
+        totais = {}
+        for inicio, _, pessoa, permitido, ocorrencias, _, _ in linhas:
+            chave = (inicio[:10], pessoa, permitido)
+            eventos, soma = totais.get(chave, (0, 0))
+            totais[chave] = (eventos + 1, soma + ocorrencias)
+        self.conexao.executemany(SQL_TOTAIS, [chave + valores for chave, valores in totais.items()])
+
+    def _filtros(self, de=None, ate=None, pessoa=None, permitido=None, diario=False):
+        condicoes, parametros = [], []
+        if de is not None:
+            condicoes.append('dia >= ?' if diario else 'inicio >= ?')
+            parametros.append(_momento(de)[:10] if diario else _momento(de))
+        if ate is not None:
+            condicoes.append('dia <= ?' if diario else 'inicio <= ?')
+            parametros.append(_momento(ate, fim=True)[:10] if diario else _momento(ate, fim=True))
+        if pessoa is not None:
+            condicoes.append('pessoa = ?')
+            parametros.append(pessoa)
+        if permitido is not None:
+            condicoes.append('permitido = ?')
+            parametros.append(int(permitido))
+        return (' WHERE ' + ' AND '.join(condicoes) if condicoes else ''), parametros
+
+    def consultar(self, de=None, ate=None, pessoa=None, permitido=None, limite=None):
+        """Eventos do período (datas inclusivas), em ordem cronológica, como dicionários"""
+        where, parametros = self._filtros(de, ate, pessoa, permitido)
+        sql = ('SELECT inicio, fim, pessoa, permitido, ocorrencias, confianca_min, confianca_media FROM eventos'
+               + where + ' ORDER BY inicio')
+        if limite is not None:
+            sql += ' LIMIT ?'
+            parametros.append(limite)
+        colunas = ('inicio', 'fim', 'pessoa', 'permitido', 'ocorrencias', 'confianca_min', 'confianca_media')
+        return [dict(zip(colunas, linha)) for linha in self.conexao.execute(sql, parametros)]
+
+    def resumo(self, por='pessoa', de=None, ate=None, pessoa=None, permitido=None):
+        """
+        [(grupo, eventos, ocorrencias)] agrupado por pessoa, status, dia, mes ou
+        hora. Com período em dias inteiros (ou sem período) e sem agrupar por
+        hora, a soma sai dos totais diários.
+        """
+        diario = por in AGRUPAMENTOS_DIARIOS and all(_dia_inteiro(valor) for valor in (de, ate))
+        where, parametros = self._filtros(de, ate, pessoa, permitido, diario)
+        if diario:
+            sql = (f'SELECT {AGRUPAMENTOS_DIARIOS[por]} AS grupo, SUM(eventos), SUM(ocorrencias) '
+                   f'FROM totais_diarios{where} GROUP BY grupo ORDER BY grupo')
+        else:
+            sql = (f'SELECT {AGRUPAMENTOS[por]} AS grupo, COUNT(*), SUM(ocorrencias) FROM eventos{where} '
+                   f'GROUP BY grupo ORDER BY grupo')
+        return self.conexao.execute(sql, parametros).fetchall()
+
+    def importar_log(self, caminho):
+        """
+        Importa as linhas de um log de texto ainda não importadas (os logs só
+        crescem, então basta lembrar quantas linhas de cada arquivo já entraram)
+        e que o registrador não gravou ao vivo. Retorna o número de eventos novos.
+        O progresso é guardado pelo caminho real do arquivo: cada câmera tem
+        a própria pasta de logs, com os mesmos nomes log_AAAA-MM-DD.txt.
+        """
+        chave = os.path.realpath(caminho)
+        nome = os.path.basename(caminho)
+        registro = self.conexao.execute('SELECT linhas FROM importacoes WHERE arquivo = ?', (chave,)).fetchone()
+        legado = False
+        if registro is None:
+            # Bancos antigos guardavam só o nome (todos os logs numa pasta): o
+            # primeiro arquivo com esse nome herda o progresso, e a linha antiga sai
+            registro = self.conexao.execute('SELECT linhas FROM importacoes WHERE arquivo = ?', (nome,)).fetchone()
+            legado = registro is not None
+        ja_importadas = registro[0] if registro else 0
+        with open(caminho, 'r', encoding='utf-8') as f:
+            textos = f.readlines()
+        # Uma linha sem quebra no fim pode estar sendo escrita agora: fica para a próxima importação
+        if textos and not textos[-1].endswith('\n'):
+            textos.pop()
+        linhas = [linha for linha in map(ler_linha_log, textos[ja_importadas:])
+                  if linha is not None and self.conexao.execute(
+                      SQL_AO_VIVO, (linha[2], linha[0], linha[3], ORIGEM_REGISTRADOR)).fetchone() is None]
+        with self.conexao:
+            self._gravar(linhas, ORIGEM_LOG)
+            if legado:
+                self.conexao.execute('DELETE FROM importacoes WHERE arquivo = ?', (nome,))
+            self.conexao.execute('INSERT OR REPLACE INTO importacoes (arquivo, linhas) VALUES (?, ?)',
+                                 (chave, len(textos)))
+        return len(linhas)
+
+    def importar_pasta(self, pasta='logs'):
+        """Importa todos os logs/log_AAAA-MM-DD.txt; retorna {arquivo: eventos novos}"""
+        return {arquivo: self.importar_log(os.path.join(pasta, arquivo))
+                for arquivo in sorted(os.listdir(pasta)) if PADRAO_ARQUIVO_LOG.match(arquivo)}
+
+
+def _status(texto):
+    return None if texto is None else texto == 'permitido'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consultas no armazém de eventos de acesso")
+    parser.add_argument('--banco', default=ARQUIVO_EVENTOS, help="Arquivo SQLite dos eventos")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p = comandos.add_parser('importar', help="Importa os logs de texto (só as linhas novas)")
+    p.add_argument('pasta', nargs='?', default='logs')
+
+    filtros = argparse.ArgumentParser(add_help=False)
+    filtros.add_argument('--de', default=None, help="Início do período (AAAA-MM-DD ou 'AAAA-MM-DD HH:MM:SS')")
+    filtros.add_argument('--ate', default=None, help="Fim do período, inclusivo")
+    filtros.add_argument('--pessoa', default=None)
+    filtros.add_argument('--status', choices=['permitido', 'negado'], default=None)
+    p = comandos.add_parser('consultar', parents=[filtros], help="Lista os eventos do período")
+    p.add_argument('--limite', type=int, default=None)
+    p = comandos.add_parser('resumo', parents=[filtros], help="Contagens agrupadas")
+    p.add_argument('--por', choices=sorted(AGRUPAMENTOS), default='pessoa')
+    args = parser.parse_args(argv)
+
+    with ArmazemEventos(args.banco) as armazem:
+        inicio = time.perf_counter()
+        if args.comando == 'importar':
+            importados = armazem.importar_pasta(args.pasta)
+            for arquivo, total in importados.items():
+                print(f"{arquivo:<25} {total:6d} eventos")
+            print(f"✓ {sum(importados.values())} eventos importados para {args.banco}")
+        elif args.comando == 'consultar':
+            eventos = armazem.consultar(args.de, args.ate, args.pessoa, _status(args.status), args.limite)
+            for e in eventos:
+                status = 'PERMITIDO' if e['permitido'] else 'NEGADO'
+                extra = f" | ocorrencias: {e['ocorrencias']} | ultimo: {e['fim'][11:]}" if e['ocorrencias'] > 1 else ''
+                print(f"[{e['inicio']}] Acesso {status} - Pessoa: {e['pessoa']}{extra}")
+            print(f"{len(eventos)} eventos em {1000.0 * (time.perf_counter() - inicio):.1f} ms")
+        else:
+            grupos = armazem.resumo(args.por, args.de, args.ate, args.pessoa, _status(args.status))
+            print(f"{args.por:<20} {'eventos':>9} {'ocorrências':>12}")
+            for grupo, eventos, ocorrencias in grupos:
+                print(f"{grupo:<20} {eventos:>9} {ocorrencias:>12}")
+            print(f"{len(grupos)} grupos em {1000.0 * (time.perf_counter() - inicio):.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+import os
+
+import cv2
+import numpy as np
+
+EXTENSOES_IMAGEM = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+class FonteDiretorio:
+    """
+    Lê as imagens de uma pasta em ordem alfabética.
+    Tem a mesma interface de leitura do `cv2.VideoCapture` (read/isOpened/release).
+    """
+
+    def __init__(self, pasta, repetir=False):
+        self.arquivos = sorted(os.path.join(pasta, f) for f in os.listdir(pasta)
+                               if f.lower().endswith(EXTENSOES_IMAGEM))
+        self.repetir = repetir
+        self._posicao = 0
+
+    def isOpened(self):
+        return bool(self.arquivos)
+
+    def read(self):
+        if self._posicao >= len(self.arquivos):
+            if not self.repetir or not self.arquivos:
+                return False, None
+            self._posicao = 0
+        frame = cv2.imread(self.arquivos[self._posicao])
+        self._posicao += 1
+        return frame is not None, frame
+
+    def release(self):
+        self._posicao = len(self.arquivos)
+
+
+def desenhar_rosto_sintetico(tamanho=200, semente=0):
+    """
+    Desenha um rosto simples (cabeça, olhos, sobrancelhas, nariz e boca) em BGR.
+    Proporções e cores variam com a `semente`, então cada semente funciona
+    como uma identidade diferente.
+    """
+    rng = np.random.default_rng(semente)
+    rosto = np.full((tamanho, tamanho, 3), int(rng.integers(40, 80)), np.uint8)
+    c = tamanho // 2
+    pele = tuple(int(v) for v in rng.integers(120, 220, 3))
+    cv2.ellipse(rosto, (c, c), (int(tamanho * rng.uniform(0.32, 0.4)), int(tamanho * rng.uniform(0.42, 0.48))),
+                0, 0, 360, pele, -1)
+
+    olho_y = int(tamanho * rng.uniform(0.38, 0.45))
+    distancia_olhos = rng.uniform(0.12, 0.18)
+    raio_olho = rng.uniform(0.05, 0.08)
+    inclinacao = rng.uniform(-0.04, 0.04)
+    for dx in (-1, 1):
+        olho_x = c + dx * int(tamanho * distancia_olhos)
+        cv2.ellipse(rosto, (olho_x, olho_y), (int(tamanho * raio_olho), int(tamanho * raio_olho / 2)), 0, 0, 360,
+                    (245, 245, 245), -1)
+        cv2.circle(rosto, (olho_x, olho_y), int(tamanho * raio_olho * 0.45), (30, 20, 20), -1)
+        cv2.line(rosto, (olho_x - int(tamanho * 0.08), olho_y - int(tamanho * 0.08)),
+                 (olho_x + int(tamanho * 0.08), olho_y - int(tamanho * (0.08 + dx * inclinacao))),
+                 (40, 30, 30), int(rng.integers(2, 5)))
+
+    nariz = rng.uniform(0.55, 0.65)
+    cv2.line(rosto, (c, int(tamanho * 0.45)), (c - int(tamanho * 0.03), int(tamanho * nariz)), (90, 90, 120), 2)
+    boca_y = int(tamanho * rng.uniform(0.68, 0.76))
+    cv2.ellipse(rosto, (c, boca_y), (int(tamanho * rng.uniform(0.08, 0.16)), int(tamanho * rng.uniform(0.02, 0.06))),
+                0, 0, 180, (60, 60, 150), 3)
+
+    # Textura de baixa frequência própria da identidade (faz o papel de pele/cabelo)
+    textura = rng.normal(0, 14, (max(2, tamanho // 8), max(2, tamanho // 8))).astype(np.float32)
+    textura = cv2.resize(textura, (tamanho, tamanho), interpolation=cv2.INTER_CUBIC)
+    return np.clip(rosto + textura[..., None], 0, 255).astype(np.uint8)
+
+
+def carregar_rostos(pasta='users', limite=None):
+    """Carrega as fotos cadastradas em users/<nome>/ para compor quadros sintéticos"""
+    rostos = []
+    if not os.path.isdir(pasta):
+        return rostos
+    for usuario in sorted(os.listdir(pasta)):
+        caminho_usuario = os.path.join(pasta, usuario)
+        if not os.path.isdir(caminho_usuario):
+            continue
+        for imagem in sorted(os.listdir(caminho_usuario)):
+            if imagem.lower().endswith(EXTENSOES_IMAGEM):
+                rosto = cv2.imread(os.path.join(caminho_usuario, imagem))
+                if rosto is not None:
+                    rostos.append(rosto)
+                    if limite is not None and len(rostos) >= limite:
+                        return rostos
+    return rostos
+
+
+class FonteSintetica:
+    """
+    Gera quadros sem câmera: rostos (fotos cadastradas ou desenhados) se
+    movendo sobre um fundo com ruído. O resultado é determinístico para a
+    mesma `semente`, o que permite comparar execuções. Com `ausencia` > 0,
+    essa fração de cada ciclo de 100 quadros mostra só o fundo (porta vazia).
+    """
+
+    def __init__(self, quadros=300, largura=640, altura=480, rostos=None, semente=0, ausencia=0.0):
+        self.quadros = quadros
+        self.ausencia = ausencia
+        self.largura = largura
+        self.altura = altura
+        self.semente = semente
+        if not rostos:
+            rostos = [desenhar_rosto_sintetico(200, semente)]
+        self.rostos = rostos
+        self._indice = 0
+        rng = np.random.default_rng(semente)
+        self._fundo = rng.integers(60, 120, (altura, largura, 3), dtype=np.uint8)
+        self._fundo = cv2.GaussianBlur(self._fundo, (0, 0), 5)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self._indice >= self.quadros:
+            return False, None
+        frame = self._fundo.copy()
+        if self._indice % 100 < self.ausencia * 100:
+            self._indice += 1
+            return True, frame
+
+        # Um rosto por vez, trocando a cada 100 quadros, em movimento horizontal
+        rosto = self.rostos[(self._indice // 100) % len(self.rostos)]
+        tamanho = min(self.altura, self.largura) // 2
+        rosto = cv2.resize(rosto, (tamanho, tamanho))
+        fase = (self._indice % 100) / 100.0
+        x = int((self.largura - tamanho) * (0.5 + 0.4 * np.sin(2 * np.pi * fase)))
+        y = (self.altura - tamanho) // 2
+        frame[y:y+tamanho, x:x+tamanho] = rosto
+
+        self._indice += 1
+        return True, frame
+
+    def release(self):
+        self._indice = self.quadros
+
+
+def eh_camera(especificacao):
+    """Se a especificação é um índice de câmera (inteiro ou texto numérico, como vem do `--fonte`)"""
+    return isinstance(especificacao, int) or str(especificacao).isdigit()
+
+
+def abrir_fonte(especificacao=0):
+    """
+    Abre uma fonte de quadros a partir de uma especificação:
+
+    - inteiro (ou texto numérico): índice da câmera;
+    - pasta: imagens da pasta em ordem alfabética;
+    - "sintetico", "sintetico:N" ou "sintetico:N:A": N quadros gerados a
+      partir de users/, com a porta vazia em uma fração A do tempo;
+    - qualquer outro texto: arquivo de vídeo ou URL de stream.
+    """
+    if eh_camera(especificacao):
+        return cv2.VideoCapture(int(especificacao))
+    texto = str(especificacao)
+    if texto.startswith('sintetico'):
+        _, _, quadros = texto.partition(':')
+        quadros, _, ausencia = quadros.partition(':')
+        return FonteSintetica(int(quadros) if quadros else 300, rostos=carregar_rostos(),
+                              ausencia=float(ausencia) if ausencia else 0.0)
+    if os.path.isdir(texto):
+        return FonteDiretorio(texto)
+    return cv2.VideoCapture(texto)
@@ -0,0 +1,189 @@
+"""
+Índice de identidades em dois níveis para galerias grandes.
+
+1. Busca grossa: a consulta é comparada só com poucos protótipos por
+   identidade (centroide ou k-médias dos histogramas), escolhendo as
+   `candidatos` identidades mais próximas.
+2. Refinamento: a distância qui-quadrado exata é calculada apenas contra as
+   amostras dessas identidades.
+
+O índice é construído no treinamento e salvo ao lado do modelo
+(classificador.yml -> classificador.indice.npz), com um hash da galeria e
+dos rótulos para o qual foi construído.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+from lbph import DISTANCIA_MAXIMA, MotorLBPH, distancia_qui_quadrado
+
+
+def caminho_indice(modelo):
+    """Arquivo do índice correspondente a um modelo"""
+    return os.path.splitext(modelo)[0] + '.indice.npz'
+
+
+def assinatura_galeria(motor, linhas_por_bloco=4096):
+    """Hash dos rótulos e da galeria do motor (ver `assinatura_histogramas`)"""
+    return assinatura_histogramas(motor.galeria, motor.rotulos, linhas_por_bloco)
+
+
+def assinatura_histogramas(histogramas, rotulos, linhas_por_bloco=4096):
+    """
+    Hash dos rótulos e dos histogramas, na ordem dada (em float32, por
+    blocos: a galeria pode estar mapeada do disco). `histogramas` pode ser
+    um array (n, bins) ou a lista de (1, bins) do `getHistograms` do OpenCV.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(rotulos, np.int32).ravel().tobytes())
+    for inicio in range(0, len(histogramas), linhas_por_bloco):
+        h.update(np.ascontiguousarray(histogramas[inicio:inicio + linhas_por_bloco], np.float32).tobytes())
+    return h.hexdigest()
+
+
+def agrupar_prototipos(amostras, k, iteracoes=10, semente=0):
+    """
+    K-médias com distância qui-quadrado: retorna até `k` protótipos (médias
+    dos grupos) que resumem as amostras de uma identidade.
+    """
+    amostras = np.asarray(amostras, np.float32)
+    if k <= 1 or amostras.shape[0] <= k:
+        if k <= 1:
+            return amostras.mean(axis=0, keepdims=True, dtype=np.float64).astype(np.float32)
+        return amostras.copy()
+
+    rng = np.random.default_rng(semente)
+    centros = amostras[rng.choice(amostras.shape[0], k, replace=False)].copy()
+    for _ in range(iteracoes):
+        grupos = distancia_qui_quadrado(amostras, centros).argmin(axis=1)
+        novos = centros.copy()
+        for c in range(k):
+            membros = amostras[grupos == c]
+            if membros.shape[0]:
+                novos[c] = membros.mean(axis=0, dtype=np.float64)
+        if np.array_equal(novos, centros):
+            break
+        centros = novos
+    return centros
+
+
+class IndiceIdentidades:
+    """
+    Busca em dois níveis sobre a galeria de um `MotorLBPH`. Tem o mesmo
+    `predict`/`prever_lote`/`top_k` do motor, então pode substituí-lo no detector.
+    """
+
+    def __init__(self, motor, prototipos_por_identidade=1, candidatos=10):
+        self.motor = motor
+        self.prototipos_por_identidade = prototipos_por_identidade
+        self.candidatos = candidatos
+        self.prototipos = np.empty((0, motor.n_bins), np.float32)
+        self.rotulos_prototipos = np.empty(0, np.int32)
+
+    def construir(self, semente=0):
+        """Calcula os protótipos de cada identidade da galeria do motor"""
+        motor = self.motor
+        fins = np.append(motor.inicios[1:], motor.galeria.shape[0])
+        prototipos, rotulos = [], []
+        for rotulo, inicio, fim in zip(motor.identidades, motor.inicios, fins):
+            centros = agrupar_prototipos(motor.galeria[inicio:fim], self.prototipos_por_identidade,
+                                         semente=semente)
+            prototipos.append(centros)
+            rotulos.extend([rotulo] * centros.shape[0])
+        if prototipos:
+            self.prototipos = np.ascontiguousarray(np.concatenate(prototipos), np.float32)
+        self.rotulos_prototipos = np.asarray(rotulos, np.int32)
+        return self
+
+    def salvar(self, caminho):
+        # Escrita atômica: o detector em execução pode recarregar o índice a qualquer momento
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as f:
+            np.savez(f, prototipos=self.prototipos, rotulos_prototipos=self.rotulos_prototipos,
+                     prototipos_por_identidade=self.prototipos_por_identidade, amostras=self.motor.galeria.shape[0],
+                     assinatura=assinatura_galeria(self.motor))
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho, motor, candidatos=10):
+        """
+        Carrega o índice salvo para a galeria de `motor`. Se o arquivo não
+        corresponder à galeria (modelo retreinado, foto trocada ou modelo
+        copiado à mão, mesmo com o mesmo número de amostras), o índice é
+        reconstruído.
+        """
+        with np.load(caminho) as dados:
+            indice = cls(motor, int(dados['prototipos_por_identidade']), candidatos)
+            if (int(dados['amostras']) != motor.galeria.shape[0] or 'assinatura' not in dados.files
+                    or str(dados['assinatura']) != assinatura_galeria(motor)):
+                print(f"Índice {caminho} desatualizado, reconstruindo...")
+                return indice.construir()
+            indice.prototipos = dados['prototipos']
+            indice.rotulos_prototipos = dados['rotulos_prototipos']
+        return indice
+
+    def _candidatos(self, histogramas):
+        """Identidades mais próximas de cada consulta pela busca grossa: (m, c)"""
+        distancias = distancia_qui_quadrado(histogramas, self.prototipos)
+        # Menor distância por identidade (protótipos estão agrupados por rótulo)
+        identidades, inicios = np.unique(self.rotulos_prototipos, return_index=True)
+        por_identidade = np.minimum.reduceat(distancias, inicios, axis=1)
+        c = min(self.candidatos, identidades.shape[0])
+        if c == identidades.shape[0]:
+            return np.tile(identidades, (len(histogramas), 1))
+        return identidades[np.argpartition(por_identidade, c - 1, axis=1)[:, :c]]
+
+    def buscar(self, histogramas, k=1):
+        """
+        Retorna (rotulos, distancias), ambos (m, k), com as `k` identidades
+        mais próximas entre os candidatos da busca grossa (distância exata).
+        """
+        histogramas = np.atleast_2d(histogramas)
+        motor = self.motor
+        fins = np.append(motor.inicios[1:], motor.galeria.shape[0])
+        posicao = {int(r): i for i, r in enumerate(motor.identidades)}
+        rotulos = np.full((len(histogramas), k), -1, np.int32)
+        distancias = np.full((len(histogramas), k), DISTANCIA_MAXIMA)
+
+        for i, candidatos in enumerate(self._candidatos(histogramas)):
+            minimas = []
+            for rotulo in candidatos:
+                j = posicao[int(rotulo)]
+                inicio, fim = motor.inicios[j], fins[j]
+                d = distancia_qui_quadrado(histogramas[i], motor.galeria[inicio:fim], motor.somas[inicio:fim])
+                minimas.append(d.min())
+            ordem = np.argsort(minimas)[:k]
+            rotulos[i, :len(ordem)] = candidatos[ordem]
+            distancias[i, :len(ordem)] = np.asarray(minimas)[ordem]
+        return rotulos, distancias
+
+    def prever_histogramas(self, histogramas):
+        m = np.atleast_2d(histogramas).shape[0]
+        if self.prototipos.shape[0] == 0:
+            return np.full(m, -1, np.int32), np.full(m, DISTANCIA_MAXIMA)
+        rotulos, distancias = self.buscar(histogramas, k=1)
+        aceitas = distancias[:, 0] < self.motor.limiar
+        return (np.where(aceitas, rotulos[:, 0], -1).astype(np.int32),
+                np.where(aceitas, distancias[:, 0], DISTANCIA_MAXIMA))
+
+    def prever_lote(self, faces):
+        return self.prever_histogramas(self.motor.histogramas(faces))
+
+    def predict(self, face):
+        """Mesma assinatura do `cv2.face.LBPHFaceRecognizer.predict`"""
+        rotulos, distancias = self.prever_lote([face])
+        return int(rotulos[0]), float(distancias[0])
+
+    def top_k(self, faces, k=3):
+        return self.buscar(self.motor.histogramas(faces), k)
+
+
+def carregar_com_indice(modelo, candidatos=10, prototipos_por_identidade=1):
+    """Carrega o modelo (.yml ou binário) no `MotorLBPH` e o índice salvo ao lado dele (ou o constrói)"""
+    motor = MotorLBPH.carregar(modelo)
+    arquivo = caminho_indice(modelo)
+    if os.path.exists(arquivo):
+        return IndiceIdentidades.carregar(arquivo, motor, candidatos)
+    print(f"Índice {arquivo} não encontrado, construindo em memória...")
+    return IndiceIdentidades(motor, prototipos_por_identidade, candidatos).construir()
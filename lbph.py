@@ -0,0 +1,335 @@
+"""
+Motor LBPH em NumPy, compatível com o `cv2.face.LBPHFaceRecognizer`.
+
+Os histogramas são calculados exatamente como no OpenCV (mesma interpolação
+bilinear dos vizinhos, mesma grade e mesma normalização) e a galeria inteira
+fica em uma única matriz float32 contígua (n_amostras, n_bins), comparada
+com as consultas pela distância qui-quadrado alternativa (HISTCMP_CHISQR_ALT)
+usada pelo `predict` do OpenCV.
+"""
+import math
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from modelo_binario import carregar_modelo_binario, eh_modelo_binario, salvar_modelo_binario
+
+# Distância retornada pelo OpenCV quando nenhuma amostra fica abaixo do limiar
+DISTANCIA_MAXIMA = sys.float_info.max
+
+
+def calcular_lbp(imagens, raio=2, vizinhos=8):
+    """
+    LBP circular estendido (mesmo algoritmo do `elbp` do OpenCV).
+    Aceita uma imagem (h, w) ou um lote (n, h, w) de uint8 e retorna os
+    códigos int32 com `raio` pixels a menos em cada borda.
+    """
+    src = np.asarray(imagens).astype(np.float32)
+    h, w = src.shape[-2:]
+    centro = src[..., raio:h-raio, raio:w-raio]
+    codigos = np.zeros(centro.shape, np.int32)
+    eps = np.finfo(np.float32).eps
+    um = np.float32(1)
+
+    for n in range(vizinhos):
+        # Pontos de amostragem e pesos da interpolação bilinear
+        x = np.float32(raio * math.cos(2.0 * math.pi * n / vizinhos))
+        y = np.float32(-raio * math.sin(2.0 * math.pi * n / vizinhos))
+        fx, fy = int(math.floor(x)), int(math.floor(y))
+        cx, cy = int(math.ceil(x)), int(math.ceil(y))
+        ty = np.float32(y - fy)
+        tx = np.float32(x - fx)
+        w1 = (um - tx) * (um - ty)
+        w2 = tx * (um - ty)
+        w3 = (um - tx) * ty
+        w4 = tx * ty
+
+        def vizinho(dy, dx):
+            return src[..., raio+dy:h-raio+dy, raio+dx:w-raio+dx]
+
+        t = w1 * vizinho(fy, fx) + w2 * vizinho(fy, cx) + w3 * vizinho(cy, fx) + w4 * vizinho(cy, cx)
+        bit = (t > centro) | (np.abs(t - centro) < eps)
+        codigos |= bit.astype(np.int32) << n
+
+    return codigos
+
+
+def histograma_espacial(codigos, vizinhos=8, grid_x=8, grid_y=8):
+    """
+    Histogramas por célula da grade, normalizados pelo número de pixels da
+    célula e concatenados. Aceita (h, w) ou (n, h, w); retorna float32
+    (n_bins,) ou (n, n_bins) com n_bins = grid_x * grid_y * 2**vizinhos.
+    """
+    codigos = np.asarray(codigos)
+    unico = codigos.ndim == 2
+    if unico:
+        codigos = codigos[None]
+    n, h, w = codigos.shape
+    padroes = 2 ** vizinhos
+    celulas = grid_x * grid_y
+    ch, cw = h // grid_y, w // grid_x
+
+    # (n, grid_y, ch, grid_x, cw) -> (n, celula, pixels)
+    blocos = codigos[:, :grid_y*ch, :grid_x*cw].reshape(n, grid_y, ch, grid_x, cw)
+    blocos = blocos.transpose(0, 1, 3, 2, 4).reshape(n, celulas, ch * cw)
+    deslocamento = (np.arange(n)[:, None, None] * celulas + np.arange(celulas)[None, :, None]) * padroes
+    contagens = np.bincount((blocos + deslocamento).ravel(), minlength=n * celulas * padroes)
+
+    histogramas = contagens.astype(np.float32).reshape(n, celulas * padroes)
+    histogramas *= np.float32(1.0 / (ch * cw))
+    return histogramas[0] if unico else histogramas
+
+
+def extrair_histogramas(faces, raio=2, vizinhos=8, grid_x=8, grid_y=8):
+    """
+    Histogramas LBPH de uma lista (ou lote) de faces em escala de cinza.
+    Faces de mesmo tamanho são processadas juntas em uma única passada.
+    """
+    if isinstance(faces, np.ndarray) and faces.ndim == 3:
+        return histograma_espacial(calcular_lbp(faces, raio, vizinhos), vizinhos, grid_x, grid_y)
+
+    faces = list(faces)
+    n_bins = grid_x * grid_y * 2 ** vizinhos
+    histogramas = np.empty((len(faces), n_bins), np.float32)
+    grupos = {}
+    for i, face in enumerate(faces):
+        grupos.setdefault(np.shape(face), []).append(i)
+    for indices in grupos.values():
+        lote = np.stack([faces[i] for i in indices])
+        histogramas[indices] = histograma_espacial(calcular_lbp(lote, raio, vizinhos), vizinhos, grid_x, grid_y)
+    return histogramas
+
+
+def distancia_qui_quadrado(consultas, galeria, somas_galeria=None):
+    """
+    Distância qui-quadrado alternativa, 2 * soma((q - g)² / (q + g)), entre
+    cada consulta (m, n_bins) e cada linha de `galeria` (n, n_bins). Retorna (m, n).
+
+    Só as posições não nulas da consulta são comparadas termo a termo: onde
+    q = 0 o termo vale g, e essa parte sai da soma da linha (`somas_galeria`,
+    calculada aqui se não for informada).
+    """
+    consultas = np.atleast_2d(np.asarray(consultas, np.float32))
+    if somas_galeria is None:
+        somas_galeria = galeria.sum(axis=1, dtype=np.float64)
+    resultado = np.empty((consultas.shape[0], galeria.shape[0]), np.float64)
+    for i, q in enumerate(consultas):
+        nao_nulos = np.flatnonzero(q)
+        qv = q[nao_nulos]
+        # Galerias em float16 (modelo binário) são comparadas em float32
+        g = np.take(galeria, nao_nulos, axis=1).astype(np.float32, copy=False)
+        soma_g = g.sum(axis=1, dtype=np.float64)
+        denominador = g + qv
+        g -= qv
+        g *= g
+        # g + q > 0 sempre que q > 0
+        g /= denominador
+        resultado[i] = 2.0 * (g.sum(axis=1, dtype=np.float64) + somas_galeria - soma_g)
+    return resultado
+
+
+class EscritorModeloYml:
+    """
+    Grava um modelo no formato do `LBPHFaceRecognizer.write` lote a lote
+    (`escrever`), sem manter todos os histogramas na memória; os rótulos,
+    que vêm depois dos histogramas no arquivo, são gravados em `fechar()`,
+    que também é quando o arquivo de destino é substituído.
+    """
+
+    def __init__(self, caminho, raio=2, vizinhos=8, grid_x=8, grid_y=8, limiar=DISTANCIA_MAXIMA):
+        self.caminho = caminho
+        self._rotulos = []
+        # Mantém a extensão: o FileStorage escolhe o formato por ela
+        base, extensao = os.path.splitext(caminho)
+        self._temporario = f"{base}.tmp{extensao}"
+        self._fs = cv2.FileStorage(self._temporario, cv2.FILE_STORAGE_WRITE)
+        self._fs.startWriteStruct('opencv_lbphfaces', cv2.FileNode_MAP)
+        self._fs.write('threshold', float(limiar))
+        self._fs.write('radius', int(raio))
+        self._fs.write('neighbors', int(vizinhos))
+        self._fs.write('grid_x', int(grid_x))
+        self._fs.write('grid_y', int(grid_y))
+        self._fs.startWriteStruct('histograms', cv2.FileNode_SEQ)
+
+    def escrever(self, histogramas, rotulos):
+        for histograma in histogramas:
+            self._fs.write('', np.asarray(histograma, np.float32).reshape(1, -1))
+        # Cópia: o chamador pode reaproveitar o buffer de rótulos no próximo lote
+        self._rotulos.append(np.array(rotulos, np.int32).ravel())
+
+    def fechar(self):
+        fs = self._fs
+        fs.endWriteStruct()
+        rotulos = np.concatenate(self._rotulos) if self._rotulos else np.empty(0, np.int32)
+        fs.write('labels', rotulos.reshape(-1, 1))
+        fs.startWriteStruct('labelsInfo', cv2.FileNode_SEQ)
+        fs.endWriteStruct()
+        fs.endWriteStruct()
+        fs.release()
+        os.replace(self._temporario, self.caminho)
+
+    def descartar(self):
+        """Abandona a escrita sem tocar no arquivo de destino"""
+        self._fs.release()
+        if os.path.exists(self._temporario):
+            os.remove(self._temporario)
+
+
+def salvar_modelo_yml(caminho, histogramas, rotulos, raio=2, vizinhos=8, grid_x=8, grid_y=8,
+                      limiar=DISTANCIA_MAXIMA):
+    """
+    Grava histogramas e rótulos no formato do `LBPHFaceRecognizer.write`, para
+    montar um modelo do OpenCV sem recalcular os histogramas.
+    """
+    escritor = EscritorModeloYml(caminho, raio, vizinhos, grid_x, grid_y, limiar)
+    escritor.escrever(histogramas, rotulos)
+    escritor.fechar()
+
+
+class MotorLBPH:
+    """
+    Reconhecedor LBPH vetorizado. Pode ser usado no lugar do
+    `cv2.face.LBPHFaceRecognizer` (mesmo `predict`) e também responde a
+    consultas em lote (`prever_lote`) e às k identidades mais próximas (`top_k`).
+    """
+
+    def __init__(self, raio=2, vizinhos=8, grid_x=8, grid_y=8, limiar=DISTANCIA_MAXIMA):
+        self.raio = raio
+        self.vizinhos = vizinhos
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.limiar = limiar
+        # Mapa {id: nome} embutido no modelo binário (None para modelos .yml)
+        self.nomes = None
+        self.definir_galeria(np.empty((0, self.n_bins), np.float32), np.empty(0, np.int32))
+
+    @property
+    def n_bins(self):
+        return self.grid_x * self.grid_y * 2 ** self.vizinhos
+
+    @classmethod
+    def de_reconhecedor(cls, reconhecedor):
+        """Copia parâmetros e galeria de um `cv2.face.LBPHFaceRecognizer` já treinado"""
+        motor = cls(reconhecedor.getRadius(), reconhecedor.getNeighbors(), reconhecedor.getGridX(),
+                    reconhecedor.getGridY(), reconhecedor.getThreshold())
+        histogramas = reconhecedor.getHistograms()
+        if histogramas:
+            galeria = np.concatenate([h.reshape(1, -1) for h in histogramas]).astype(np.float32)
+        else:
+            galeria = np.empty((0, motor.n_bins), np.float32)
+        motor.definir_galeria(galeria, reconhecedor.getLabels().ravel())
+        return motor
+
+    @classmethod
+    def carregar_yml(cls, caminho):
+        """Carrega um modelo salvo pelo OpenCV (ex.: classificador.yml)"""
+        reconhecedor = cv2.face.LBPHFaceRecognizer_create()
+        reconhecedor.read(caminho)
+        return cls.de_reconhecedor(reconhecedor)
+
+    @classmethod
+    def carregar_binario(cls, caminho, mapear=True):
+        """
+        Carrega um modelo no formato binário (ver `modelo_binario`). Com
+        `mapear=True` a galeria fica mapeada do arquivo, sem cópia.
+        """
+        cabecalho, histogramas, rotulos, somas = carregar_modelo_binario(caminho, mapear)
+        limiar = DISTANCIA_MAXIMA if cabecalho['limiar'] is None else cabecalho['limiar']
+        motor = cls(cabecalho['raio'], cabecalho['vizinhos'], cabecalho['grid_x'], cabecalho['grid_y'], limiar)
+        motor.definir_galeria(histogramas, rotulos, somas)
+        motor.nomes = cabecalho['nomes'] or None
+        return motor
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Carrega o modelo no formato binário ou no .yml do OpenCV, conforme o arquivo"""
+        if eh_modelo_binario(caminho):
+            return cls.carregar_binario(caminho)
+        return cls.carregar_yml(caminho)
+
+    def salvar_binario(self, caminho, nomes=None, tipo='float32'):
+        salvar_modelo_binario(caminho, self.galeria, self.rotulos, self.raio, self.vizinhos, self.grid_x,
+                              self.grid_y, self.limiar, nomes if nomes is not None else self.nomes, tipo)
+
+    def salvar_yml(self, caminho):
+        """Grava a galeria como um modelo do OpenCV (lido por `reconhecedor.read`)"""
+        salvar_modelo_yml(caminho, self.galeria, self.rotulos, self.raio, self.vizinhos, self.grid_x,
+                          self.grid_y, self.limiar)
+
+    def definir_galeria(self, histogramas, rotulos, somas=None):
+        """
+        Define a galeria. As amostras são reordenadas por rótulo para que a
+        menor distância de cada identidade saia de uma única redução; se já
+        estiverem ordenadas (e em float32/float16), os arrays são usados sem
+        cópia, o que mantém uma galeria mapeada do disco compartilhada.
+        """
+        rotulos = np.asarray(rotulos, np.int32).ravel()
+        histogramas = np.asarray(histogramas)
+        if histogramas.dtype not in (np.float32, np.float16):
+            histogramas = histogramas.astype(np.float32)
+        if np.any(rotulos[1:] < rotulos[:-1]):
+            ordem = np.argsort(rotulos, kind='stable')
+            histogramas = histogramas[ordem]
+            rotulos = rotulos[ordem]
+            somas = None
+        self.galeria = np.ascontiguousarray(histogramas)
+        self.rotulos = rotulos
+        # Soma de cada linha, usada no cálculo esparso da distância
+        self.somas = somas if somas is not None else self.galeria.sum(axis=1, dtype=np.float64)
+        # Cada identidade ocupa as linhas inicios[i]:inicios[i+1] da galeria
+        self.identidades, self.inicios = np.unique(self.rotulos, return_index=True)
+
+    def histogramas(self, faces):
+        return extrair_histogramas(faces, self.raio, self.vizinhos, self.grid_x, self.grid_y)
+
+    def treinar(self, faces, rotulos):
+        self.definir_galeria(self.histogramas(faces), rotulos)
+
+    def atualizar(self, faces, rotulos):
+        """Acrescenta amostras à galeria (equivalente ao `update` do OpenCV)"""
+        self.definir_galeria(np.concatenate([self.galeria, self.histogramas(faces)]),
+                             np.concatenate([self.rotulos, np.asarray(rotulos, np.int32).ravel()]))
+
+    def distancias(self, consultas):
+        """Distâncias entre cada consulta (m, n_bins) e cada amostra da galeria: (m, n)"""
+        return distancia_qui_quadrado(consultas, self.galeria, self.somas)
+
+    def _por_identidade(self, distancias):
+        """Menor distância de cada identidade: (m, n) -> (m, n_identidades)"""
+        return np.minimum.reduceat(distancias, self.inicios, axis=1)
+
+    def prever_histogramas(self, histogramas):
+        """Como `prever_lote`, recebendo histogramas já calculados"""
+        m = np.atleast_2d(histogramas).shape[0]
+        if self.galeria.shape[0] == 0:
+            return np.full(m, -1, np.int32), np.full(m, DISTANCIA_MAXIMA)
+        distancias = self.distancias(histogramas)
+        melhores = distancias.argmin(axis=1)
+        minimas = distancias[np.arange(m), melhores]
+        aceitas = minimas < self.limiar
+        rotulos = np.where(aceitas, self.rotulos[melhores], -1).astype(np.int32)
+        return rotulos, np.where(aceitas, minimas, DISTANCIA_MAXIMA)
+
+    def prever_lote(self, faces):
+        """
+        Prevê várias faces de uma vez. Retorna (rotulos, distancias) com a
+        mesma convenção do OpenCV: -1 e DISTANCIA_MAXIMA acima do limiar.
+        """
+        return self.prever_histogramas(self.histogramas(faces))
+
+    def predict(self, face):
+        """Mesma assinatura do `cv2.face.LBPHFaceRecognizer.predict`"""
+        rotulos, distancias = self.prever_lote([face])
+        return int(rotulos[0]), float(distancias[0])
+
+    def top_k(self, faces, k=3):
+        """
+        As `k` identidades mais próximas de cada face, pela menor distância
+        entre as amostras de cada uma. Retorna (rotulos, distancias), ambos (m, k).
+        """
+        por_identidade = self._por_identidade(self.distancias(self.histogramas(faces)))
+        k = min(k, por_identidade.shape[1])
+        ordem = np.argsort(por_identidade, axis=1)[:, :k]
+        return self.identidades[ordem], np.take_along_axis(por_identidade, ordem, axis=1)
@@ -0,0 +1,102 @@
+"""
+Manifesto do treinamento incremental.
+
+Registra, na ordem em que entraram no modelo, as imagens já processadas
+(com o hash do conteúdo e quantas amostras cada uma gerou) e o ID de cada
+usuário. Com isso um novo treinamento sabe exatamente quais imagens são
+novas, quais mudaram e quais foram apagadas, e os IDs continuam os mesmos
+entre execuções (o nomes.json não é embaralhado).
+"""
+import hashlib
+import json
+import os
+
+from base_faces import BaseFaces, eh_base
+
+ARQUIVO_MANIFESTO = 'manifesto_treino.json'
+EXTENSOES_TREINO = ('.png', '.jpg', '.jpeg')
+
+
+def calcular_hash(caminho, tamanho_bloco=1 << 16):
+    """SHA-1 do conteúdo do arquivo"""
+    h = hashlib.sha1()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def novo_manifesto(parametros):
+    return {'versao': 1, 'parametros': parametros, 'usuarios': {}, 'imagens': []}
+
+
+def carregar_manifesto(caminho=ARQUIVO_MANIFESTO):
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def salvar_manifesto(manifesto, caminho=ARQUIVO_MANIFESTO):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=1, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def escanear_usuarios(path):
+    """
+    Lista as imagens de treino em users/<nome>/ com o hash de cada uma.
+    Retorna {usuario: {caminho_imagem: hash}} em ordem alfabética. Se `path`
+    for uma base empacotada, tudo vem do índice dela, sem ler as fotos.
+    """
+    if eh_base(path):
+        return BaseFaces(path).escanear()
+    encontrados = {}
+    for usuario in sorted(os.listdir(path)):
+        caminho_usuario = os.path.join(path, usuario)
+        if not os.path.isdir(caminho_usuario):
+            continue
+        encontrados[usuario] = {
+            os.path.join(caminho_usuario, imagem): calcular_hash(os.path.join(caminho_usuario, imagem))
+            for imagem in sorted(os.listdir(caminho_usuario))
+            if imagem.endswith(EXTENSOES_TREINO)
+        }
+    return encontrados
+
+
+def atribuir_ids(usuarios, ids_existentes):
+    """
+    Mantém o ID de quem já estava cadastrado e dá IDs novos (a partir do
+    maior já usado) aos usuários novos. Retorna {usuario: id}.
+    """
+    ids = {nome: id_usuario for nome, id_usuario in ids_existentes.items() if nome in usuarios}
+    proximo = max(ids_existentes.values(), default=-1) + 1
+    for usuario in usuarios:
+        if usuario not in ids:
+            ids[usuario] = proximo
+            proximo += 1
+    return ids
+
+
+def comparar(manifesto, encontrados):
+    """
+    Compara o manifesto com o estado atual de users/.
+    Retorna (mantidas, removidas, novas): as duas primeiras são entradas do
+    manifesto; `novas` é uma lista de (usuario, caminho, hash) a processar.
+    Imagens alteradas aparecem como removidas e novas.
+    """
+    atuais = {caminho: h for imagens in encontrados.values() for caminho, h in imagens.items()}
+    mantidas, removidas, conhecidas = [], [], set()
+    for entrada in manifesto['imagens']:
+        if atuais.get(entrada['arquivo']) == entrada['hash'] and entrada['usuario'] in encontrados:
+            mantidas.append(entrada)
+            conhecidas.add(entrada['arquivo'])
+        else:
+            removidas.append(entrada)
+
+    novas = [(usuario, caminho, h)
+             for usuario, imagens in encontrados.items()
+             for caminho, h in imagens.items()
+             if caminho not in conhecidas]
+    return mantidas, removidas, novas
@@ -0,0 +1,191 @@
+"""
+Métricas de desempenho do reconhecimento e do treinamento.
+
+Um registro por processo (`METRICAS`) guarda:
+
+- um histograma de latência por etapa (captura, conversão, detecção,
+  pré-processamento, predição, desenho, registro, aumento, lbp, treino...),
+  com os mesmos limites de faixa em todas as etapas;
+- contadores com rótulos (quadros, faces, descartes, predições por status...).
+
+Registrar uma observação custa uma busca binária e um incremento sob um
+lock, então os ganchos ficam sempre ligados. Os valores podem ser expostos
+em um endpoint HTTP local no formato texto do Prometheus (`servir`) e
+gravados em JSON ao final da execução (`salvar_json`).
+
+Exemplo:
+    python detector.py --porta-metricas 9100 --metricas-json logs/metricas.json
+    curl -s localhost:9100/metrics
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIXO = 'reconhecimento_facial'
+# Limites superiores das faixas dos histogramas, em segundos
+LIMITES_PADRAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histograma:
+    """Contagem de observações por faixa (a última faixa é +Inf), soma e total"""
+
+    __slots__ = ('limites', 'contagens', 'soma', 'total')
+
+    def __init__(self, limites=LIMITES_PADRAO):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def acumuladas(self):
+        """Contagens acumuladas por limite, como no `_bucket` do Prometheus"""
+        acumulado, saida = 0, []
+        for limite, contagem in zip(self.limites + (float('inf'),), self.contagens):
+            acumulado += contagem
+            saida.append((limite, acumulado))
+        return saida
+
+    def quantil(self, q):
+        """Estimativa do quantil `q` (limite superior da faixa que o contém)"""
+        if not self.total:
+            return 0.0
+        alvo = q * self.total
+        for limite, acumulado in self.acumuladas():
+            if acumulado >= alvo:
+                return limite
+        return float('inf')
+
+
+def _rotulos(rotulos):
+    if not rotulos:
+        return ''
+    texto = ','.join('{}="{}"'.format(chave, str(valor).replace('\\', '\\\\').replace('"', '\\"'))
+                     for chave, valor in rotulos)
+    return '{' + texto + '}'
+
+
+def _numero(valor):
+    return '+Inf' if valor == float('inf') else repr(float(valor))
+
+
+class Metricas:
+    """Registro de histogramas por etapa e contadores, seguro entre threads"""
+
+    def __init__(self, prefixo=PREFIXO, limites=LIMITES_PADRAO):
+        self.prefixo = prefixo
+        self.limites = limites
+        self.inicio = time.time()
+        self.histogramas = {}
+        self.contadores = {}
+        self._lock = threading.Lock()
+
+    def observar(self, etapa, segundos):
+        with self._lock:
+            histograma = self.histogramas.get(etapa)
+            if histograma is None:
+                histograma = self.histogramas[etapa] = Histograma(self.limites)
+            histograma.observar(segundos)
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self.contadores[chave] = self.contadores.get(chave, 0) + valor
+
+    def limpar(self):
+        with self._lock:
+            self.histogramas.clear()
+            self.contadores.clear()
+            self.inicio = time.time()
+
+    def texto_prometheus(self):
+        """Formato de exposição em texto do Prometheus (versão 0.0.4)"""
+        with self._lock:
+            histogramas = sorted(self.histogramas.items())
+            contadores = sorted(self.contadores.items())
+            linhas = []
+            nome = f'{self.prefixo}_etapa_segundos'
+            if histogramas:
+                linhas.append(f'# HELP {nome} Latência de cada etapa, em segundos')
+                linhas.append(f'# TYPE {nome} histogram')
+            for etapa, histograma in histogramas:
+                for limite, acumulado in histograma.acumuladas():
+                    linhas.append(f'{nome}_bucket{_rotulos([("etapa", etapa), ("le", _numero(limite))])} {acumulado}')
+                linhas.append(f'{nome}_sum{_rotulos([("etapa", etapa)])} {_numero(histograma.soma)}')
+                linhas.append(f'{nome}_count{_rotulos([("etapa", etapa)])} {histograma.total}')
+            declarados = set()
+            for (contador, rotulos), valor in contadores:
+                nome = f'{self.prefixo}_{contador}_total'
+                if nome not in declarados:
+                    declarados.add(nome)
+                    linhas.append(f'# TYPE {nome} counter')
+                linhas.append(f'{nome}{_rotulos(rotulos)} {valor}')
+        return '\n'.join(linhas) + '\n'
+
+    def para_dict(self):
+        with self._lock:
+            etapas = {}
+            for etapa, h in sorted(self.histogramas.items()):
+                etapas[etapa] = {
+                    'total': h.total,
+                    'soma_s': round(h.soma, 6),
+                    'media_ms': round(1000.0 * h.soma / h.total, 3) if h.total else 0.0,
+                    'p50_ms_max': 1000.0 * h.quantil(0.5),
+                    'p95_ms_max': 1000.0 * h.quantil(0.95),
+                    'p99_ms_max': 1000.0 * h.quantil(0.99),
+                    'faixas': {_numero(limite): contagem for limite, contagem in h.acumuladas()},
+                }
+            contadores = {}
+            for (contador, rotulos), valor in sorted(self.contadores.items()):
+                contadores.setdefault(contador, {})[_rotulos(rotulos) or 'total'] = valor
+            return {'inicio': self.inicio, 'duracao_s': round(time.time() - self.inicio, 3),
+                    'etapas': etapas, 'contadores': contadores}
+
+    def salvar_json(self, caminho):
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.para_dict(), f, indent=2, ensure_ascii=False)
+        os.replace(temporario, caminho)
+
+
+# Registro do processo, usado pelos ganchos do detector e do treinamento
+METRICAS = Metricas()
+
+
+def servir(porta, host='127.0.0.1', metricas=METRICAS):
+    """
+    Sobe o endpoint local em uma thread em segundo plano: /metrics (texto do
+    Prometheus) e /metrics.json. Retorna o servidor (`shutdown()` encerra).
+    """
+
+    class Manipulador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] == '/metrics':
+                corpo, tipo = metricas.texto_prometheus(), 'text/plain; version=0.0.4; charset=utf-8'
+            elif self.path.split('?')[0] == '/metrics.json':
+                corpo, tipo = json.dumps(metricas.para_dict(), ensure_ascii=False), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            dados = corpo.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', tipo)
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, porta), Manipulador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name='metricas-http', daemon=True).start()
+    print(f"Métricas em http://{host}:{servidor.server_address[1]}/metrics")
+    return servidor
@@ -0,0 +1,228 @@
+"""
+Formato binário do modelo LBPH (classificador.lbph).
+
+O `classificador.yml` do OpenCV guarda cada histograma como texto e precisa
+ser interpretado inteiro a cada inicialização. Aqui a galeria fica em um
+único arquivo mapeável em memória:
+
+    MAGICO (8 bytes) | tamanho do cabeçalho (uint32) | cabeçalho JSON
+    | histogramas (n, n_bins) float32 ou float16 | rótulos (n,) int32
+    | somas (n,) float64
+
+O cabeçalho traz os parâmetros do LBPH, o limiar, o mapa de nomes e a
+posição de cada bloco (alinhada em 64 bytes). As amostras já ficam ordenadas
+por rótulo e a soma de cada linha já vem calculada, então carregar é só mapear
+o arquivo: o sistema operacional lê as páginas sob demanda e vários
+processos do detector na mesma máquina compartilham as mesmas páginas.
+
+Conversão de um modelo existente:
+    python modelo_binario.py classificador.yml --nomes nomes.json
+"""
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGICO = b'LBPHBIN\0'
+VERSAO_FORMATO = 1
+EXTENSAO_BINARIA = '.lbph'
+ALINHAMENTO = 64
+TIPOS_HISTOGRAMA = ('float32', 'float16')
+
+
+def caminho_binario(modelo):
+    """Arquivo binário correspondente a um modelo (classificador.yml -> classificador.lbph)"""
+    return os.path.splitext(modelo)[0] + EXTENSAO_BINARIA
+
+
+def eh_modelo_binario(caminho):
+    """Confere a assinatura do arquivo (não depende da extensão)"""
+    try:
+        with open(caminho, 'rb') as f:
+            return f.read(len(MAGICO)) == MAGICO
+    except OSError:
+        return False
+
+
+def _alinhar(posicao):
+    return (posicao + ALINHAMENTO - 1) // ALINHAMENTO * ALINHAMENTO
+
+
+class EscritorModeloBinario:
+    """
+    Grava um modelo binário aos poucos, sem manter a galeria na memória:
+    as posições dos blocos saem do número total de `amostras`, informado
+    antes, e os histogramas são escritos em sequência por `escrever`.
+    Os lotes devem chegar já ordenados por rótulo. `fechar()` grava rótulos
+    e somas e só então substitui o arquivo de destino.
+    """
+
+    def __init__(self, caminho, amostras, raio=2, vizinhos=8, grid_x=8, grid_y=8, limiar=None, nomes=None,
+                 tipo='float32'):
+        if tipo not in TIPOS_HISTOGRAMA:
+            raise ValueError(f"Tipo de histograma inválido: {tipo} (use {', '.join(TIPOS_HISTOGRAMA)})")
+        self.caminho = caminho
+        self.n_bins = grid_x * grid_y * 2 ** vizinhos
+        self.tipo = tipo
+        self.amostras = int(amostras)
+        self.rotulos = np.empty(self.amostras, np.int32)
+        self.somas = np.empty(self.amostras, np.float64)
+        self.escritas = 0
+
+        cabecalho = {
+            'versao': VERSAO_FORMATO,
+            'raio': int(raio), 'vizinhos': int(vizinhos), 'grid_x': int(grid_x), 'grid_y': int(grid_y),
+            'limiar': None if limiar is None else float(limiar),
+            'amostras': self.amostras, 'n_bins': self.n_bins, 'tipo': tipo,
+            'nomes': {str(k): v for k, v in (nomes or {}).items()},
+        }
+        # O tamanho do cabeçalho depende das posições; reserva espaço fixo para elas
+        tamanhos = (('histogramas', self.amostras * self.n_bins * np.dtype(tipo).itemsize),
+                    ('rotulos', self.rotulos.nbytes), ('somas', self.somas.nbytes))
+        cabecalho.update({nome: 0 for nome, _ in tamanhos})
+        texto = json.dumps(cabecalho, ensure_ascii=False).encode('utf-8')
+        posicao = _alinhar(len(MAGICO) + 4 + len(texto) + 3 * 20)
+        for nome, tamanho in tamanhos:
+            cabecalho[nome] = posicao
+            posicao = _alinhar(posicao + tamanho)
+        self.cabecalho = cabecalho
+        self._fim = posicao
+
+        self._temporario = caminho + '.tmp'
+        self._arquivo = open(self._temporario, 'wb')
+        texto = json.dumps(cabecalho, ensure_ascii=False).encode('utf-8')
+        self._arquivo.write(MAGICO)
+        self._arquivo.write(struct.pack('<I', len(texto)))
+        self._arquivo.write(texto)
+        self._arquivo.seek(cabecalho['histogramas'])
+
+    def escrever(self, histogramas, rotulos):
+        """Acrescenta um lote de histogramas (m, n_bins) com seus rótulos"""
+        rotulos = np.asarray(rotulos, np.int32).ravel()
+        histogramas = np.ascontiguousarray(np.asarray(histogramas).reshape(-1, self.n_bins), self.tipo)
+        inicio, fim = self.escritas, self.escritas + rotulos.shape[0]
+        if histogramas.shape[0] != rotulos.shape[0]:
+            raise ValueError(f"{histogramas.shape[0]} histogramas para {rotulos.shape[0]} rótulos")
+        if fim > self.amostras:
+            raise ValueError(f"Mais amostras do que as {self.amostras} previstas")
+        anterior = self.rotulos[inicio - 1:inicio]
+        if np.any(np.diff(np.concatenate([anterior, rotulos])) < 0):
+            raise ValueError("As amostras devem ser escritas em ordem de rótulo")
+        self._arquivo.write(histogramas.tobytes())
+        self.rotulos[inicio:fim] = rotulos
+        # Soma calculada sobre os valores gravados (mesma precisão usada na busca)
+        self.somas[inicio:fim] = histogramas.sum(axis=1, dtype=np.float64)
+        self.escritas = fim
+
+    def fechar(self):
+        if self.escritas != self.amostras:
+            self.descartar()
+            raise ValueError(f"Foram escritas {self.escritas} de {self.amostras} amostras previstas")
+        for nome, dados in (('rotulos', self.rotulos), ('somas', self.somas)):
+            self._arquivo.seek(self.cabecalho[nome])
+            self._arquivo.write(dados.tobytes())
+        self._arquivo.truncate(self._fim)
+        self._arquivo.close()
+        os.replace(self._temporario, self.caminho)
+
+    def descartar(self):
+        """Abandona a escrita sem tocar no arquivo de destino"""
+        self._arquivo.close()
+        if os.path.exists(self._temporario):
+            os.remove(self._temporario)
+
+
+def salvar_modelo_binario(caminho, histogramas, rotulos, raio=2, vizinhos=8, grid_x=8, grid_y=8,
+                          limiar=None, nomes=None, tipo='float32'):
+    """
+    Grava a galeria no formato binário. As amostras são ordenadas por rótulo
+    (ordem estável) e `tipo` define a precisão dos histogramas no disco
+    ('float16' ocupa metade do espaço). A escrita é atômica: o arquivo só
+    substitui o anterior depois de completo.
+    """
+    rotulos = np.asarray(rotulos, np.int32).ravel()
+    histogramas = np.asarray(histogramas)
+    ordem = np.argsort(rotulos, kind='stable')
+    escritor = EscritorModeloBinario(caminho, rotulos.shape[0], raio, vizinhos, grid_x, grid_y, limiar, nomes,
+                                     tipo)
+    try:
+        escritor.escrever(histogramas.reshape(-1, escritor.n_bins)[ordem], rotulos[ordem])
+    except Exception:
+        escritor.descartar()
+        raise
+    escritor.fechar()
+
+
+def ler_cabecalho(caminho):
+    with open(caminho, 'rb') as f:
+        if f.read(len(MAGICO)) != MAGICO:
+            raise ValueError(f"{caminho} não é um modelo binário LBPH")
+        (tamanho,) = struct.unpack('<I', f.read(4))
+        cabecalho = json.loads(f.read(tamanho).decode('utf-8'))
+    if cabecalho['versao'] != VERSAO_FORMATO:
+        raise ValueError(f"Versão do modelo binário não suportada: {cabecalho['versao']}")
+    return cabecalho
+
+
+def carregar_modelo_binario(caminho, mapear=True):
+    """
+    Retorna (cabecalho, histogramas, rotulos, somas). Com `mapear=True` os
+    arrays são mapeados do arquivo (somente leitura, sem cópia); com False,
+    são lidos para a memória.
+    """
+    cabecalho = ler_cabecalho(caminho)
+    n, n_bins = cabecalho['amostras'], cabecalho['n_bins']
+    formatos = {'histogramas': (cabecalho['tipo'], (n, n_bins)), 'rotulos': (np.int32, (n,)),
+                'somas': (np.float64, (n,))}
+    arrays = {}
+    for nome, (tipo, forma) in formatos.items():
+        if n == 0:
+            arrays[nome] = np.empty(forma, tipo)
+        elif mapear:
+            arrays[nome] = np.memmap(caminho, dtype=tipo, mode='r', offset=cabecalho[nome], shape=forma)
+        else:
+            with open(caminho, 'rb') as f:
+                f.seek(cabecalho[nome])
+                arrays[nome] = np.fromfile(f, dtype=tipo, count=int(np.prod(forma))).reshape(forma)
+    return cabecalho, arrays['histogramas'], arrays['rotulos'], arrays['somas']
+
+
+def converter_yml(origem, destino=None, arquivo_nomes=None, tipo='float32'):
+    """Converte um modelo do OpenCV (.yml) para o formato binário; retorna o caminho gravado"""
+    import cv2
+
+    destino = destino or caminho_binario(origem)
+    reconhecedor = cv2.face.LBPHFaceRecognizer_create()
+    reconhecedor.read(origem)
+    histogramas = reconhecedor.getHistograms()
+    n_bins = reconhecedor.getGridX() * reconhecedor.getGridY() * 2 ** reconhecedor.getNeighbors()
+    galeria = (np.concatenate([h.reshape(1, -1) for h in histogramas]) if histogramas
+               else np.empty((0, n_bins), np.float32))
+    nomes = None
+    if arquivo_nomes and os.path.exists(arquivo_nomes):
+        with open(arquivo_nomes, 'r', encoding='utf-8') as f:
+            nomes = json.load(f)
+    salvar_modelo_binario(destino, galeria, reconhecedor.getLabels().ravel(), reconhecedor.getRadius(),
+                          reconhecedor.getNeighbors(), reconhecedor.getGridX(), reconhecedor.getGridY(),
+                          reconhecedor.getThreshold(), nomes, tipo)
+    return destino
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Converte um modelo LBPH do OpenCV (.yml) para o formato binário")
+    parser.add_argument('origem', nargs='?', default='classificador.yml')
+    parser.add_argument('--saida', default=None, help="Arquivo de destino (padrão: mesmo nome com .lbph)")
+    parser.add_argument('--nomes', default='nomes.json', help="Mapeamento de nomes embutido no modelo")
+    parser.add_argument('--float16', action='store_true', help="Grava os histogramas em float16 (metade do tamanho)")
+    args = parser.parse_args(argv)
+
+    destino = converter_yml(args.origem, args.saida, args.nomes, 'float16' if args.float16 else 'float32')
+    cabecalho = ler_cabecalho(destino)
+    print(f"✓ {args.origem} ({os.path.getsize(args.origem) / 1e6:.1f} MB) -> "
+          f"{destino} ({os.path.getsize(destino) / 1e6:.1f} MB, {cabecalho['amostras']} amostras, {cabecalho['tipo']})")
+
+
+if __name__ == '__main__':
+    main()
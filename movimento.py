@@ -0,0 +1,88 @@
+"""
+Portão de movimento na frente da detecção.
+
+Na maior parte do dia não há ninguém na porta, mas o detector roda o cascade
+Haar e o reconhecimento em todo quadro. O `PortaoMovimento` compara cada
+quadro, reduzido a `largura` pixels e suavizado, com um modelo de fundo
+(média móvel; o peso `aprendizado` do quadro novo é alto o bastante para que
+o "fantasma" de quem saiu da porta suma em poucos quadros) e só libera a
+detecção quando uma fração `area_minima` dos pixels muda mais que `limiar`
+níveis de cinza. O custo é o de um resize e algumas operações em uma imagem
+de ~80x60.
+
+- o quadro em que o movimento aparece já é processado (acorda no mesmo
+  quadro);
+- enquanto o último quadro processado tinha faces, a detecção continua, e
+  ainda por `manter` quadros depois do último movimento (alguém parado na
+  porta continua sendo acompanhado);
+- sem movimento, uma detecção de "batimento" roda a cada
+  `batimento_a_cada` quadros (0 desativa), para mudanças lentas que o
+  modelo de fundo absorveria.
+"""
+import cv2
+import numpy as np
+
+# Decisões do portão, usadas como rótulo da métrica `portao_movimento`
+PROCESSADO = 'processado'
+BATIMENTO = 'batimento'
+IGNORADO = 'ignorado'
+
+
+class PortaoMovimento:
+    """
+    `avaliar(gray, faces_anteriores)` retorna a decisão para o quadro:
+    PROCESSADO, BATIMENTO (os dois pedem a detecção) ou IGNORADO.
+    Não é thread-safe: use um por worker.
+    """
+
+    def __init__(self, limiar=25, area_minima=0.005, largura=80, aprendizado=0.25, manter=15,
+                 batimento_a_cada=30):
+        self.limiar = limiar
+        self.area_minima = area_minima
+        self.largura = largura
+        self.aprendizado = aprendizado
+        self.manter = manter
+        self.batimento_a_cada = batimento_a_cada
+        self.fundo = None
+        self._reduzido = None
+        self._diferenca = None
+        self.sem_movimento = 0
+        self.sem_processar = 0
+        self.ultima_area = 0.0
+
+    def _reduzir(self, gray):
+        altura, largura = gray.shape[:2]
+        tamanho = (self.largura, max(1, round(altura * self.largura / largura)))
+        if self._reduzido is None or self._reduzido.shape != (tamanho[1], tamanho[0]):
+            self._reduzido = np.empty((tamanho[1], tamanho[0]), np.uint8)
+            self._diferenca = np.empty_like(self._reduzido)
+            self.fundo = None
+        cv2.resize(gray, tamanho, dst=self._reduzido, interpolation=cv2.INTER_AREA)
+        cv2.GaussianBlur(self._reduzido, (5, 5), 0, dst=self._reduzido)
+        return self._reduzido
+
+    def movimento(self, gray):
+        """Atualiza o modelo de fundo e diz se houve mudança no quadro"""
+        reduzido = self._reduzir(gray)
+        if self.fundo is None:
+            self.fundo = reduzido.astype(np.float32)
+            self.ultima_area = 1.0
+            return True
+        cv2.absdiff(reduzido, cv2.convertScaleAbs(self.fundo), dst=self._diferenca)
+        self.ultima_area = np.count_nonzero(self._diferenca > self.limiar) / self._diferenca.size
+        cv2.accumulateWeighted(reduzido, self.fundo, self.aprendizado)
+        return self.ultima_area >= self.area_minima
+
+    def avaliar(self, gray, faces_anteriores=0):
+        if self.movimento(gray):
+            self.sem_movimento = 0
+        else:
+            self.sem_movimento += 1
+        if faces_anteriores or self.sem_movimento <= self.manter:
+            self.sem_processar = 0
+            return PROCESSADO
+        self.sem_processar += 1
+        if self.batimento_a_cada and self.sem_processar >= self.batimento_a_cada:
+            self.sem_processar = 0
+            return BATIMENTO
+        return IGNORADO
@@ -0,0 +1,218 @@
+import threading
+import time
+from collections import deque
+
+from metricas import METRICAS
+
+# Latências de quadro guardadas para os percentis do resumo: só as mais
+# recentes, para a memória não crescer num terminal que roda o dia inteiro
+# (a distribuição completa fica no histograma `quadro` das métricas)
+MAX_LATENCIAS = 10000
+
+
+class FilaFechada(Exception):
+    """Sinaliza que a fila foi fechada e não há mais itens para consumir"""
+
+
+class FilaUltimoQuadro:
+    """
+    Fila limitada com política "último quadro vence": ao inserir com a fila
+    cheia, o item mais antigo é descartado em vez de bloquear o produtor.
+    """
+
+    def __init__(self, capacidade=2):
+        self._itens = deque()
+        self._capacidade = max(1, capacidade)
+        self._cond = threading.Condition()
+        self._fechada = False
+        self.descartados = 0
+
+    def colocar(self, item):
+        """Insere o item; retorna o item descartado (ou None)"""
+        with self._cond:
+            descartado = None
+            if len(self._itens) >= self._capacidade:
+                descartado = self._itens.popleft()
+                self.descartados += 1
+            self._itens.append(item)
+            self._cond.notify()
+            return descartado
+
+    def retirar(self, timeout=None):
+        """Retira o item mais antigo; levanta FilaFechada quando esgotada"""
+        with self._cond:
+            limite = None if timeout is None else time.monotonic() + timeout
+            while not self._itens:
+                if self._fechada:
+                    raise FilaFechada()
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return None
+                self._cond.wait(restante)
+            return self._itens.popleft()
+
+    def fechar(self):
+        with self._cond:
+            self._fechada = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._itens)
+
+
+class ContadorEtapa:
+    """Contador de vazão e tempo acumulado de uma etapa do pipeline"""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.itens = 0
+        self.descartados = 0
+        self.tempo_total = 0.0
+        self._inicio = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def registrar(self, duracao):
+        with self._lock:
+            self.itens += 1
+            self.tempo_total += duracao
+        METRICAS.observar(f'pipeline_{self.nome}', duracao)
+
+    def descartar(self, quantidade=1):
+        with self._lock:
+            self.descartados += quantidade
+        METRICAS.incrementar('descartes', quantidade, etapa=self.nome)
+
+    def resumo(self):
+        with self._lock:
+            decorrido = time.perf_counter() - self._inicio
+            return {
+                'itens': self.itens,
+                'descartados': self.descartados,
+                'itens_por_segundo': self.itens / decorrido if decorrido > 0 else 0.0,
+                'ms_por_item': 1000.0 * self.tempo_total / self.itens if self.itens else 0.0,
+            }
+
+
+class PipelineReconhecimento:
+    """
+    Pipeline em três etapas ligadas por filas limitadas:
+
+    - captura: uma thread lendo quadros da fonte;
+    - inferência: `workers` threads, cada uma com o próprio processador
+      criado por `criar_processador()` (o OpenCV libera o GIL nas chamadas
+      pesadas, então as threads escalam em vários núcleos);
+    - saída: roda na thread que chama `executar()` (exigência do `imshow`),
+      descartando resultados que chegam fora de ordem.
+
+    `ler_quadro()` retorna (ret, frame) como `cv2.VideoCapture.read`;
+    o processador recebe o frame e retorna os resultados da análise;
+    `saida(frame, resultados)` retorna False para encerrar o pipeline.
+    Como a saída pode não ver todos os resultados, o que não pode se perder
+    (como o registro de acessos) deve ser feito pelo processador.
+    """
+
+    def __init__(self, ler_quadro, criar_processador, saida, workers=2, tamanho_fila=2):
+        self.ler_quadro = ler_quadro
+        self.criar_processador = criar_processador
+        self.saida = saida
+        self.workers = max(1, workers)
+        self.fila_entrada = FilaUltimoQuadro(tamanho_fila)
+        self.fila_saida = FilaUltimoQuadro(tamanho_fila)
+        self.contadores = {nome: ContadorEtapa(nome) for nome in ('captura', 'inferencia', 'saida')}
+        self._parar = threading.Event()
+        self.latencias = deque(maxlen=MAX_LATENCIAS)
+        self._workers_ativos = 0
+        self._lock = threading.Lock()
+
+    def _loop_captura(self):
+        contador = self.contadores['captura']
+        sequencia = 0
+        try:
+            while not self._parar.is_set():
+                inicio = time.perf_counter()
+                ret, frame = self.ler_quadro()
+                if not ret:
+                    break
+                contador.registrar(time.perf_counter() - inicio)
+                if self.fila_entrada.colocar((sequencia, time.perf_counter(), frame)) is not None:
+                    contador.descartar()
+                sequencia += 1
+        finally:
+            self.fila_entrada.fechar()
+
+    def _loop_inferencia(self):
+        contador = self.contadores['inferencia']
+        try:
+            processar = self.criar_processador()
+            while not self._parar.is_set():
+                try:
+                    item = self.fila_entrada.retirar(timeout=0.1)
+                except FilaFechada:
+                    break
+                if item is None:
+                    continue
+                sequencia, capturado_em, frame = item
+                inicio = time.perf_counter()
+                resultados = processar(frame)
+                contador.registrar(time.perf_counter() - inicio)
+                if self.fila_saida.colocar((sequencia, capturado_em, frame, resultados)) is not None:
+                    contador.descartar()
+        finally:
+            with self._lock:
+                self._workers_ativos -= 1
+                if self._workers_ativos == 0:
+                    self.fila_saida.fechar()
+
+    def executar(self):
+        """
+        Executa o pipeline até a fonte acabar ou a saída pedir para parar.
+        As latências de ponta a ponta (captura até saída) dos últimos
+        MAX_LATENCIAS quadros ficam em `self.latencias`.
+        """
+        self._workers_ativos = self.workers
+        threads = [threading.Thread(target=self._loop_captura, name='captura', daemon=True)]
+        threads += [threading.Thread(target=self._loop_inferencia, name=f'inferencia-{i}', daemon=True)
+                    for i in range(self.workers)]
+        for t in threads:
+            t.start()
+
+        contador = self.contadores['saida']
+        latencias = self.latencias
+        ultima_sequencia = -1
+        try:
+            while True:
+                try:
+                    item = self.fila_saida.retirar(timeout=0.1)
+                except FilaFechada:
+                    break
+                if item is None:
+                    continue
+                sequencia, capturado_em, frame, resultados = item
+                if sequencia < ultima_sequencia:
+                    # Um worker mais rápido já entregou um quadro mais novo
+                    contador.descartar()
+                    continue
+                ultima_sequencia = sequencia
+
+                inicio = time.perf_counter()
+                continuar = self.saida(frame, resultados)
+                agora = time.perf_counter()
+                contador.registrar(agora - inicio)
+                latencias.append(agora - capturado_em)
+                METRICAS.observar('quadro', agora - capturado_em)
+                if continuar is False:
+                    break
+        finally:
+            self._parar.set()
+            for t in threads:
+                t.join(timeout=2.0)
+
+        return self.resumo(latencias)
+
+    def resumo(self, latencias=()):
+        """Contadores por etapa e latência média de ponta a ponta"""
+        resumo = {nome: c.resumo() for nome, c in self.contadores.items()}
+        if latencias:
+            resumo['latencia_media_ms'] = 1000.0 * sum(latencias) / len(latencias)
+        return resumo
@@ -0,0 +1,99 @@
+"""
+Pré-processamento das faces, o mesmo no treinamento e no reconhecimento.
+
+A receita é única: escala de cinza -> redimensionamento para `TAMANHO_FACE`
+(INTER_AREA) -> equalização de histograma -> normalização de contraste
+(min-max) -> filtro bilateral -> CLAHE. O `treinar.py` aplica a receita à
+foto inteira antes do aumento de dados e o `detector.py` ao recorte de cada
+face, então o LBPH compara histogramas calculados sobre faces preparadas do
+mesmo jeito e na mesma resolução.
+
+No detector, o `PreprocessadorFaces` prepara todas as faces de um quadro de
+uma vez, escrevendo direto em um buffer (n, altura, largura) reaproveitado
+entre os quadros: nenhum array intermediário é alocado por face.
+"""
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from base_faces import ler_imagem
+
+# Resolução (largura, altura) das faces entregues ao LBPH
+TAMANHO_FACE = (250, 250)
+# Faz parte dos parâmetros do treinamento: mudar a receita invalida o cache e o manifesto
+VERSAO_PREPROCESSAMENTO = 2
+
+
+def para_cinza(imagem):
+    """Imagem BGR (ou já em cinza) para escala de cinza, como o detector converte os quadros"""
+    if imagem.ndim == 3:
+        return cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
+    return imagem
+
+
+def criar_clahe():
+    return cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+
+
+@lru_cache(maxsize=None)
+def _clahe_padrao():
+    return criar_clahe()
+
+
+def preprocessar(face, saida=None, tamanho=TAMANHO_FACE, temporario=None, clahe=None):
+    """
+    Aplica a receita a uma face em escala de cinza de qualquer tamanho.
+    Com `saida` e `temporario` (uint8, altura x largura, contíguos), escreve
+    neles sem alocar; `clahe` permite um objeto CLAHE por thread.
+    """
+    forma = (tamanho[1], tamanho[0])
+    if saida is None:
+        saida = np.empty(forma, np.uint8)
+    if temporario is None:
+        temporario = np.empty(forma, np.uint8)
+    cv2.resize(face, tamanho, dst=temporario, interpolation=cv2.INTER_AREA)
+    cv2.equalizeHist(temporario, dst=temporario)
+    cv2.normalize(temporario, temporario, 0, 255, cv2.NORM_MINMAX)
+    # Reduz ruído preservando bordas (o filtro bilateral não trabalha no lugar)
+    cv2.bilateralFilter(temporario, 9, 75, 75, dst=saida)
+    (clahe or _clahe_padrao()).apply(saida, saida)
+    return saida
+
+
+def carregar_face(caminho, tamanho=TAMANHO_FACE):
+    """Lê uma foto (arquivo ou referência da base empacotada) e aplica a receita (caminho do treinamento)"""
+    imagem = ler_imagem(caminho)
+    if imagem is None:
+        raise ValueError(f"Não foi possível ler a imagem: {caminho}")
+    return preprocessar(para_cinza(imagem), tamanho=tamanho)
+
+
+class PreprocessadorFaces:
+    """
+    Prepara as faces de um quadro em lote. `lote(gray, regioes)` devolve uma
+    visão (n, altura, largura) do buffer interno, válida até a próxima
+    chamada; o buffer só cresce (dobrando) quando um quadro tem mais faces do
+    que a capacidade atual. Não é thread-safe: use um por worker.
+    """
+
+    def __init__(self, tamanho=TAMANHO_FACE, capacidade=4):
+        self.tamanho = tamanho
+        self._buffer = np.empty((capacidade, tamanho[1], tamanho[0]), np.uint8)
+        self._temporario = np.empty((tamanho[1], tamanho[0]), np.uint8)
+        self._clahe = criar_clahe()
+
+    def lote(self, gray, regioes):
+        return self.lote_de_quadros([(gray, regioes)])
+
+    def lote_de_quadros(self, quadros):
+        """Como `lote`, para as faces de vários quadros [(gray, regioes)], na ordem em que aparecem"""
+        n = sum(len(regioes) for _, regioes in quadros)
+        if n > self._buffer.shape[0]:
+            self._buffer = np.empty((max(n, 2 * self._buffer.shape[0]),) + self._buffer.shape[1:], np.uint8)
+        i = 0
+        for gray, regioes in quadros:
+            for x, y, w, h in regioes:
+                preprocessar(gray[y:y + h, x:x + w], self._buffer[i], self.tamanho, self._temporario, self._clahe)
+                i += 1
+        return self._buffer[:n]
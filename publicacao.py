@@ -0,0 +1,121 @@
+"""
+Publicação de modelos treinados e recarga no detector em execução.
+
+Cada arquivo do modelo (.yml, .lbph, índice, nomes.json) é gravado de forma
+atômica, mas o conjunto só vale depois que todos foram substituídos. Por isso
+o treinamento termina gravando um selo de versão, `<modelo>.versao.json`,
+sempre por último:
+
+    {"versao": 7, "data": "2024-05-02T14:03:11", "modo": "incremental", ...}
+
+O detector observa só o selo (`ModeloAtivo`). Quando ele muda, o novo
+reconhecedor e o novo mapa de nomes são carregados numa thread à parte,
+enquanto os quadros continuam sendo analisados com o modelo anterior; a troca
+é a substituição de uma única referência, então cada quadro usa um par
+(reconhecedor, nomes) consistente e nenhum quadro é perdido.
+"""
+import datetime
+import json
+import os
+import threading
+from collections import namedtuple
+
+SUFIXO_VERSAO = '.versao.json'
+
+# Modelo em uso: reconhecedor, mapa de nomes e o selo de versão correspondente
+VersaoModelo = namedtuple('VersaoModelo', ['reconhecedor', 'nomes', 'selo'])
+
+
+def caminho_versao(modelo):
+    """Selo de versão de um modelo (classificador.yml ou .lbph -> classificador.versao.json)"""
+    return os.path.splitext(modelo)[0] + SUFIXO_VERSAO
+
+
+def salvar_json_atomico(caminho, dados, **opcoes):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, **opcoes)
+    os.replace(temporario, caminho)
+
+
+def ler_versao(modelo):
+    """Selo de versão publicado para o modelo, ou None se ainda não houver"""
+    try:
+        with open(caminho_versao(modelo), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def publicar_versao(modelo, **informacoes):
+    """
+    Grava o selo de uma nova versão do modelo (número anterior + 1). Deve ser
+    chamado depois que todos os arquivos do modelo já foram gravados.
+    """
+    anterior = ler_versao(modelo)
+    selo = {
+        'versao': (anterior or {}).get('versao', 0) + 1,
+        'data': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+    selo.update(informacoes)
+    salvar_json_atomico(caminho_versao(modelo), selo, ensure_ascii=False)
+    return selo
+
+
+class ModeloAtivo:
+    """
+    Buffer duplo do modelo do detector. `atual` é sempre um `VersaoModelo`
+    completo; `carregar()` deve retornar (reconhecedor, nomes) e é chamado
+    de novo a cada selo publicado. Com `intervalo` > 0, `iniciar()` verifica
+    o selo a cada `intervalo` segundos em uma thread em segundo plano.
+    """
+
+    def __init__(self, modelo, carregar, intervalo=2.0):
+        self.modelo = modelo
+        self.carregar = carregar
+        self.intervalo = intervalo
+        self.recargas = 0
+        self.falhas = 0
+        selo = ler_versao(modelo)
+        reconhecedor, nomes = carregar()
+        self.atual = VersaoModelo(reconhecedor, nomes, selo)
+        self._tentado = selo
+        self._parar = threading.Event()
+        self._thread = None
+
+    def verificar(self):
+        """Recarrega o modelo se um novo selo foi publicado; retorna True se trocou"""
+        selo = ler_versao(self.modelo)
+        if selo is None or selo == self._tentado:
+            return False
+        self._tentado = selo
+        try:
+            reconhecedor, nomes = self.carregar()
+        except Exception as e:
+            # Mantém o modelo anterior; tenta de novo só quando houver outro selo
+            self.falhas += 1
+            print(f"Erro ao recarregar o modelo (versão {selo.get('versao')}): {str(e)}")
+            return False
+        if ler_versao(self.modelo) != selo:
+            # Outra versão foi publicada durante a carga: fica para a próxima verificação
+            self._tentado = None
+            return False
+        self.atual = VersaoModelo(reconhecedor, nomes, selo)
+        self.recargas += 1
+        print(f"✓ Modelo recarregado: versão {selo.get('versao')} ({len(nomes)} pessoas)")
+        return True
+
+    def _observar(self):
+        while not self._parar.wait(self.intervalo):
+            self.verificar()
+
+    def iniciar(self):
+        if self.intervalo and self.intervalo > 0:
+            self._thread = threading.Thread(target=self._observar, name='recarga-modelo', daemon=True)
+            self._thread.start()
+        return self
+
+    def encerrar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,61 @@
+"""
+Qualidade e semelhança das fotos de cadastro.
+
+- `nitidez`: variância do Laplaciano do recorte em escala de cinza, medida
+  sempre no mesmo tamanho (fotos borradas ficam perto de zero);
+- `hash_perceptual`: dHash de 64 bits (compara cada pixel com o vizinho numa
+  miniatura 9x8), estável a pequenas mudanças de brilho e compressão;
+- `distancia_hash`: bits diferentes entre dois hashes (0 = praticamente a
+  mesma foto).
+
+Nas fotos de users/ as repetições ficam até ~6 bits de distância e poses
+diferentes da mesma pessoa de 8 bits em diante.
+"""
+import os
+
+import cv2
+
+# Tamanho em que a nitidez é medida (o das fotos salvas pelo cadastro)
+TAMANHO_AVALIACAO = (300, 300)
+NITIDEZ_MINIMA = 25.0
+LIMIAR_REPETICAO = 6
+
+
+def _cinza(imagem):
+    return cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY) if imagem.ndim == 3 else imagem
+
+
+def nitidez(imagem):
+    """Variância do Laplaciano; quanto maior, mais nítida a foto"""
+    gray = _cinza(imagem)
+    if gray.shape[:2] != TAMANHO_AVALIACAO[::-1]:
+        gray = cv2.resize(gray, TAMANHO_AVALIACAO, interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def hash_perceptual(imagem):
+    """dHash de 64 bits da imagem, como inteiro"""
+    miniatura = cv2.resize(_cinza(imagem), (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (miniatura[:, 1:] > miniatura[:, :-1]).ravel()
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def distancia_hash(a, b):
+    return bin(a ^ b).count('1')
+
+
+def hashes_da_pasta(pasta, extensoes=('.png', '.jpg', '.jpeg')):
+    """Hash perceptual de cada foto já salva em `pasta`"""
+    hashes = []
+    if os.path.isdir(pasta):
+        for arquivo in sorted(os.listdir(pasta)):
+            if arquivo.lower().endswith(extensoes):
+                imagem = cv2.imread(os.path.join(pasta, arquivo), cv2.IMREAD_GRAYSCALE)
+                if imagem is not None:
+                    hashes.append(hash_perceptual(imagem))
+    return hashes
+
+
+def mais_proxima(hash_imagem, hashes):
+    """Menor distância entre `hash_imagem` e os `hashes` conhecidos (None se não houver)"""
+    return min((distancia_hash(hash_imagem, h) for h in hashes), default=None)
@@ -0,0 +1,153 @@
+import cv2
+import numpy as np
+
+
+def calcular_iou(a, b):
+    """Calcula a interseção sobre união (IoU) entre duas caixas (x, y, w, h)"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    intersecao = ix * iy
+    uniao = aw * ah + bw * bh - intersecao
+    return intersecao / uniao if uniao > 0 else 0.0
+
+
+class Trilha:
+    """
+    Uma face acompanhada entre quadros, com a identidade LBPH em cache.
+    """
+
+    def __init__(self, id_trilha, caixa):
+        self.id = id_trilha
+        self.caixa = tuple(int(v) for v in caixa)
+        self.modelo = None          # Recorte reduzido usado no template matching
+        self.escala = 1.0           # Escala aplicada ao recorte do modelo
+        self.pontuacao = 1.0        # Confiança do rastreio no último quadro
+        # Identidade em cache (preenchida pelo reconhecimento)
+        self.nome = None
+        self.confianca = None
+        self.status = None
+        self.cor = None
+        self.permitido = False
+        self.ultimo_reconhecimento = None
+
+    def definir_identidade(self, nome, confianca, status, cor, permitido, indice_quadro):
+        self.nome = nome
+        self.confianca = confianca
+        self.status = status
+        self.cor = cor
+        self.permitido = permitido
+        self.ultimo_reconhecimento = indice_quadro
+
+
+class RastreadorFaces:
+    """
+    Acompanha faces entre detecções completas usando template matching em
+    escala reduzida. A detecção Haar só precisa rodar a cada `detectar_a_cada`
+    quadros ou quando o rastreio perde confiança, e cada trilha só volta ao
+    reconhecedor a cada `reverificar_a_cada` quadros.
+    """
+
+    def __init__(self, detectar_a_cada=5, reverificar_a_cada=15, limiar_rastreio=0.6,
+                 iou_associacao=0.3, margem_busca=0.5, largura_modelo=32):
+        self.detectar_a_cada = max(1, detectar_a_cada)
+        self.reverificar_a_cada = max(1, reverificar_a_cada)
+        self.limiar_rastreio = limiar_rastreio
+        self.iou_associacao = iou_associacao
+        self.margem_busca = margem_busca
+        self.largura_modelo = largura_modelo
+        self.trilhas = []
+        self.ultima_deteccao = None
+        self._proximo_id = 0
+
+    def precisa_detectar(self, indice_quadro):
+        """Indica se o quadro atual deve passar pela detecção completa"""
+        if self.ultima_deteccao is None:
+            return True
+        if indice_quadro - self.ultima_deteccao >= self.detectar_a_cada:
+            return True
+        # Rastreio com baixa confiança força uma nova detecção
+        return any(t.pontuacao < self.limiar_rastreio for t in self.trilhas)
+
+    def precisa_reconhecer(self, trilha, indice_quadro):
+        """Indica se a identidade da trilha precisa ser (re)verificada"""
+        if trilha.ultimo_reconhecimento is None:
+            return True
+        return indice_quadro - trilha.ultimo_reconhecimento >= self.reverificar_a_cada
+
+    def _atualizar_modelo(self, trilha, gray):
+        x, y, w, h = trilha.caixa
+        recorte = gray[y:y+h, x:x+w]
+        if recorte.size == 0:
+            trilha.modelo = None
+            return
+        trilha.escala = min(1.0, self.largura_modelo / float(w))
+        trilha.modelo = cv2.resize(recorte, None, fx=trilha.escala, fy=trilha.escala,
+                                   interpolation=cv2.INTER_AREA)
+
+    def associar(self, gray, faces, indice_quadro):
+        """
+        Associa as faces detectadas às trilhas existentes por IoU. Trilhas
+        associadas mantêm a identidade; faces novas abrem trilhas novas e
+        trilhas sem correspondência são descartadas.
+        """
+        self.ultima_deteccao = indice_quadro
+        restantes = list(self.trilhas)
+        novas_trilhas = []
+
+        for caixa in faces:
+            caixa = tuple(int(v) for v in caixa)
+            melhor, melhor_iou = None, self.iou_associacao
+            for trilha in restantes:
+                iou = calcular_iou(caixa, trilha.caixa)
+                if iou >= melhor_iou:
+                    melhor, melhor_iou = trilha, iou
+
+            if melhor is not None:
+                restantes.remove(melhor)
+                melhor.caixa = caixa
+                trilha = melhor
+            else:
+                trilha = Trilha(self._proximo_id, caixa)
+                self._proximo_id += 1
+
+            trilha.pontuacao = 1.0
+            self._atualizar_modelo(trilha, gray)
+            novas_trilhas.append(trilha)
+
+        self.trilhas = novas_trilhas
+        return self.trilhas
+
+    def rastrear(self, gray):
+        """Move cada trilha para a melhor correspondência no quadro atual"""
+        altura, largura = gray.shape[:2]
+        for trilha in self.trilhas:
+            if trilha.modelo is None:
+                trilha.pontuacao = 0.0
+                continue
+
+            x, y, w, h = trilha.caixa
+            mx = int(w * self.margem_busca)
+            my = int(h * self.margem_busca)
+            jx0, jy0 = max(0, x - mx), max(0, y - my)
+            jx1, jy1 = min(largura, x + w + mx), min(altura, y + h + my)
+
+            janela = cv2.resize(gray[jy0:jy1, jx0:jx1], None, fx=trilha.escala, fy=trilha.escala,
+                                interpolation=cv2.INTER_AREA)
+            mh, mw = trilha.modelo.shape[:2]
+            if janela.shape[0] < mh or janela.shape[1] < mw:
+                # A face saiu (parcialmente) da imagem
+                trilha.pontuacao = 0.0
+                continue
+
+            resultado = cv2.matchTemplate(janela, trilha.modelo, cv2.TM_CCOEFF_NORMED)
+            _, pontuacao, _, (px, py) = cv2.minMaxLoc(resultado)
+            trilha.pontuacao = float(pontuacao) if np.isfinite(pontuacao) else 0.0
+
+            # Converte a posição de volta para a resolução original
+            nx = jx0 + int(round(px / trilha.escala))
+            ny = jy0 + int(round(py / trilha.escala))
+            trilha.caixa = (min(max(0, nx), largura - w), min(max(0, ny), altura - h), w, h)
+
+        return self.trilhas
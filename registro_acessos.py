@@ -0,0 +1,183 @@
+import datetime
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from eventos import ArmazemEventos, evento_para_linha
+
+
+class EventoAgrupado:
+    """Decisões repetidas da mesma pessoa agrupadas em um único evento"""
+
+    def __init__(self, nome, acesso_permitido, momento, confianca):
+        self.nome = nome
+        self.acesso_permitido = acesso_permitido
+        self.primeiro = momento
+        self.ultimo = momento
+        self.ocorrencias = 0
+        self.confianca_min = None
+        self.confianca_soma = 0.0
+        self.confiancas = 0
+        self.adicionar(momento, confianca)
+
+    def adicionar(self, momento, confianca):
+        self.ultimo = momento
+        self.ocorrencias += 1
+        if confianca is not None:
+            self.confiancas += 1
+            self.confianca_soma += confianca
+            if self.confianca_min is None or confianca < self.confianca_min:
+                self.confianca_min = confianca
+
+    def formatar(self):
+        """
+        Mantém o formato "[data hora] Acesso STATUS - Pessoa: nome" dos logs
+        antigos e acrescenta o resumo do agrupamento ao final da linha.
+        """
+        timestamp = self.primeiro.strftime("%Y-%m-%d %H:%M:%S")
+        status = "PERMITIDO" if self.acesso_permitido else "NEGADO"
+        mensagem = f"[{timestamp}] Acesso {status} - Pessoa: {self.nome}"
+        if self.ocorrencias > 1:
+            mensagem += f" | ocorrencias: {self.ocorrencias} | ultimo: {self.ultimo.strftime('%H:%M:%S')}"
+        if self.confiancas == 1:
+            mensagem += f" | confianca: {self.confianca_min:.1f}"
+        elif self.confiancas:
+            media = self.confianca_soma / self.confiancas
+            mensagem += f" | confianca min: {self.confianca_min:.1f} media: {media:.1f}"
+        return mensagem + "\n"
+
+
+class RegistradorAcessos:
+    """
+    Registro assíncrono de acessos.
+
+    `registrar()` só coloca o evento em uma fila e nunca bloqueia o loop de
+    vídeo. Uma thread em segundo plano agrupa decisões repetidas da mesma
+    pessoa dentro de `janela_agrupamento` segundos, escreve as linhas em lotes
+    a cada `intervalo_flush` segundos e troca de arquivo quando o dia muda
+    (logs/log_YYYY-MM-DD.txt).
+
+    Com `arquivo_eventos`, cada lote também é gravado no armazém SQLite de
+    eventos (ver `eventos.py`), pela mesma thread e numa única transação.
+    """
+
+    def __init__(self, pasta='logs', janela_agrupamento=5.0, intervalo_flush=1.0, capacidade=10000,
+                 arquivo_eventos=None):
+        self.pasta = pasta
+        self.arquivo_eventos = arquivo_eventos
+        self.janela_agrupamento = janela_agrupamento
+        self.intervalo_flush = intervalo_flush
+        self.descartados = 0
+        self.escritos = 0
+        self.falhas_eventos = 0
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._abertos = {}
+        self._pendentes = []
+        self._arquivo = None
+        self._data_arquivo = None
+        self._armazem = None
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='registro-acessos', daemon=True)
+            self._thread.start()
+        return self
+
+    def registrar(self, nome, acesso_permitido, confianca=None):
+        """Enfileira uma decisão de acesso sem bloquear"""
+        try:
+            self._fila.put_nowait((nome, bool(acesso_permitido), datetime.datetime.now(), confianca))
+        except queue.Full:
+            self.descartados += 1
+
+    def encerrar(self):
+        """Escreve tudo o que estiver pendente e encerra a thread"""
+        if self._thread is not None:
+            self._parar.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.encerrar()
+
+    def _loop(self):
+        if self.arquivo_eventos:
+            # A conexão SQLite pertence à thread que a cria
+            self._armazem = ArmazemEventos(self.arquivo_eventos)
+        proximo_flush = time.monotonic() + self.intervalo_flush
+        while True:
+            timeout = max(0.0, proximo_flush - time.monotonic())
+            try:
+                self._agrupar(*self._fila.get(timeout=timeout))
+            except queue.Empty:
+                if self._parar.is_set():
+                    break
+
+            if time.monotonic() >= proximo_flush:
+                # Fecha os grupos cuja janela já passou e grava o lote
+                self._fechar_grupos(datetime.datetime.now())
+                self._escrever_lote()
+                proximo_flush = time.monotonic() + self.intervalo_flush
+
+        self._fechar_grupos(None)
+        self._escrever_lote()
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+        if self._armazem is not None:
+            self._armazem.fechar()
+            self._armazem = None
+
+    def _agrupar(self, nome, acesso_permitido, momento, confianca):
+        chave = (nome, acesso_permitido)
+        evento = self._abertos.get(chave)
+        janela = datetime.timedelta(seconds=self.janela_agrupamento)
+        if (evento is not None and momento - evento.ultimo <= janela
+                and momento.date() == evento.primeiro.date()):
+            evento.adicionar(momento, confianca)
+            return
+        if evento is not None:
+            self._pendentes.append(evento)
+        self._abertos[chave] = EventoAgrupado(nome, acesso_permitido, momento, confianca)
+
+    def _fechar_grupos(self, agora):
+        """Move para a fila de escrita os grupos expirados (todos se `agora` for None)"""
+        janela = datetime.timedelta(seconds=self.janela_agrupamento)
+        for chave, evento in list(self._abertos.items()):
+            if agora is None or agora - evento.ultimo > janela:
+                self._pendentes.append(self._abertos.pop(chave))
+
+    def _escrever_lote(self):
+        if not self._pendentes:
+            return
+        self._pendentes.sort(key=lambda e: e.primeiro)
+        for evento in self._pendentes:
+            self._arquivo_do_dia(evento.primeiro.date()).write(evento.formatar())
+            self.escritos += 1
+        self._arquivo.flush()
+        if self._armazem is not None:
+            try:
+                self._armazem.inserir([evento_para_linha(evento) for evento in self._pendentes])
+            except sqlite3.Error as erro:
+                # O log de texto continua valendo; `eventos.py importar` recupera o lote depois
+                self.falhas_eventos += len(self._pendentes)
+                print(f"Erro ao gravar eventos em {self.arquivo_eventos}: {erro}")
+        self._pendentes = []
+
+    def _arquivo_do_dia(self, data):
+        """Rotação diária: um arquivo de log por dia"""
+        if data != self._data_arquivo:
+            if self._arquivo is not None:
+                self._arquivo.close()
+            os.makedirs(self.pasta, exist_ok=True)
+            caminho = os.path.join(self.pasta, f"log_{data.strftime('%Y-%m-%d')}.txt")
+            self._arquivo = open(caminho, 'a', encoding='utf-8')
+            self._data_arquivo = data
+        return self._arquivo
@@ -0,0 +1,317 @@
+"""
+Serviço local de reconhecimento facial (HTTP em localhost).
+
+Um único processo carrega o modelo e o cascade uma vez e atende vários
+clientes (câmeras, catracas, scripts):
+
+    POST /reconhecer              corpo: quadro em PNG/JPEG; detecta e reconhece as faces
+    POST /reconhecer?recorte=1    corpo: recorte de uma face já detectada (sem detecção)
+    GET  /saude                   versão do modelo em uso, fila e configuração
+    GET  /metrics, /metrics.json  métricas de `metricas.METRICAS`
+
+Resposta de /reconhecer:
+    {"faces": [{"regiao": [x, y, w, h], "nome": ..., "confianca": ..., "status": ...,
+                "permitido": true}], "versao": 3}
+
+Os pedidos que chegam juntos são agrupados em micro-lotes: um agrupador
+espera até `espera_max` segundos (ou `lote_max` pedidos) depois do primeiro
+pedido e entrega o lote a um worker livre, que detecta as faces de cada
+quadro, pré-processa todas no mesmo buffer e consulta o LBPH uma única vez
+(`prever_lote`). Enquanto todos os workers estão ocupados os pedidos se
+acumulam na fila e o próximo lote sai maior; com a fila cheia o serviço
+responde 503. O modelo é um `publicacao.ModeloAtivo`, então um treinamento
+novo é carregado sem reiniciar o serviço.
+
+Exemplo:
+    python servico.py --modelo classificador.lbph --porta 8080 --workers 4
+    curl -s --data-binary @users/Arthur/Arthur_001.png 'localhost:8080/reconhecer?recorte=1'
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+from deteccao import BACKENDS, DetectorFaces, configuracao_deteccao, ler_roi
+from detector import carregador_modelo, expandir_regiao, prever_faces
+from metricas import METRICAS
+from preprocessamento import PreprocessadorFaces, para_cinza
+from publicacao import ModeloAtivo
+
+
+class ServicoOcupado(Exception):
+    """A fila de pedidos está cheia"""
+
+
+class Pedido:
+    __slots__ = ('imagem', 'recorte', 'chegada', 'faces', 'erro', 'versao', 'pronto')
+
+    def __init__(self, imagem, recorte):
+        self.imagem = imagem
+        self.recorte = recorte
+        self.chegada = time.perf_counter()
+        self.faces = None
+        self.erro = None
+        self.versao = None
+        self.pronto = threading.Event()
+
+
+class ServicoReconhecimento:
+    """
+    Fila de pedidos, agrupador de micro-lotes e pool de `workers` threads
+    compartilhando o `modelo` (`publicacao.ModeloAtivo`). `criar_detector()`
+    é chamado uma vez por worker (cada um tem o seu detector e os seus
+    buffers de pré-processamento).
+    """
+
+    def __init__(self, modelo, criar_detector, workers=4, lote_max=8, espera_max=0.002, capacidade=256):
+        self.modelo = modelo
+        self.criar_detector = criar_detector
+        self.workers = workers
+        self.lote_max = lote_max
+        self.espera_max = espera_max
+        self._fila = queue.Queue(maxsize=capacidade)
+        # Um lote só é montado quando há um worker livre para ele
+        self._livres = threading.Semaphore(workers)
+        self._local = threading.local()
+        self._executor = None
+        self._thread = None
+        self._parar = threading.Event()
+
+    def iniciar(self):
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='servico-worker')
+            self._thread = threading.Thread(target=self._agrupar, name='servico-agrupador', daemon=True)
+            self._thread.start()
+        return self
+
+    def encerrar(self):
+        if self._thread is not None:
+            self._parar.set()
+            self._thread.join()
+            self._thread = None
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.encerrar()
+
+    @property
+    def pendentes(self):
+        return self._fila.qsize()
+
+    def enviar(self, imagem, recorte=False, timeout=10.0):
+        """
+        Reconhece as faces de um quadro BGR ou cinza (ou, com `recorte=True`,
+        a face que ocupa a imagem toda). Bloqueia até o resultado e retorna
+        (faces, versao); levanta `ServicoOcupado` se a fila estiver cheia.
+        """
+        pedido = Pedido(imagem, recorte)
+        try:
+            self._fila.put_nowait(pedido)
+        except queue.Full:
+            METRICAS.incrementar('servico_recusados')
+            raise ServicoOcupado("Fila de pedidos cheia")
+        if not pedido.pronto.wait(timeout):
+            raise TimeoutError("Tempo esgotado aguardando o reconhecimento")
+        if pedido.erro is not None:
+            raise pedido.erro
+        return pedido.faces, pedido.versao
+
+    def _agrupar(self):
+        while not self._parar.is_set():
+            self._livres.acquire()
+            try:
+                lote = [self._fila.get(timeout=0.1)]
+            except queue.Empty:
+                self._livres.release()
+                continue
+            prazo = time.perf_counter() + self.espera_max
+            while len(lote) < self.lote_max:
+                restante = prazo - time.perf_counter()
+                try:
+                    lote.append(self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            self._executor.submit(self._processar, lote)
+
+    def _recursos(self):
+        local = self._local
+        if not hasattr(local, 'detector'):
+            local.detector = self.criar_detector()
+            local.preprocessador = PreprocessadorFaces()
+        return local.detector, local.preprocessador
+
+    def _processar(self, lote):
+        inicio = time.perf_counter()
+        try:
+            detector, preprocessador = self._recursos()
+            reconhecedor, nomes, selo = self.modelo.atual
+            quadros = []
+            for pedido in lote:
+                METRICAS.observar('servico_espera', inicio - pedido.chegada)
+                gray = para_cinza(pedido.imagem)
+                altura, largura = gray.shape[:2]
+                if pedido.recorte:
+                    regioes = [(0, 0, largura, altura)]
+                else:
+                    t = time.perf_counter()
+                    regioes = [expandir_regiao(x, y, w, h, largura, altura) for (x, y, w, h) in detector.detectar(gray)]
+                    METRICAS.observar('deteccao', time.perf_counter() - t)
+                quadros.append((gray, regioes))
+
+            t = time.perf_counter()
+            faces = preprocessador.lote_de_quadros(quadros)
+            METRICAS.observar('preprocessamento', time.perf_counter() - t)
+            decisoes = iter(prever_faces(reconhecedor, nomes, faces))
+            versao = (selo or {}).get('versao')
+            for pedido, (_, regioes) in zip(lote, quadros):
+                pedido.faces = [{'regiao': [int(v) for v in regiao], 'nome': nome, 'confianca': round(confianca, 2),
+                                 'status': status, 'permitido': permitido}
+                                for regiao, (nome, confianca, _, status, permitido) in zip(regioes, decisoes)]
+                pedido.versao = versao
+            METRICAS.incrementar('servico_lotes')
+            METRICAS.incrementar('servico_pedidos', len(lote))
+            METRICAS.incrementar('faces', len(faces))
+        except Exception as erro:
+            print(f"Erro no reconhecimento: {str(erro)}")
+            for pedido in lote:
+                pedido.erro = erro
+        finally:
+            self._livres.release()
+            METRICAS.observar('servico_lote', time.perf_counter() - inicio)
+            for pedido in lote:
+                pedido.pronto.set()
+
+
+def decodificar_imagem(dados):
+    """Imagem BGR a partir dos bytes de um PNG/JPEG (None se inválidos)"""
+    if not dados:
+        return None
+    return cv2.imdecode(np.frombuffer(dados, np.uint8), cv2.IMREAD_COLOR)
+
+
+def servir_reconhecimento(servico, porta=8080, host='127.0.0.1'):
+    """Sobe o servidor HTTP do serviço em uma thread em segundo plano e retorna o servidor"""
+
+    class Manipulador(BaseHTTPRequestHandler):
+        # Conexões persistentes: cada cliente reaproveita a sua entre os pedidos. Sem o
+        # algoritmo de Nagle, o corpo da resposta não espera o ACK atrasado dos cabeçalhos
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def responder(self, codigo, corpo, tipo='application/json'):
+            dados = (json.dumps(corpo, ensure_ascii=False) if tipo == 'application/json' else corpo).encode('utf-8')
+            self.send_response(codigo)
+            self.send_header('Content-Type', tipo)
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            caminho = urlparse(self.path).path
+            if caminho == '/saude':
+                selo = servico.modelo.atual.selo or {}
+                self.responder(200, {'versao': selo.get('versao'), 'pessoas': len(servico.modelo.atual.nomes),
+                                     'pendentes': servico.pendentes, 'workers': servico.workers,
+                                     'lote_max': servico.lote_max, 'espera_max_ms': 1000.0 * servico.espera_max})
+            elif caminho == '/metrics':
+                self.responder(200, METRICAS.texto_prometheus(), 'text/plain; version=0.0.4; charset=utf-8')
+            elif caminho == '/metrics.json':
+                self.responder(200, METRICAS.para_dict())
+            else:
+                self.responder(404, {'erro': 'caminho desconhecido'})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            dados = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if url.path != '/reconhecer':
+                self.responder(404, {'erro': 'caminho desconhecido'})
+                return
+            imagem = decodificar_imagem(dados)
+            if imagem is None:
+                self.responder(400, {'erro': 'imagem inválida'})
+                return
+            recorte = parse_qs(url.query).get('recorte', ['0'])[0] not in ('0', '', 'false')
+            try:
+                faces, versao = servico.enviar(imagem, recorte)
+            except ServicoOcupado as erro:
+                self.responder(503, {'erro': str(erro)})
+            except TimeoutError as erro:
+                self.responder(504, {'erro': str(erro)})
+            except Exception as erro:
+                self.responder(500, {'erro': str(erro)})
+            else:
+                self.responder(200, {'faces': faces, 'versao': versao})
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, porta), Manipulador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name='servico-http', daemon=True).start()
+    print(f"Serviço de reconhecimento em http://{host}:{servidor.server_address[1]}/reconhecer")
+    return servidor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço local de reconhecimento facial com micro-lotes")
+    parser.add_argument('--porta', type=int, default=8080)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--modelo', default='classificador.yml', help="Modelo LBPH treinado (.yml do OpenCV ou binário .lbph)")
+    parser.add_argument('--nomes', dest='arquivo_nomes', default='nomes.json', help="Mapeamento de IDs para nomes")
+    parser.add_argument('--motor', choices=['opencv', 'numpy', 'indice'], default='numpy',
+                        help="Implementação do LBPH (o motor NumPy consulta o lote inteiro de uma vez)")
+    parser.add_argument('--workers', type=int, default=4, help="Threads de detecção e predição")
+    parser.add_argument('--lote-max', type=int, default=8, help="Máximo de pedidos por micro-lote")
+    parser.add_argument('--espera-max-ms', type=float, default=2.0,
+                        help="Quanto o agrupador espera por mais pedidos depois do primeiro")
+    parser.add_argument('--capacidade', type=int, default=256, help="Pedidos na fila antes de responder 503")
+    parser.add_argument('--recarregar-a-cada', type=float, default=2.0,
+                        help="Intervalo (segundos) para verificar se há uma nova versão do modelo (0 desativa)")
+    parser.add_argument('--largura-deteccao', type=int, default=None,
+                        help="Reduz o quadro a esta largura antes da detecção (padrão: deteccao.json ou resolução cheia)")
+    parser.add_argument('--face-min', type=int, default=None,
+                        help="Menor lado de face a detectar, em pixels (padrão: deteccao.json ou 30)")
+    parser.add_argument('--face-max', type=int, default=None,
+                        help="Maior lado de face a detectar, em pixels (padrão: deteccao.json)")
+    parser.add_argument('--roi', type=ler_roi, default=None, help="Região de interesse 'x,y,w,h' para a detecção")
+    parser.add_argument('--backend', choices=list(BACKENDS), default=None,
+                        help="Detector de faces (padrão: o gravado por benchmarks.backends em deteccao.json, ou haar)")
+    parser.add_argument('--modelo-yunet', default=None,
+                        help="Caminho do modelo .onnx da YuNet (padrão: o de deteccao.json ou modelos/)")
+    args = parser.parse_args(argv)
+    backend, opcoes_backend, parametros_deteccao = configuracao_deteccao(
+        args.backend, modelo_yunet=args.modelo_yunet, largura_deteccao=args.largura_deteccao,
+        face_min=args.face_min, face_max=args.face_max)
+
+    modelo = ModeloAtivo(args.modelo, carregador_modelo(args.modelo, args.arquivo_nomes, args.motor),
+                         args.recarregar_a_cada).iniciar()
+
+    def criar_detector():
+        return DetectorFaces(roi=args.roi, backend=backend, opcoes_backend=opcoes_backend, **parametros_deteccao)
+
+    servico = ServicoReconhecimento(modelo, criar_detector, args.workers, args.lote_max,
+                                    args.espera_max_ms / 1000.0, args.capacidade).iniciar()
+    servidor = servir_reconhecimento(servico, args.porta, args.host)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.shutdown()
+        servico.encerrar()
+        modelo.encerrar()
+        print("Serviço encerrado.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,339 @@
+"""
+Supervisor de várias câmeras: um processo de reconhecimento por fonte.
+
+Cada fonte configurada (índice de câmera, arquivo de vídeo, pasta de
+imagens, URL de stream ou "sintetico") ganha um processo que roda
+`detector.iniciar_reconhecimento` sem janela. O supervisor:
+
+- usa o modelo binário (classificador.lbph): cada processo mapeia o mesmo
+  arquivo, então a galeria fica uma vez só no cache de páginas do sistema em
+  vez de uma cópia por `reconhecedor.read`; como o supervisor importa
+  OpenCV e NumPy antes de criar os processos (fork), as páginas dessas
+  bibliotecas também são compartilhadas;
+- reinicia processos que terminam com erro (espera 1, 2, 4... até 30 s
+  entre tentativas); uma fonte que chega ao fim normalmente (arquivo) não é
+  reiniciada;
+- junta o que cada processo relata a cada `intervalo` segundos (quadros,
+  FPS, decisões PERMITIDO/NEGADO) e a memória de cada um (PSS, que divide
+  as páginas compartilhadas entre os processos que as usam);
+- grava os acessos de cada câmera em `<pasta_logs>/<nome>/` (log de texto e
+  eventos.db próprios), para saber por qual entrada cada pessoa passou;
+- ao encerrar, manda SIGTERM e espera cada processo gravar os acessos
+  ainda na fila antes de sair.
+
+Configuração por linha de comando ou arquivo JSON:
+    python supervisor.py --fontes 0 1 rtsp://camera-garagem/stream
+    python supervisor.py --config cameras.json
+    [{"nome": "portaria", "fonte": 0}, {"nome": "garagem", "fonte": "rtsp://...", "largura_deteccao": 320}]
+Cada câmera aceita as mesmas opções de `iniciar_reconhecimento`.
+"""
+import argparse
+import gc
+import inspect
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+
+import detector
+from metricas import METRICAS
+from modelo_binario import caminho_binario, eh_modelo_binario
+
+# Opções que o supervisor controla e as câmeras não podem sobrescrever
+OPCOES_RESERVADAS = ('fonte', 'exibir', 'porta_metricas', 'metricas_json')
+ESPERA_MAXIMA_REINICIO = 30.0
+# Tempo para um processo gravar os acessos pendentes depois do SIGTERM
+ESPERA_ENCERRAMENTO = 10.0
+
+
+def memoria_processo(pid):
+    """(rss_mb, pss_mb) de um processo a partir de /proc (None fora do Linux)"""
+    valores = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            for linha in f:
+                chave, _, resto = linha.partition(':')
+                if chave in ('Rss', 'Pss'):
+                    valores[chave] = int(resto.split()[0]) / 1024.0
+    except OSError:
+        return None
+    return valores.get('Rss'), valores.get('Pss')
+
+
+def _relatorio(nome, final=None):
+    contadores = METRICAS.para_dict()['contadores']
+    decisoes = contadores.get('predicoes', {})
+    return {
+        'camera': nome,
+        'pid': os.getpid(),
+        'momento': time.time(),
+        'quadros': contadores.get('quadros', {}).get('total', 0),
+        'faces': contadores.get('faces', {}).get('total', 0),
+        'permitidos': sum(v for rotulo, v in decisoes.items() if 'PERMITIDO' in rotulo),
+        'negados': sum(v for rotulo, v in decisoes.items() if 'PERMITIDO' not in rotulo),
+        'final': final,
+    }
+
+
+def executar_camera(nome, fonte, opcoes, fila, intervalo):
+    """Corpo do processo de uma câmera: reconhece e relata os contadores a cada `intervalo` segundos"""
+    parar = threading.Event()
+
+    def terminar(sinal, quadro):
+        # SystemExit em vez da morte imediata: o `finally` do reconhecimento grava os acessos pendentes
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        raise SystemExit(128 + sinal)
+
+    signal.signal(signal.SIGTERM, terminar)
+
+    def relatar():
+        while not parar.wait(intervalo):
+            fila.put(_relatorio(nome))
+
+    threading.Thread(target=relatar, name='relatorio', daemon=True).start()
+    try:
+        estatisticas = detector.iniciar_reconhecimento(fonte=fonte, exibir=False, **opcoes)
+    finally:
+        parar.set()
+    fila.put(_relatorio(nome, final={'quadros': estatisticas['quadros'], 'fps': round(estatisticas['fps'], 2),
+                                     'duracao': round(estatisticas['duracao'], 2)}))
+
+
+class Camera:
+    """Estado de uma câmera no supervisor"""
+
+    def __init__(self, nome, fonte, opcoes):
+        self.nome = nome
+        self.fonte = fonte
+        self.opcoes = opcoes
+        self.processo = None
+        self.reinicios = 0
+        self.proximo_inicio = 0.0
+        self.estado = 'aguardando'
+        self.ultimo = None
+        self.anterior = None
+        self.final = None
+        # Contadores das execuções anteriores (um processo reiniciado começa do zero)
+        self.acumulado = {'quadros': 0, 'faces': 0, 'permitidos': 0, 'negados': 0}
+
+    def total(self, chave):
+        return self.acumulado[chave] + (self.ultimo[chave] if self.ultimo else 0)
+
+    def fps(self):
+        if self.ultimo is None or self.anterior is None or self.ultimo['momento'] <= self.anterior['momento']:
+            return 0.0
+        return (self.ultimo['quadros'] - self.anterior['quadros']) / (self.ultimo['momento'] - self.anterior['momento'])
+
+
+class Supervisor:
+    """
+    Mantém um processo por câmera. `cameras` é uma lista de dicionários com
+    `nome`, `fonte` e opções de `iniciar_reconhecimento` próprias; `opcoes`
+    vale para todas. Sem `pasta_logs` própria, cada câmera grava em uma
+    subpasta com o seu nome dentro da `pasta_logs` comum. Com
+    `reiniciar=False` um processo que falha não volta.
+    """
+
+    def __init__(self, cameras, opcoes=None, intervalo=5.0, reiniciar=True, max_reinicios=None):
+        parametros = inspect.signature(detector.iniciar_reconhecimento).parameters
+        self.cameras = []
+        for i, config in enumerate(cameras):
+            config = dict(config)
+            nome = str(config.pop('nome', f'camera{i}'))
+            fonte = config.pop('fonte')
+            mescladas = dict(opcoes or {}, **config)
+            invalidas = [chave for chave in mescladas if chave not in parametros or chave in OPCOES_RESERVADAS]
+            if invalidas:
+                raise ValueError(f"Opções inválidas para a câmera {nome}: {', '.join(invalidas)}")
+            if 'pasta_logs' not in config:
+                pasta = mescladas.get('pasta_logs', parametros['pasta_logs'].default)
+                mescladas['pasta_logs'] = os.path.join(pasta, nome.replace(os.sep, '_'))
+            self.cameras.append(Camera(nome, fonte, mescladas))
+        self.intervalo = intervalo
+        self.reiniciar = reiniciar
+        self.max_reinicios = max_reinicios
+        # fork: os processos herdam as bibliotecas já carregadas pelo supervisor
+        metodos = multiprocessing.get_all_start_methods()
+        self._contexto = multiprocessing.get_context('fork' if 'fork' in metodos else None)
+        self._fila = self._contexto.Queue()
+        self._encerrando = False
+
+    def _lancar(self, camera):
+        camera.processo = self._contexto.Process(
+            target=executar_camera, name=f'camera-{camera.nome}',
+            args=(camera.nome, camera.fonte, camera.opcoes, self._fila, self.intervalo))
+        camera.processo.start()
+        camera.estado = 'rodando'
+        camera.ultimo = camera.anterior = None
+
+    def iniciar(self):
+        # Tira do coletor os objetos já criados: sem isso cada coleta nos filhos
+        # escreve nos cabeçalhos herdados e as páginas deixam de ser compartilhadas
+        gc.freeze()
+        for camera in self.cameras:
+            self._lancar(camera)
+        return self
+
+    def _receber(self):
+        por_nome = {camera.nome: camera for camera in self.cameras}
+        while True:
+            try:
+                relatorio = self._fila.get_nowait()
+            except queue.Empty:
+                return
+            camera = por_nome[relatorio['camera']]
+            if camera.processo is None or relatorio['pid'] != camera.processo.pid:
+                continue  # relatório atrasado de um processo que já foi substituído
+            camera.anterior, camera.ultimo = camera.ultimo, relatorio
+            if relatorio['final'] is not None:
+                camera.final = relatorio['final']
+
+    def verificar(self):
+        """Recebe os relatórios e trata processos encerrados; retorna True enquanto houver câmera ativa"""
+        self._receber()
+        agora = time.monotonic()
+        for camera in self.cameras:
+            if camera.estado == 'rodando' and not camera.processo.is_alive():
+                camera.processo.join()
+                self._receber()
+                for chave in camera.acumulado:
+                    camera.acumulado[chave] = camera.total(chave)
+                camera.ultimo = camera.anterior = None
+                codigo = camera.processo.exitcode
+                if codigo == 0:
+                    camera.estado = 'encerrada'
+                elif self._encerrando:
+                    camera.estado = 'parada'
+                elif not self.reiniciar or (self.max_reinicios is not None and camera.reinicios >= self.max_reinicios):
+                    camera.estado = f'falhou ({codigo})'
+                else:
+                    espera = min(ESPERA_MAXIMA_REINICIO, 2.0 ** camera.reinicios)
+                    camera.estado = 'reiniciando'
+                    camera.proximo_inicio = agora + espera
+                    print(f"⚠️  Câmera {camera.nome} terminou com código {codigo}; reiniciando em {espera:.0f} s")
+            elif camera.estado == 'reiniciando' and agora >= camera.proximo_inicio:
+                camera.reinicios += 1
+                self._lancar(camera)
+        return any(camera.estado in ('rodando', 'reiniciando') for camera in self.cameras)
+
+    def resumo(self):
+        linhas = []
+        for camera in self.cameras:
+            memoria = memoria_processo(camera.processo.pid) if camera.estado == 'rodando' else None
+            linhas.append({
+                'camera': camera.nome,
+                'fonte': str(camera.fonte),
+                'estado': camera.estado,
+                'pid': camera.processo.pid if camera.processo else None,
+                'reinicios': camera.reinicios,
+                'quadros': camera.total('quadros'),
+                'fps': round(camera.final['fps'] if camera.estado == 'encerrada' and camera.final else camera.fps(), 2),
+                'faces': camera.total('faces'),
+                'permitidos': camera.total('permitidos'),
+                'negados': camera.total('negados'),
+                'rss_mb': round(memoria[0], 1) if memoria and memoria[0] is not None else None,
+                'pss_mb': round(memoria[1], 1) if memoria and memoria[1] is not None else None,
+            })
+        return linhas
+
+    def imprimir(self, linhas):
+        print(f"\n{'câmera':<14} {'estado':<12} {'reinícios':>9} {'quadros':>8} {'FPS':>6} {'permitidos':>10} "
+              f"{'negados':>8} {'RSS MB':>7} {'PSS MB':>7}")
+        for l in linhas:
+            print(f"{l['camera']:<14} {l['estado']:<12} {l['reinicios']:>9} {l['quadros']:>8} {l['fps']:>6.1f} "
+                  f"{l['permitidos']:>10} {l['negados']:>8} {str(l['rss_mb'] or '-'):>7} {str(l['pss_mb'] or '-'):>7}")
+
+    def executar(self, duracao=None):
+        """Supervisiona até todas as câmeras encerrarem, `duracao` segundos ou Ctrl+C; retorna o último resumo"""
+        inicio = time.monotonic()
+        proximo_resumo = inicio + self.intervalo
+        ultimo = self.resumo()
+        try:
+            while self.verificar() and (duracao is None or time.monotonic() - inicio < duracao):
+                time.sleep(0.2)
+                if time.monotonic() >= proximo_resumo:
+                    ultimo = self.resumo()
+                    self.imprimir(ultimo)
+                    proximo_resumo += self.intervalo
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.encerrar()
+        ultimo = self.resumo()
+        self.imprimir(ultimo)
+        return ultimo
+
+    def encerrar(self):
+        self._encerrando = True
+        for camera in self.cameras:
+            if camera.processo is not None and camera.processo.is_alive():
+                camera.processo.terminate()
+        limite = time.monotonic() + ESPERA_ENCERRAMENTO
+        for camera in self.cameras:
+            if camera.processo is not None:
+                camera.processo.join(max(0.0, limite - time.monotonic()))
+                if camera.processo.is_alive():
+                    print(f"⚠️  Câmera {camera.nome} não encerrou em {ESPERA_ENCERRAMENTO:.0f} s; forçando")
+                    camera.processo.kill()
+                    camera.processo.join()
+        self.verificar()
+        for camera in self.cameras:
+            if camera.estado == 'reiniciando':
+                camera.estado = 'parada'
+
+
+def modelo_compartilhado(modelo):
+    """Caminho do modelo binário mapeável correspondente a `modelo` (gerado pelo treinar.py)"""
+    if eh_modelo_binario(modelo):
+        return modelo
+    binario = caminho_binario(modelo)
+    if not eh_modelo_binario(binario):
+        raise FileNotFoundError(f"Modelo binário {binario} não encontrado: execute treinar.py para gerá-lo")
+    return binario
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Supervisor de várias câmeras (um processo por fonte)")
+    origem = parser.add_mutually_exclusive_group(required=True)
+    origem.add_argument('--fontes', nargs='+', help="Índices de câmera, arquivos, pastas ou URLs de stream")
+    origem.add_argument('--config', help="Arquivo JSON com a lista de câmeras ({nome, fonte, opções...})")
+    parser.add_argument('--modelo', default='classificador.yml',
+                        help="Modelo treinado; os processos usam o binário correspondente (.lbph), mapeado")
+    parser.add_argument('--nomes', dest='arquivo_nomes', default='nomes.json')
+    parser.add_argument('--pasta-logs', default='logs')
+    parser.add_argument('--rastreamento', action='store_true', help="Ativa o rastreamento em todas as câmeras")
+    parser.add_argument('--largura-deteccao', type=int, default=None)
+    parser.add_argument('--face-min', type=int, default=None, help="Padrão: deteccao.json ou 30")
+    parser.add_argument('--max-quadros', type=int, default=None, help="Quadros por câmera (para testes)")
+    parser.add_argument('--intervalo', type=float, default=5.0, help="Segundos entre os resumos")
+    parser.add_argument('--duracao', type=float, default=None, help="Encerra após este tempo, em segundos")
+    parser.add_argument('--sem-reinicio', dest='reiniciar', action='store_false',
+                        help="Não reinicia processos que terminam com erro")
+    parser.add_argument('--max-reinicios', type=int, default=None)
+    parser.add_argument('--saida', default=None, help="Grava o resumo final em JSON")
+    args = parser.parse_args(argv)
+
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            cameras = json.load(f)
+    else:
+        cameras = [{'nome': f'camera{i}', 'fonte': fonte} for i, fonte in enumerate(args.fontes)]
+    opcoes = {'modelo': modelo_compartilhado(args.modelo), 'arquivo_nomes': args.arquivo_nomes, 'motor': 'numpy',
+              'pasta_logs': args.pasta_logs, 'rastreamento': args.rastreamento,
+              'largura_deteccao': args.largura_deteccao, 'face_min': args.face_min,
+              'max_quadros': args.max_quadros}
+
+    supervisor = Supervisor(cameras, opcoes, args.intervalo, args.reiniciar, args.max_reinicios)
+    print(f"Supervisor: {len(supervisor.cameras)} câmera(s), modelo {opcoes['modelo']}")
+    resumo = supervisor.iniciar().executar(args.duracao)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resumo, f, indent=2, ensure_ascii=False)
+    return resumo
+
+
+if __name__ == '__main__':
+    main()
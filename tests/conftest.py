@@ -0,0 +1,32 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fontes import desenhar_rosto_sintetico  # noqa: E402
+
+
+@pytest.fixture
+def faces_sinteticas():
+    """
+    (faces, rotulos) em cinza 100x100: 4 identidades (sementes de
+    `fontes.desenhar_rosto_sintetico`), 6 fotos de cada com ruído, brilho e
+    deslocamento diferentes
+    """
+    rng = np.random.default_rng(42)
+    faces, rotulos = [], []
+    for rotulo in range(4):
+        rosto = cv2.cvtColor(desenhar_rosto_sintetico(120, semente=rotulo), cv2.COLOR_BGR2GRAY)
+        for _ in range(6):
+            dx, dy = rng.integers(-4, 5, 2)
+            deslocado = cv2.warpAffine(rosto, np.float32([[1, 0, dx], [0, 1, dy]]), (120, 120),
+                                       borderMode=cv2.BORDER_REPLICATE)
+            foto = deslocado.astype(np.float32) * rng.uniform(0.8, 1.2) + rng.normal(0, 8, deslocado.shape)
+            faces.append(cv2.resize(np.clip(foto, 0, 255).astype(np.uint8), (100, 100)))
+            rotulos.append(rotulo)
+    return faces, np.asarray(rotulos, np.int32)
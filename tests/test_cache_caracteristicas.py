@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+import pytest
+
+from cache_caracteristicas import CacheCaracteristicas, chave_parametros
+
+
+def test_troca_de_parametros_apaga_o_cache_antigo(tmp_path):
+    pasta = str(tmp_path / 'cache')
+    antigo = CacheCaracteristicas({'versao': 1}, pasta)
+    antigo.guardar('abc', np.zeros((2, 4), np.float32))
+    novo = CacheCaracteristicas({'versao': 2}, pasta)
+    assert os.listdir(pasta) == [chave_parametros({'versao': 2})]
+    assert 'abc' not in novo
+
+
+def test_recusa_pasta_com_outros_arquivos(tmp_path):
+    documentos = tmp_path / 'meus_documentos'
+    documentos.mkdir()
+    (documentos / 'nota.txt').write_text('não apagar')
+    (tmp_path / 'leia.txt').write_text('não apagar')
+    with pytest.raises(ValueError):
+        CacheCaracteristicas({'a': 1}, str(tmp_path))
+    assert (documentos / 'nota.txt').exists() and (tmp_path / 'leia.txt').exists()
+
+
+def test_pasta_hexadecimal_sem_marca_nao_e_apagada(tmp_path):
+    # Mesmo com nome de entrada, uma pasta sem parametros.json não é do cache
+    (tmp_path / '0123456789abcdef').mkdir()
+    with pytest.raises(ValueError):
+        CacheCaracteristicas({'a': 1}, str(tmp_path))
+    assert (tmp_path / '0123456789abcdef').is_dir()
@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+import pytest
+
+from deteccao import BACKENDS, BackendYuNet, configuracao_deteccao, criar_backend, filtrar_caixas
+
+
+def gravar_config(pasta, backend, opcoes=None, parametros=None):
+    caminho = str(pasta / 'deteccao.json')
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({'backend': backend, 'opcoes': opcoes or {}, 'parametros': parametros or {}}, f)
+    return caminho
+
+
+def test_yunet_continua_entre_os_backends():
+    assert 'yunet' in BACKENDS
+
+
+def test_yunet_sem_modelo_levanta_file_not_found(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        BackendYuNet(str(tmp_path / 'nao_existe.onnx'))
+    with pytest.raises(OSError):
+        criar_backend('yunet', modelo=str(tmp_path / 'nao_existe.onnx'))
+
+
+def test_config_yunet_sem_modelo_volta_ao_haar(tmp_path, capsys):
+    arquivo = gravar_config(tmp_path, 'yunet', {'modelo': str(tmp_path / 'nao_existe.onnx')}, {'face_min': 80})
+    backend, opcoes, parametros = configuracao_deteccao(arquivo=arquivo, face_min=None)
+    assert (backend, opcoes, parametros) == ('haar', {}, {})
+    assert 'usando haar' in capsys.readouterr().out
+
+
+def test_config_aplica_parametros_e_a_linha_de_comando_vence(tmp_path):
+    arquivo = gravar_config(tmp_path, 'lbp', parametros={'largura_deteccao': 320, 'face_min': 80})
+    backend, _, parametros = configuracao_deteccao(arquivo=arquivo, face_min=100, face_max=None)
+    assert backend == 'lbp'
+    assert parametros == {'largura_deteccao': 320, 'face_min': 100}
+
+
+def test_modelo_yunet_da_linha_de_comando_substitui_o_gravado(tmp_path):
+    arquivo = gravar_config(tmp_path, 'haar')
+    assert configuracao_deteccao('yunet', arquivo, modelo_yunet='yunet.onnx')[1] == {'modelo': 'yunet.onnx'}
+
+
+def test_filtrar_caixas_corta_a_borda_e_aplica_os_limites():
+    faces = np.zeros((3, 15), np.float32)
+    faces[0, :4] = (-10, 5, 60, 50)    # passa da borda esquerda: fica 50 de largura
+    faces[1, :4] = (100, 100, 10, 10)  # menor que min_lado
+    faces[2, :4] = (200, 0, 300, 300)  # maior que max_lado
+    caixas = filtrar_caixas(faces, min_lado=20, max_lado=200)
+    assert caixas.tolist() == [[0, 5, 50, 50]]
+    assert filtrar_caixas(None, 20).shape == (0, 4)
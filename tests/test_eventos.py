@@ -0,0 +1,37 @@
+import os
+
+from eventos import ArmazemEventos
+
+LINHAS = [
+    "[2026-03-02 08:00:00] Acesso PERMITIDO - Pessoa: Ivan\n",
+    "[2026-03-02 08:05:00] Acesso NEGADO - Pessoa: Desconhecido\n",
+    "[2026-03-02 09:00:00] Acesso PERMITIDO - Pessoa: Arthur\n",
+]
+
+
+def escrever_log(pasta, linhas):
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, 'log_2026-03-02.txt'), 'a', encoding='utf-8') as f:
+        f.writelines(linhas)
+
+
+def test_cameras_com_o_mesmo_nome_de_log_importam_tudo(tmp_path):
+    escrever_log(str(tmp_path / 'portaria'), LINHAS[:2])
+    escrever_log(str(tmp_path / 'garagem'), LINHAS[2:] + LINHAS[:1])
+    with ArmazemEventos(str(tmp_path / 'eventos.db')) as armazem:
+        assert armazem.importar_pasta(str(tmp_path / 'portaria')) == {'log_2026-03-02.txt': 2}
+        assert armazem.importar_pasta(str(tmp_path / 'garagem')) == {'log_2026-03-02.txt': 2}
+        # Só as linhas novas de cada arquivo entram na importação seguinte
+        escrever_log(str(tmp_path / 'portaria'), LINHAS[2:])
+        assert armazem.importar_pasta(str(tmp_path / 'portaria')) == {'log_2026-03-02.txt': 1}
+        assert armazem.importar_pasta(str(tmp_path / 'garagem')) == {'log_2026-03-02.txt': 0}
+
+
+def test_progresso_antigo_pelo_nome_e_herdado(tmp_path):
+    escrever_log(str(tmp_path / 'logs'), LINHAS)
+    with ArmazemEventos(str(tmp_path / 'eventos.db')) as armazem:
+        with armazem.conexao:
+            armazem.conexao.execute("INSERT INTO importacoes (arquivo, linhas) VALUES ('log_2026-03-02.txt', 2)")
+        assert armazem.importar_pasta(str(tmp_path / 'logs')) == {'log_2026-03-02.txt': 1}
+        arquivos = [linha[0] for linha in armazem.conexao.execute('SELECT arquivo FROM importacoes')]
+        assert arquivos == [os.path.realpath(str(tmp_path / 'logs' / 'log_2026-03-02.txt'))]
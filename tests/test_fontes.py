@@ -0,0 +1,9 @@
+from fontes import eh_camera
+
+
+def test_indice_de_camera_vindo_da_linha_de_comando():
+    # O argparse entrega o --fonte como texto
+    assert eh_camera(0) and eh_camera(1) and eh_camera('1')
+    assert not eh_camera('sintetico:10')
+    assert not eh_camera('gravacao.mp4')
+    assert not eh_camera('rtsp://10.0.0.2/stream')
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from lbph import DISTANCIA_MAXIMA, MotorLBPH
+from treinar import criar_reconhecedor
+
+
+def treinar_opencv(faces, rotulos, caminho):
+    """Treina o `cv2.face.LBPHFaceRecognizer` do treinamento com as fotos pares e grava o .yml"""
+    reconhecedor = criar_reconhecedor()
+    reconhecedor.train(faces[::2], rotulos[::2])
+    reconhecedor.write(caminho)
+    return reconhecedor
+
+
+def previsoes_opencv(reconhecedor, faces):
+    previsoes = [reconhecedor.predict(face) for face in faces]
+    return np.array([r for r, _ in previsoes]), np.array([d for _, d in previsoes])
+
+
+def test_motor_reproduz_o_predict_do_opencv(tmp_path, faces_sinteticas):
+    faces, rotulos = faces_sinteticas
+    caminho = str(tmp_path / 'modelo.yml')
+    reconhecedor = treinar_opencv(faces, rotulos, caminho)
+    motor = MotorLBPH.carregar(caminho)
+
+    consultas = faces[1::2]
+    esperados, distancias = previsoes_opencv(reconhecedor, consultas)
+    obtidos, obtidas = motor.prever_lote(consultas)
+    np.testing.assert_array_equal(obtidos, esperados)
+    np.testing.assert_allclose(obtidas, distancias, rtol=1e-5)
+    # O predict de uma face de cada vez dá o mesmo que o lote
+    for face, rotulo, distancia in zip(consultas, esperados, distancias):
+        r, d = motor.predict(face)
+        assert r == rotulo and d == pytest.approx(distancia, rel=1e-5)
+
+
+def test_motor_reproduz_a_rejeicao_pelo_limiar(tmp_path, faces_sinteticas):
+    faces, rotulos = faces_sinteticas
+    caminho = str(tmp_path / 'modelo.yml')
+    reconhecedor = treinar_opencv(faces, rotulos, caminho)
+    _, distancias = previsoes_opencv(reconhecedor, faces[1::2])
+    # Limiar no meio das distâncias: parte das consultas é recusada
+    reconhecedor.setThreshold(float(np.median(distancias)))
+    reconhecedor.write(caminho)
+    esperados, distancias = previsoes_opencv(reconhecedor, faces[1::2])
+    assert (esperados == -1).any() and (esperados != -1).any()
+
+    obtidos, obtidas = MotorLBPH.carregar(caminho).prever_lote(faces[1::2])
+    np.testing.assert_array_equal(obtidos, esperados)
+    recusadas = esperados == -1
+    assert np.all(obtidas[recusadas] == DISTANCIA_MAXIMA) and np.all(distancias[recusadas] == DISTANCIA_MAXIMA)
+    np.testing.assert_allclose(obtidas[~recusadas], distancias[~recusadas], rtol=1e-5)
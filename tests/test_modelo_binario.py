@@ -0,0 +1,71 @@
+import json
+
+import numpy as np
+import pytest
+
+from lbph import MotorLBPH
+from modelo_binario import carregar_modelo_binario, converter_yml, eh_modelo_binario
+from treinar import criar_reconhecedor
+
+
+@pytest.fixture
+def modelo_yml(tmp_path, faces_sinteticas):
+    """Modelo do OpenCV treinado com as fotos pares, com os rótulos fora de ordem"""
+    faces, rotulos = faces_sinteticas
+    ordem = np.random.default_rng(1).permutation(len(rotulos))[::2]
+    reconhecedor = criar_reconhecedor()
+    reconhecedor.train([faces[i] for i in ordem], rotulos[ordem])
+    caminho = str(tmp_path / 'modelo.yml')
+    reconhecedor.write(caminho)
+    return caminho, reconhecedor
+
+
+def galeria_ordenada(reconhecedor):
+    """Galeria e rótulos do OpenCV na ordem do formato binário (estável por rótulo)"""
+    rotulos = reconhecedor.getLabels().ravel()
+    galeria = np.vstack([h.ravel() for h in reconhecedor.getHistograms()])
+    ordem = np.argsort(rotulos, kind='stable')
+    return galeria[ordem], rotulos[ordem]
+
+
+@pytest.mark.parametrize('tipo', ['float32', 'float16'])
+def test_conversao_preserva_galeria_rotulos_e_parametros(tmp_path, modelo_yml, tipo):
+    caminho, reconhecedor = modelo_yml
+    nomes = tmp_path / 'nomes.json'
+    nomes.write_text(json.dumps({'0': 'Ana', '1': 'Bia', '2': 'Caio', '3': 'Davi'}))
+    destino = converter_yml(caminho, str(tmp_path / 'modelo.lbph'), str(nomes), tipo)
+    assert eh_modelo_binario(destino)
+
+    cabecalho, histogramas, rotulos, somas = carregar_modelo_binario(destino)
+    galeria, esperados = galeria_ordenada(reconhecedor)
+    assert histogramas.dtype == np.dtype(tipo)
+    np.testing.assert_array_equal(rotulos, esperados)
+    np.testing.assert_array_equal(histogramas, galeria.astype(tipo))
+    np.testing.assert_allclose(somas, histogramas.sum(axis=1, dtype=np.float64))
+    assert (cabecalho['raio'], cabecalho['vizinhos'], cabecalho['grid_x'], cabecalho['grid_y']) == (
+        reconhecedor.getRadius(), reconhecedor.getNeighbors(), reconhecedor.getGridX(), reconhecedor.getGridY())
+    assert cabecalho['limiar'] == reconhecedor.getThreshold()
+    assert MotorLBPH.carregar(destino).nomes == {'0': 'Ana', '1': 'Bia', '2': 'Caio', '3': 'Davi'}
+
+
+# Em float16 as distâncias mudam pouco (e as fotos da galeria ficam a ~1e-6 de si mesmas, não a 0)
+@pytest.mark.parametrize('tipo, rtol, atol', [('float32', 1e-5, 0), ('float16', 1e-2, 1e-3)])
+def test_binario_mantem_as_decisoes_do_yml(tmp_path, modelo_yml, faces_sinteticas, tipo, rtol, atol):
+    caminho, reconhecedor = modelo_yml
+    destino = converter_yml(caminho, str(tmp_path / 'modelo.lbph'), tipo=tipo)
+    consultas = faces_sinteticas[0]
+
+    esperados, distancias = MotorLBPH.carregar(caminho).prever_lote(consultas)
+    for mapear in (True, False):
+        obtidos, obtidas = MotorLBPH.carregar_binario(destino, mapear).prever_lote(consultas)
+        np.testing.assert_array_equal(obtidos, esperados)
+        np.testing.assert_allclose(obtidas, distancias, rtol=rtol, atol=atol)
+
+
+def test_ida_e_volta_binario_yml_binario(tmp_path, modelo_yml):
+    caminho, _ = modelo_yml
+    motor = MotorLBPH.carregar_binario(converter_yml(caminho, str(tmp_path / 'a.lbph')))
+    motor.salvar_yml(str(tmp_path / 'volta.yml'))
+    de_volta = MotorLBPH.carregar_binario(converter_yml(str(tmp_path / 'volta.yml'), str(tmp_path / 'b.lbph')))
+    np.testing.assert_array_equal(de_volta.galeria, motor.galeria)
+    np.testing.assert_array_equal(de_volta.rotulos, motor.rotulos)
@@ -0,0 +1,55 @@
+import threading
+import time
+
+import numpy as np
+
+from detector import Resultado, analisador_registrando, desenhar_resultados
+from pipeline import PipelineReconhecimento
+
+
+class RegistradorEspiao:
+    def __init__(self):
+        self.decisoes = []
+        self._lock = threading.Lock()
+
+    def registrar(self, nome, acesso_permitido, confianca=None):
+        with self._lock:
+            self.decisoes.append(nome)
+
+
+def test_decisoes_sobrevivem_aos_descartes_da_saida():
+    total = 60
+    quadros = iter(range(total))
+
+    def ler_quadro():
+        time.sleep(0.002)
+        indice = next(quadros, None)
+        return (False, None) if indice is None else (True, indice)
+
+    analisados = []
+
+    def analisar(indice):
+        analisados.append(indice)
+        # Como no rastreamento: a decisão de cada pessoa aparece num único quadro
+        return [Resultado((0, 0, 10, 10), f'pessoa_{indice}', 40.0, (0, 255, 0), 'ok', True, True)]
+
+    vistos = []
+
+    def saida(indice, resultados):
+        vistos.append(indice)
+        time.sleep(0.01)  # saída lenta: a fila "último quadro vence" descarta resultados
+
+    registrador = RegistradorEspiao()
+    executor = PipelineReconhecimento(ler_quadro, lambda: analisador_registrando(analisar, registrador), saida,
+                                      workers=2, tamanho_fila=1)
+    executor.executar()
+
+    # Quadros que a inferência analisou mas a saída não exibiu
+    assert set(analisados) - set(vistos)
+    assert sorted(registrador.decisoes) == sorted(f'pessoa_{i}' for i in analisados)
+
+
+def test_desenhar_resultados_so_desenha():
+    quadro = np.zeros((20, 20, 3), np.uint8)
+    desenhar_resultados(quadro, [Resultado((2, 2, 10, 10), 'a', 40.0, (0, 255, 0), 'ok', True, True)])
+    assert quadro.any()
@@ -0,0 +1,77 @@
+"""
+A face que o detector entrega ao LBPH precisa ser idêntica, pixel a pixel,
+à primeira variação (a original) que o treinamento gera da mesma foto.
+"""
+import glob
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from detector import reconhecer_faces
+from fontes import desenhar_rosto_sintetico
+from preprocessamento import PreprocessadorFaces
+from treinar import RECEITAS_AUMENTO, processar_imagem
+
+PASTA_USUARIOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'users')
+
+
+class ReconhecedorEspiao:
+    """Guarda as faces recebidas por `prever_lote` no lugar de reconhecê-las"""
+
+    def __init__(self):
+        self.faces = None
+
+    def prever_lote(self, faces):
+        self.faces = np.array(faces)
+        return np.full(len(faces), -1), np.full(len(faces), 200.0)
+
+
+def fotos_sinteticas(pasta):
+    caminhos = []
+    for semente, lado in ((0, 180), (1, 240)):
+        caminho = os.path.join(str(pasta), f'sintetica_{semente}.png')
+        cv2.imwrite(caminho, desenhar_rosto_sintetico(lado, semente))
+        caminhos.append(caminho)
+    return caminhos
+
+
+def fotos_do_repositorio():
+    return sorted(glob.glob(os.path.join(PASTA_USUARIOS, '*', '*.png')))[:2]
+
+
+def faces_do_detector(fotos, preprocessador=None):
+    """Cola as fotos lado a lado num quadro maior e passa as regiões pelo caminho do detector"""
+    imagens = [cv2.imread(foto, cv2.IMREAD_COLOR) for foto in fotos]
+    altura = max(imagem.shape[0] for imagem in imagens) + 60
+    largura = sum(imagem.shape[1] for imagem in imagens) + 40 * (len(imagens) + 1)
+    quadro = np.random.default_rng(0).integers(0, 256, (altura, largura, 3), dtype=np.uint8)
+    regioes, x = [], 40
+    for imagem in imagens:
+        h, w = imagem.shape[:2]
+        quadro[30:30 + h, x:x + w] = imagem
+        regioes.append((x, 30, w, h))
+        x += w + 40
+    gray = cv2.cvtColor(quadro, cv2.COLOR_BGR2GRAY)
+    espiao = ReconhecedorEspiao()
+    reconhecer_faces(espiao, {}, preprocessador or PreprocessadorFaces(), gray, regioes)
+    return espiao.faces
+
+
+def test_primeira_variacao_e_a_original():
+    assert RECEITAS_AUMENTO[0] == ('original',)
+
+
+@pytest.mark.parametrize('origem', ['sinteticas', 'repositorio'])
+def test_treino_e_detector_geram_a_mesma_face(tmp_path, origem):
+    fotos = fotos_sinteticas(tmp_path) if origem == 'sinteticas' else fotos_do_repositorio()
+    if not fotos:
+        pytest.skip("Sem fotos em users/")
+    # Capacidade 1: o lote de duas faces também exercita o crescimento do buffer
+    obtidas = faces_do_detector(fotos, PreprocessadorFaces(capacidade=1))
+    assert obtidas.shape[0] == len(fotos)
+    for foto, obtida in zip(fotos, obtidas):
+        esperada = processar_imagem(foto)[0]
+        assert esperada.dtype == obtida.dtype and esperada.shape == obtida.shape
+        assert np.array_equal(esperada, obtida), foto
@@ -0,0 +1,54 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from indice import assinatura_histogramas
+from manifesto_treino import carregar_manifesto
+from treinar import criar_reconhecedor, salvar_modelo, treinar
+
+PASTA_USUARIOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'users')
+
+
+def ler_galeria(modelo):
+    reconhecedor = criar_reconhecedor()
+    reconhecedor.read(modelo)
+    return np.vstack([h.ravel() for h in reconhecedor.getHistograms()]), reconhecedor.getLabels().ravel()
+
+
+@pytest.fixture
+def treino(tmp_path, monkeypatch):
+    if not os.path.isdir(PASTA_USUARIOS):
+        pytest.skip("Sem fotos em users/")
+    monkeypatch.chdir(tmp_path)
+    shutil.copytree(PASTA_USUARIOS, 'users')
+    # Uma foto fica de fora para o incremental ter o que acrescentar
+    usuario = sorted(os.listdir('users'))[0]
+    foto = sorted(os.listdir(os.path.join('users', usuario)))[0]
+    shutil.move(os.path.join('users', usuario, foto), 'reserva.png')
+    treinar(processos=1, usar_cache=False)
+    return os.path.join('users', usuario, foto)
+
+
+def test_incremental_remonta_o_modelo_do_manifesto(treino, capsys):
+    shutil.move('reserva.png', treino)
+    treinar(modo='incremental', processos=1, usar_cache=False)
+    assert "Treinamento incremental concluído" in capsys.readouterr().out
+
+
+def test_modelo_com_linhas_trocadas_leva_ao_treinamento_completo(treino, capsys):
+    histogramas, rotulos = ler_galeria('classificador.yml')
+    ordem = np.random.default_rng(0).permutation(len(rotulos))
+    # Mesmo número de linhas, ordem diferente: a contagem não basta para perceber
+    salvar_modelo('classificador.yml', histogramas[ordem], rotulos[ordem])
+    shutil.move('reserva.png', treino)
+    capsys.readouterr()
+    treinar(modo='incremental', processos=1, usar_cache=False)
+    saida = capsys.readouterr().out
+    assert "executando treinamento completo" in saida
+    assert "Treinamento incremental concluído" not in saida
+
+    # O modelo refeito volta a corresponder ao manifesto
+    histogramas, rotulos = ler_galeria('classificador.yml')
+    assert carregar_manifesto()['assinatura'] == assinatura_histogramas(histogramas, rotulos)
@@ -1,11 +1,26 @@
 import cv2
 import os
+import json
+import datetime
+import argparse
 import numpy as np
-from PIL import Image
 import random
-from scipy import ndimage
+import resource
+import time
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm  # Para barra de progresso
 
+from cache_caracteristicas import PASTA_CACHE, CacheCaracteristicas
+from indice import IndiceIdentidades, assinatura_galeria, assinatura_histogramas, caminho_indice
+from lbph import EscritorModeloYml, MotorLBPH, salvar_modelo_yml
+from metricas import METRICAS, servir
+from preprocessamento import TAMANHO_FACE, VERSAO_PREPROCESSAMENTO, carregar_face
+from modelo_binario import EscritorModeloBinario, caminho_binario
+from publicacao import caminho_versao, ler_versao, publicar_versao, salvar_json_atomico
+from manifesto_treino import (ARQUIVO_MANIFESTO, atribuir_ids, carregar_manifesto, comparar, escanear_usuarios,
+                              novo_manifesto, salvar_manifesto)
+
 # Funções de aumento de dados
 def aplicar_ruido(imagem, intensidade=0.01):
     """Adiciona ruído gaussiano à imagem"""
@@ -13,183 +28,786 @@ def aplicar_ruido(imagem, intensidade=0.01):
     imagem_com_ruido = imagem + ruido * 255
     return np.clip(imagem_com_ruido, 0, 255).astype(np.uint8)
 
+@lru_cache(maxsize=None)
+def matriz_rotacao(angulo, largura, altura):
+    """Matriz de rotação em torno do centro, calculada uma vez por ângulo/tamanho"""
+    return cv2.getRotationMatrix2D(((largura - 1) / 2.0, (altura - 1) / 2.0), angulo, 1.0)
+
 def aplicar_rotacao(imagem, angulo):
-    """Rotaciona a imagem por um ângulo específico"""
-    return ndimage.rotate(imagem, angulo, reshape=False)
+    """Rotaciona a imagem por um ângulo específico (mantendo o tamanho, bordas pretas)"""
+    altura, largura = imagem.shape[:2]
+    return cv2.warpAffine(imagem, matriz_rotacao(angulo, largura, altura), (largura, altura),
+                          flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
 
 def ajustar_brilho(imagem, fator):
     """Ajusta o brilho da imagem"""
     imagem_ajustada = imagem * fator
     return np.clip(imagem_ajustada, 0, 255).astype(np.uint8)
 
+@lru_cache(maxsize=None)
+def tabela_gamma(gamma):
+    inv_gamma = 1.0 / gamma
+    return (((np.arange(256) / 255.0) ** inv_gamma) * 255).astype(np.uint8)
+
 def ajustar_gamma(imagem, gamma=1.0):
     """Ajusta o gamma da imagem para simular diferentes condições de iluminação"""
-    inv_gamma = 1.0 / gamma
-    tabela = np.array([((i / 255.0) ** inv_gamma) * 255
-                      for i in range(256)]).astype(np.uint8)
-    return cv2.LUT(imagem, tabela)
+    return cv2.LUT(imagem, tabela_gamma(gamma))
 
-def simular_exposicao(imagem, exposicao=1.0):
-    """Simula diferentes exposições de câmera"""
+@lru_cache(maxsize=None)
+def tabela_exposicao(exposicao):
     # Evita divisão por zero
     exposicao = max(0.1, exposicao)
     # Aplica transformação logarítmica para simular exposição
-    imagem_exp = np.log1p(imagem * exposicao / 255.0) * (255.0 / np.log1p(exposicao))
-    return np.clip(imagem_exp, 0, 255).astype(np.uint8)
-
-def aplicar_filtro_bilateral(imagem):
-    """Aplica filtro bilateral para reduzir ruído preservando bordas"""
-    return cv2.bilateralFilter(imagem, 9, 75, 75)
-
-def aplicar_clahe(imagem):
-    """Aplica CLAHE (Contrast Limited Adaptive Histogram Equalization)"""
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    return clahe.apply(imagem)
-
-def aumentar_dados(face_original):
-    """Gera variações da imagem original"""
-    faces_aumentadas = []
-    
-    # Aplica pré-processamento na imagem original
-    face_preprocessada = aplicar_filtro_bilateral(face_original)
-    face_preprocessada = aplicar_clahe(face_preprocessada)
-    faces_aumentadas.append(face_preprocessada)
-    
-    # Gera variações com rotações (limitado para não sobrecarregar)
-    for angulo in [-5, 5]:
-        face_rotacionada = aplicar_rotacao(face_preprocessada, angulo)
-        faces_aumentadas.append(face_rotacionada)
-    
-    # Variações de gamma (simula diferentes tipos de dispositivos/monitores)
-    for gamma in [0.8, 1.2]:
-        face_gamma = ajustar_gamma(face_preprocessada, gamma)
-        faces_aumentadas.append(face_gamma)
-    
-    # Variações de exposição (simula diferentes condições de câmera)
-    for exp in [0.85, 1.25]:
-        face_exp = simular_exposicao(face_preprocessada, exp)
-        faces_aumentadas.append(face_exp)
-    
-    # Variação com combinação estratégica para cenários realistas
-    # Combinação de gamma baixo com exposição alta (cenário comum em ambientes reais)
-    face_combinada = simular_exposicao(ajustar_gamma(face_preprocessada, 0.85), 1.2)
-    faces_aumentadas.append(face_combinada)
-    
-    # Variações de gamma
-    for gamma in [0.8, 1.2]:
-        face_gamma = ajustar_gamma(face_preprocessada, gamma)
-        faces_aumentadas.append(face_gamma)
-    
-    # Simula diferentes exposições
-    for exposicao in [0.5, 1.5]:
-        face_exposicao = simular_exposicao(face_preprocessada, exposicao)
-        faces_aumentadas.append(face_exposicao)
-    
+    tabela = np.log1p(np.arange(256) * exposicao / 255.0) * (255.0 / np.log1p(exposicao))
+    return np.clip(tabela, 0, 255).astype(np.uint8)
+
+def simular_exposicao(imagem, exposicao=1.0):
+    """Simula diferentes exposições de câmera"""
+    return cv2.LUT(imagem, tabela_exposicao(exposicao))
+
+@lru_cache(maxsize=None)
+def tabela_gamma_exposicao(gamma, exposicao):
+    """Gamma seguido de exposição, combinados em uma única tabela"""
+    return tabela_exposicao(exposicao)[tabela_gamma(gamma)]
+
+# Receitas de aumento de dados, declaradas uma única vez e sem repetições
+RECEITAS_AUMENTO = (
+    ('original',),
+    # Rotações (limitado para não sobrecarregar)
+    ('rotacao', -5),
+    ('rotacao', 5),
+    # Gamma (simula diferentes tipos de dispositivos/monitores)
+    ('gamma', 0.8),
+    ('gamma', 1.2),
+    # Exposição (simula diferentes condições de câmera)
+    ('exposicao', 0.85),
+    ('exposicao', 1.25),
+    ('exposicao', 0.5),
+    ('exposicao', 1.5),
+    # Gamma baixo com exposição alta (cenário comum em ambientes reais)
+    ('gamma_exposicao', 0.85, 1.2),
+)
+assert len(set(RECEITAS_AUMENTO)) == len(RECEITAS_AUMENTO), "Receita de aumento repetida"
+
+# Quantas faces cada foto gera no treinamento
+FATOR_AUMENTO = len(RECEITAS_AUMENTO)
+
+def aplicar_receita(face, receita):
+    tipo, *parametros = receita
+    if tipo == 'original':
+        return face
+    if tipo == 'rotacao':
+        return aplicar_rotacao(face, *parametros)
+    if tipo == 'gamma':
+        return ajustar_gamma(face, *parametros)
+    if tipo == 'exposicao':
+        return simular_exposicao(face, *parametros)
+    if tipo == 'gamma_exposicao':
+        return cv2.LUT(face, tabela_gamma_exposicao(*parametros))
+    raise ValueError(f"Receita de aumento desconhecida: {receita}")
+
+def aumentar_dados(face_original, tempos=None):
+    """
+    Gera variações da face já pré-processada (uma por receita de
+    RECEITAS_AUMENTO); filtro bilateral e CLAHE fazem parte da receita de
+    `preprocessamento`, aplicada também pelo detector.
+    """
+    inicio = time.perf_counter()
+    faces_aumentadas = [aplicar_receita(face_original, receita) for receita in RECEITAS_AUMENTO]
+    if tempos is not None:
+        tempos['aumento'] = tempos.get('aumento', 0.0) + (time.perf_counter() - inicio)
     return faces_aumentadas
 
-# Função para obter imagens e labels para treinamento
-def get_imagens_e_labels(path):
-    # Lista para armazenar as faces
+
+# Parâmetros do LBPH otimizados para eficiência
+PARAMETROS_LBPH = {
+    'radius': 2,           # Raio menor para processamento mais rápido
+    'neighbors': 8,        # Número padrão de pontos de amostra
+    'grid_x': 8,           # Grade padrão para eficiência
+    'grid_y': 8,           # Grade padrão para eficiência
+    'threshold': 115.0,    # Limiar ajustado para as novas variações de gamma e exposição
+}
+
+# Versão do pré-processamento/aumento de dados; mudar invalida o treinamento incremental
+VERSAO_RECEITA = 2
+
+
+def parametros_treino():
+    """Tudo que, se mudar, obriga a retreinar do zero"""
+    return {'lbph': PARAMETROS_LBPH, 'receita': VERSAO_RECEITA, 'tamanho': list(TAMANHO_FACE),
+            'preprocessamento': VERSAO_PREPROCESSAMENTO}
+
+
+def processar_imagem(caminho_imagem, tempos=None):
+    """Carrega uma foto, normaliza e gera as variações usadas no treinamento"""
+    inicio = time.perf_counter()
+    # Mesma receita aplicada pelo detector a cada face (ver preprocessamento.py)
+    face_np = carregar_face(caminho_imagem)
+    if tempos is not None:
+        tempos['preprocessamento'] = tempos.get('preprocessamento', 0.0) + (time.perf_counter() - inicio)
+    
+    # Gera variações da imagem
+    return aumentar_dados(face_np, tempos)
+
+
+def _iniciar_processo():
+    # Cada processo já é um núcleo: evita que o OpenCV abra threads próprias
+    cv2.setNumThreads(1)
+
+
+def _processar_no_processo(caminho_imagem):
+    """Executado no pool: devolve as variações empilhadas (um único array) e os tempos"""
+    tempos = {}
+    return np.stack(processar_imagem(caminho_imagem, tempos)), tempos
+
+
+def criar_motor():
+    """`MotorLBPH` com os parâmetros do treinamento (histogramas idênticos aos do OpenCV)"""
+    return MotorLBPH(PARAMETROS_LBPH['radius'], PARAMETROS_LBPH['neighbors'], PARAMETROS_LBPH['grid_x'],
+                     PARAMETROS_LBPH['grid_y'], PARAMETROS_LBPH['threshold'])
+
+
+def _histogramas_no_processo(caminho_imagem):
+    """Executado no pool: devolve os histogramas LBPH das variações da foto e os tempos"""
+    tempos = {}
+    faces = np.stack(processar_imagem(caminho_imagem, tempos))
+    inicio = time.perf_counter()
+    histogramas = criar_motor().histogramas(faces)
+    tempos['lbp'] = time.perf_counter() - inicio
+    return histogramas, tempos
+
+
+def criar_executor(processos, tarefas):
+    """Pool de processos para `tarefas` imagens (None se um processo basta); retorna (executor, processos)"""
+    processos = min(processos or os.cpu_count() or 1, tarefas)
+    if processos > 1:
+        return ProcessPoolExecutor(processos, initializer=_iniciar_processo), processos
+    return None, 1
+
+
+def processar_imagens(imagens, ids_usuarios, processos=None, tempos=None):
+    """
+    Processa uma lista de (usuario, caminho, hash). Retorna as faces
+    aumentadas, os IDs de cada face e as entradas do manifesto.
+    
+    As imagens são distribuídas entre `processos` processos (padrão: todos
+    os núcleos; 1 processa tudo no processo atual). Os tempos somados de
+    cada etapa (preprocessamento, aumento) são acumulados em `tempos`, se
+    informado.
+    """
+    if tempos is None:
+        tempos = {}
     faces = []
-    # Lista para armazenar os IDs
     ids = []
-    # Lista para armazenar os nomes
-    nomes = {}
-    id_atual = 0
-
-    # Percorre todas as pastas de usuários
-    for usuario in os.listdir(path):
-        caminho_usuario = os.path.join(path, usuario)
-        if os.path.isdir(caminho_usuario):
-            # Associa um ID numérico ao nome do usuário
-            nomes[id_atual] = usuario
-            
-            # Percorre todas as imagens do usuário
-            imagens = [img for img in os.listdir(caminho_usuario) 
-                      if img.endswith(('.png', '.jpg', '.jpeg'))]
-            
-            for imagem in tqdm(imagens, desc=f"Processando {usuario}", unit="img"):
-                caminho_imagem = os.path.join(caminho_usuario, imagem)
-                
-                # Carrega a imagem e converte para escala de cinza
-                face_img = Image.open(caminho_imagem).convert('L')
-                # Redimensiona para 100x100 pixels para reduzir o tamanho do modelo
-                face_img = face_img.resize((250, 250), Image.Resampling.LANCZOS)
-                face_np = np.array(face_img, 'uint8')
-                
-                # Aplica equalização de histograma
-                face_np = cv2.equalizeHist(face_np)
-                
-                # Normalização do contraste
-                face_np = cv2.normalize(face_np, None, 0, 255, cv2.NORM_MINMAX)
-                
-                # Gera variações da imagem
-                faces_aumentadas = aumentar_dados(face_np)
-                
-                # Adiciona todas as variações às listas
-                for face_aumentada in faces_aumentadas:
-                    faces.append(face_aumentada)
-                    ids.append(id_atual)
-                    
-            id_atual += 1
+    entradas = []
+    if not imagens:
+        return faces, ids, entradas
+    
+    # Agrupa por usuário mantendo a ordem (a ordem das amostras no modelo segue o manifesto)
+    ordenadas = agrupar_por_usuario(imagens)
+    caminhos = [caminho for _, caminho, _ in ordenadas]
+    
+    executor, processos = criar_executor(processos, len(caminhos))
+    if executor is not None:
+        # Lotes de algumas imagens por tarefa reduzem o custo de comunicação
+        resultados = executor.map(_processar_no_processo, caminhos,
+                                  chunksize=max(1, len(caminhos) // (processos * 4)))
+    else:
+        resultados = map(_processar_no_processo, caminhos)
+    
+    try:
+        for (usuario, caminho_imagem, hash_imagem), (faces_aumentadas, tempos_imagem) in tqdm(
+                zip(ordenadas, resultados), total=len(ordenadas), desc="Processando imagens", unit="img"):
+            for etapa, duracao in tempos_imagem.items():
+                registrar_tempo(tempos, etapa, duracao)
+            # Adiciona todas as variações às listas
+            faces.extend(faces_aumentadas)
+            ids.extend([ids_usuarios[usuario]] * len(faces_aumentadas))
+            entradas.append({'usuario': usuario, 'arquivo': caminho_imagem, 'hash': hash_imagem,
+                             'amostras': len(faces_aumentadas)})
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return faces, ids, entradas
+
+
+def agrupar_por_usuario(imagens):
+    """Reordena (usuario, caminho, hash) agrupando por usuário, na ordem em que cada um aparece"""
+    por_usuario = {}
+    for usuario, caminho, hash_imagem in imagens:
+        por_usuario.setdefault(usuario, []).append((caminho, hash_imagem))
+    return [(usuario, caminho, hash_imagem)
+            for usuario, lista in por_usuario.items() for caminho, hash_imagem in lista]
+
+
+def iterar_caracteristicas(imagens, cache=None, executor=None, processos=1, tempos=None):
+    """
+    Gera (usuario, caminho, hash, histogramas) para cada foto de `imagens`,
+    na mesma ordem. Fotos já no `cache` não são processadas; as demais
+    vão para o `executor` (ou rodam no processo atual) e entram no cache.
+    """
+    if tempos is None:
+        tempos = {}
+    # Decide antes quem falta: fotos repetidas entram no cache durante a iteração
+    no_cache = [cache is not None and h in cache for _, _, h in imagens]
+    faltantes = [caminho for (_, caminho, _), guardada in zip(imagens, no_cache) if not guardada]
+    if executor is not None and faltantes:
+        resultados = executor.map(_histogramas_no_processo, faltantes,
+                                  chunksize=max(1, len(faltantes) // (processos * 4)))
+    else:
+        resultados = map(_histogramas_no_processo, faltantes)
     
+    for (usuario, caminho_imagem, hash_imagem), guardada in zip(imagens, no_cache):
+        tempos_imagem = {}
+        origem = 'calculo'
+        if guardada:
+            inicio = time.perf_counter()
+            histogramas = cache.obter(hash_imagem)
+            tempos_imagem['cache'] = time.perf_counter() - inicio
+            origem = 'cache'
+            if histogramas is None:
+                # Entrada ilegível ou já descartada: não foi enviada ao pool, processa aqui
+                histogramas, tempos_imagem = _histogramas_no_processo(caminho_imagem)
+                cache.guardar(hash_imagem, histogramas)
+                origem = 'calculo'
+        else:
+            histogramas, tempos_imagem = next(resultados)
+            if cache is not None:
+                cache.falhas += 1
+                cache.guardar(hash_imagem, histogramas)
+        for etapa, duracao in tempos_imagem.items():
+            registrar_tempo(tempos, etapa, duracao)
+        METRICAS.incrementar('fotos_treino', origem=origem)
+        yield usuario, caminho_imagem, hash_imagem, histogramas
+
+
+def extrair_caracteristicas(imagens, ids_usuarios, processos=None, tempos=None, cache=None):
+    """
+    Histogramas LBPH de uma lista de (usuario, caminho, hash), agrupada por
+    usuário. Retorna (histogramas (n, n_bins), rotulos (n,), entradas do manifesto).
+    """
+    ordenadas = agrupar_por_usuario(imagens)
+    motor = criar_motor()
+    histogramas = np.empty((len(ordenadas) * FATOR_AUMENTO, motor.n_bins), np.float32)
+    rotulos = np.empty(len(ordenadas) * FATOR_AUMENTO, np.int32)
+    entradas = []
+    executor, processos = criar_executor(processos, len(ordenadas) or 1)
+    try:
+        n = 0
+        for usuario, caminho_imagem, hash_imagem, histogramas_imagem in tqdm(
+                iterar_caracteristicas(ordenadas, cache, executor, processos, tempos),
+                total=len(ordenadas), desc="Processando imagens", unit="img"):
+            histogramas[n:n + len(histogramas_imagem)] = histogramas_imagem
+            rotulos[n:n + len(histogramas_imagem)] = ids_usuarios[usuario]
+            n += len(histogramas_imagem)
+            entradas.append({'usuario': usuario, 'arquivo': caminho_imagem, 'hash': hash_imagem,
+                             'amostras': len(histogramas_imagem)})
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return histogramas[:n], rotulos[:n], entradas
+
+
+def registrar_tempo(tempos, etapa, duracao):
+    """Soma a duração da etapa em `tempos` e a registra no histograma de `metricas.METRICAS`"""
+    tempos[etapa] = tempos.get(etapa, 0.0) + duracao
+    METRICAS.observar(etapa, duracao)
+
+
+def imprimir_tempos(tempos):
+    """Tempo somado de cada etapa (nos processos, o tempo é somado entre eles)"""
+    print("\nTempo por etapa:")
+    for etapa, duracao in tempos.items():
+        print(f"  {etapa:<16} {duracao:8.2f} s")
+
+
+# Função para obter imagens e labels para treinamento
+def get_imagens_e_labels(path, ids_usuarios=None):
+    """
+    Percorre users/<nome>/ e retorna (faces, ids, nomes). `ids_usuarios`
+    ({nome: id}) preserva os IDs de usuários já cadastrados.
+    """
+    encontrados = escanear_usuarios(path)
+    ids_usuarios = atribuir_ids(encontrados, ids_usuarios or {})
+    imagens = [(usuario, caminho, h) for usuario, arquivos in encontrados.items() for caminho, h in arquivos.items()]
+    faces, ids, _ = processar_imagens(imagens, ids_usuarios)
+    nomes = {id_usuario: usuario for usuario, id_usuario in sorted(ids_usuarios.items(), key=lambda item: item[1])}
     return faces, ids, nomes
 
-# Diretório onde estão as pastas dos usuários com as fotos
-path = 'users'
 
-print("\n=== Iniciando Processo de Treinamento ===\n")
+def ids_conhecidos(manifesto, arquivo_nomes):
+    """IDs já atribuídos: do manifesto ou, na falta dele, do nomes.json"""
+    if manifesto is not None:
+        return dict(manifesto['usuarios'])
+    if os.path.exists(arquivo_nomes):
+        with open(arquivo_nomes, 'r') as f:
+            return {nome: int(id_usuario) for id_usuario, nome in json.load(f).items()}
+    return {}
 
-# Conta total de imagens para a barra de progresso
-total_imagens = sum(len([f for f in os.listdir(os.path.join(path, d)) 
-                        if f.endswith(('.png', '.jpg', '.jpeg'))])
-                    for d in os.listdir(path) 
-                    if os.path.isdir(os.path.join(path, d)))
 
-print(f"Total de imagens originais encontradas: {total_imagens}")
-print(f"Total de imagens após aumentação (8x): {total_imagens * 8}")
-print("\n1. Processando e aumentando imagens com ajustes de gamma e exposição...")
+def criar_reconhecedor():
+    return cv2.face.LBPHFaceRecognizer_create(**PARAMETROS_LBPH)
 
-# Obtém as faces e IDs
-faces, ids, nomes = get_imagens_e_labels(path)
 
-print(f"\n2. Iniciando treinamento com {len(faces)} imagens...")
-print("Isso pode levar alguns minutos, por favor aguarde...")
+def salvar_resultados(motor, ids_usuarios, total_faces, modelo, arquivo_nomes):
+    """Modelo binário, índice de identidades, mapeamento de nomes e registro das otimizações"""
+    nomes = {id_usuario: usuario for usuario, id_usuario in sorted(ids_usuarios.items(), key=lambda item: item[1])}
+    
+    # Modelo binário mapeável, de carregamento imediato (usado por detector.py --modelo classificador.lbph)
+    motor.salvar_binario(caminho_binario(modelo), nomes)
+    print(f"✓ Modelo binário salvo em {caminho_binario(modelo)}")
+    
+    # Constrói o índice de identidades em dois níveis (usado por detector.py --motor indice)
+    indice = IndiceIdentidades(motor).construir()
+    indice.salvar(caminho_indice(modelo))
+    print(f"✓ Índice de identidades salvo em {caminho_indice(modelo)}")
+    
+    salvar_nomes(nomes, total_faces, arquivo_nomes)
+    return nomes
 
-# Cria o reconhecedor LBPH com parâmetros otimizados para eficiência
-reconhecedor = cv2.face.LBPHFaceRecognizer_create(
-    radius=2,           # Raio menor para processamento mais rápido
-    neighbors=8,        # Número padrão de pontos de amostra
-    grid_x=8,           # Grade padrão para eficiência
-    grid_y=8,           # Grade padrão para eficiência
-    threshold=115.0     # Limiar ajustado para as novas variações de gamma e exposição
-)
 
-# Treina o reconhecedor
-print("\nTreinando o modelo... (esta etapa pode demorar)")
-reconhecedor.train(faces, np.array(ids))
-print("Treinamento do modelo concluído!")
+def salvar_nomes(nomes, total_faces, arquivo_nomes):
+    """Mapeamento de nomes e registro das otimizações"""
+    # Salva o dicionário de nomes (atômico: o detector pode recarregá-lo a qualquer momento)
+    salvar_json_atomico(arquivo_nomes, nomes)
+    print(f"✓ Mapeamento de nomes salvo em {arquivo_nomes}")
+    
+    # Registra as otimizações aplicadas
+    os.makedirs('logs', exist_ok=True)
+    with open(f'logs/otimizacoes_{datetime.datetime.now().strftime("%Y-%m-%d")}.txt', 'a') as f:
+        f.write(f"\n[{datetime.datetime.now().strftime('%H:%M:%S')}] Treinamento concluído: {total_faces} imagens processadas com otimizações de gamma e exposição.\n")
 
-print("\n3. Salvando arquivos...")
-# Salva o modelo treinado
-reconhecedor.write('classificador.yml')
-print("✓ Modelo salvo em classificador.yml")
 
-# Salva o dicionário de nomes
-import json
-with open('nomes.json', 'w') as f:
-    json.dump(nomes, f)
-print("✓ Mapeamento de nomes salvo em nomes.json")
+def compactar_modelo(modelo, nomes, prototipos):
+    """
+    Troca a galeria gravada em `modelo` (.yml, .lbph e índice) pela
+    compacta, com até `prototipos` amostras por pessoa (ver compactacao.py).
+    Retorna (motor compacto, estatísticas).
+    """
+    # Importado aqui: compactacao usa o aumento de dados deste módulo
+    from compactacao import compactar, salvar_compacto
+    motor, estatisticas = compactar(MotorLBPH.carregar_binario(caminho_binario(modelo)), prototipos)
+    salvar_compacto(motor, modelo, nomes)
+    print(f"✓ Galeria compactada: {estatisticas['amostras_antes']} -> {estatisticas['amostras_depois']} amostras "
+          f"({estatisticas['duplicatas']} duplicatas)")
+    return motor, estatisticas
 
-# Registra as otimizações aplicadas
-import datetime
-with open(f'logs/otimizacoes_{datetime.datetime.now().strftime("%Y-%m-%d")}.txt', 'a') as f:
-    f.write(f"\n[{datetime.datetime.now().strftime('%H:%M:%S')}] Treinamento concluído: {len(faces)} imagens processadas com otimizações de gamma e exposição.\n")
-
-print("\nTreinamento concluído com sucesso!")
-print(f"Total de pessoas cadastradas: {len(nomes)}")
-print(f"Total de imagens processadas após aumentação: {len(faces)}")
-print("Otimizações aplicadas: ajustes de gamma e exposição de câmera")
-print("\nNomes cadastrados:")
-for id_usuario, nome in nomes.items():
-    print(f"ID {id_usuario}: {nome}")
+
+def publicar(modelo, modo, nomes, amostras, compactar=None):
+    """
+    Grava o selo de versão, por último: o detector em execução passa a usar o
+    novo modelo. Com `compactar`, antes troca a galeria gravada pela compacta.
+    """
+    extras = {}
+    if compactar:
+        _, extras = compactar_modelo(modelo, nomes, compactar)
+        amostras = extras.pop('amostras_depois')
+    selo = publicar_versao(modelo, modo=modo, amostras=int(amostras), pessoas=len(nomes), **extras)
+    print(f"✓ Versão {selo['versao']} publicada em {caminho_versao(modelo)}")
+    return selo
+
+
+def salvar_modelo(modelo, histogramas, rotulos):
+    """Grava a galeria no formato do OpenCV (.yml), na ordem do manifesto"""
+    salvar_modelo_yml(modelo, histogramas, rotulos, PARAMETROS_LBPH['radius'], PARAMETROS_LBPH['neighbors'],
+                      PARAMETROS_LBPH['grid_x'], PARAMETROS_LBPH['grid_y'], PARAMETROS_LBPH['threshold'])
+
+
+def treinar_completo(path='users', modelo='classificador.yml', arquivo_nomes='nomes.json',
+                     arquivo_manifesto=ARQUIVO_MANIFESTO, processos=None, cache=None, compactar=None):
+    """
+    Processa todas as imagens de `path` e treina o modelo do zero.
+    
+    Os histogramas LBPH (idênticos aos do `train` do OpenCV) são calculados
+    junto com o aumento de dados, no pool de processos; com um `cache`
+    (`CacheCaracteristicas`), fotos que não mudaram desde o último
+    treinamento nem chegam a ser abertas.
+    """
+    print("\n=== Iniciando Processo de Treinamento ===\n")
+    
+    manifesto_anterior = carregar_manifesto(arquivo_manifesto)
+    encontrados = escanear_usuarios(path)
+    ids_usuarios = atribuir_ids(encontrados, ids_conhecidos(manifesto_anterior, arquivo_nomes))
+    imagens = [(usuario, caminho, h) for usuario, arquivos in encontrados.items() for caminho, h in arquivos.items()]
+    
+    # Conta total de imagens para a barra de progresso
+    total_imagens = len(imagens)
+    print(f"Total de imagens originais encontradas: {total_imagens}")
+    print(f"Total de imagens após aumentação ({FATOR_AUMENTO}x): {total_imagens * FATOR_AUMENTO}")
+    print("\n1. Processando e aumentando imagens com ajustes de gamma e exposição...")
+    
+    # Obtém os histogramas e IDs
+    tempos = {}
+    histogramas, ids, entradas = extrair_caracteristicas(imagens, ids_usuarios, processos, tempos, cache)
+    
+    print(f"\n2. Montando o modelo com {len(ids)} imagens...")
+    inicio = time.perf_counter()
+    motor = criar_motor()
+    motor.definir_galeria(histogramas, ids)
+    registrar_tempo(tempos, 'treino', time.perf_counter() - inicio)
+    print("Treinamento do modelo concluído!")
+    imprimir_tempos(tempos)
+    if cache is not None:
+        print(cache.resumo())
+    
+    print("\n3. Salvando arquivos...")
+    # Salva o modelo treinado
+    salvar_modelo(modelo, histogramas, ids)
+    print(f"✓ Modelo salvo em {modelo}")
+    
+    nomes = salvar_resultados(motor, ids_usuarios, len(ids), modelo, arquivo_nomes)
+    
+    manifesto = novo_manifesto(parametros_treino())
+    manifesto['usuarios'] = ids_usuarios
+    manifesto['imagens'] = entradas
+    manifesto['assinatura'] = assinatura_histogramas(histogramas, ids)
+    salvar_manifesto(manifesto, arquivo_manifesto)
+    print(f"✓ Manifesto salvo em {arquivo_manifesto}")
+    publicar(modelo, 'completo', nomes, len(ids), compactar)
+    
+    print("\nTreinamento concluído com sucesso!")
+    print(f"Total de pessoas cadastradas: {len(nomes)}")
+    print(f"Total de imagens processadas após aumentação: {len(ids)}")
+    print("Otimizações aplicadas: ajustes de gamma e exposição de câmera")
+    print("\nNomes cadastrados:")
+    for id_usuario, nome in nomes.items():
+        print(f"ID {id_usuario}: {nome}")
+    return motor, nomes
+
+
+def treinar_incremental(path='users', modelo='classificador.yml', arquivo_nomes='nomes.json',
+                        arquivo_manifesto=ARQUIVO_MANIFESTO, processos=None, cache=None, compactar=None):
+    """
+    Processa só as imagens novas ou alteradas desde o último treinamento.
+    
+    O modelo é remontado a partir dos histogramas já gravados nele: as
+    amostras de imagens apagadas (ou alteradas) saem e só as imagens novas
+    têm os histogramas calculados (ou lidos do `cache`). As linhas do modelo
+    são localizadas pela ordem do manifesto, então o modelo precisa ser
+    exatamente o que o manifesto descreve (a `assinatura` gravada nele); um
+    modelo compactado ou trocado à mão leva ao treinamento completo.
+    """
+    manifesto = carregar_manifesto(arquivo_manifesto)
+    if manifesto is None or not os.path.exists(modelo):
+        print("Manifesto ou modelo não encontrado: executando treinamento completo.")
+        return treinar_completo(path, modelo, arquivo_nomes, arquivo_manifesto, processos, cache, compactar)
+    if manifesto['parametros'] != json.loads(json.dumps(parametros_treino())):
+        print("Parâmetros do treinamento mudaram: executando treinamento completo.")
+        return treinar_completo(path, modelo, arquivo_nomes, arquivo_manifesto, processos, cache, compactar)
+    
+    print("\n=== Treinamento Incremental ===\n")
+    encontrados = escanear_usuarios(path)
+    ids_usuarios = atribuir_ids(encontrados, manifesto['usuarios'])
+    mantidas, removidas, novas = comparar(manifesto, encontrados)
+    print(f"Imagens no modelo: {len(mantidas)} | novas/alteradas: {len(novas)} | removidas/alteradas: {len(removidas)}")
+    
+    if not novas and not removidas:
+        print("Nada a fazer: o modelo já está atualizado.")
+        nomes = {id_usuario: usuario for usuario, id_usuario in sorted(ids_usuarios.items(), key=lambda item: item[1])}
+        return MotorLBPH.carregar(modelo), nomes
+    
+    reconhecedor = criar_reconhecedor()
+    reconhecedor.read(modelo)
+    histogramas = reconhecedor.getHistograms()
+    rotulos = reconhecedor.getLabels().ravel()
+    if (sum(entrada['amostras'] for entrada in manifesto['imagens']) != len(histogramas)
+            or manifesto.get('assinatura') != assinatura_histogramas(histogramas, rotulos)):
+        print("Manifesto não corresponde ao modelo (compactado ou substituído?): executando treinamento completo.")
+        return treinar_completo(path, modelo, arquivo_nomes, arquivo_manifesto, processos, cache, compactar)
+    
+    # Linhas do modelo que continuam válidas (o modelo segue a ordem do manifesto)
+    manter = set(id(entrada) for entrada in mantidas)
+    linhas = []
+    inicio = 0
+    for entrada in manifesto['imagens']:
+        if id(entrada) in manter:
+            linhas.extend(range(inicio, inicio + entrada['amostras']))
+        inicio += entrada['amostras']
+    
+    tempos = {}
+    novos_histogramas, novos_ids, entradas_novas = extrair_caracteristicas(novas, ids_usuarios, processos, tempos,
+                                                                           cache)
+    
+    print(f"\nRemontando o modelo: {len(histogramas) - len(linhas)} amostras removidas, {len(novos_ids)} novas...")
+    inicio = time.perf_counter()
+    mantidos = np.empty((len(linhas), novos_histogramas.shape[1]), np.float32)
+    for j, i in enumerate(linhas):
+        mantidos[j] = histogramas[i].ravel()
+    galeria = np.concatenate([mantidos, novos_histogramas])
+    ids = np.concatenate([rotulos[linhas], novos_ids])
+    motor = criar_motor()
+    motor.definir_galeria(galeria, ids)
+    registrar_tempo(tempos, 'treino', time.perf_counter() - inicio)
+    salvar_modelo(modelo, galeria, ids)
+    imprimir_tempos(tempos)
+    if cache is not None:
+        print(cache.resumo())
+    print(f"✓ Modelo salvo em {modelo}")
+    
+    nomes = salvar_resultados(motor, ids_usuarios, len(novos_ids), modelo, arquivo_nomes)
+    manifesto['usuarios'] = ids_usuarios
+    manifesto['imagens'] = mantidas + entradas_novas
+    manifesto['assinatura'] = assinatura_histogramas(galeria, ids)
+    salvar_manifesto(manifesto, arquivo_manifesto)
+    print(f"✓ Manifesto salvo em {arquivo_manifesto}")
+    publicar(modelo, 'incremental', nomes, len(ids), compactar)
+    
+    print(f"\nTreinamento incremental concluído! Pessoas cadastradas: {len(nomes)}")
+    return motor, nomes
+
+
+# Memória por foto em um lote: os histogramas das variações no buffer do
+# lote e a cópia que chega do pool de processos
+BYTES_POR_IMAGEM_LOTE = 2 * FATOR_AUMENTO * PARAMETROS_LBPH['grid_x'] * PARAMETROS_LBPH['grid_y'] \
+    * 2 ** PARAMETROS_LBPH['neighbors'] * 4
+# Memória de trabalho do cálculo de uma foto: as faces (uint8) mais os
+# intermediários do LBP/histograma (~24 bytes por pixel, medido com tracemalloc)
+BYTES_PROCESSAR_IMAGEM = FATOR_AUMENTO * TAMANHO_FACE[0] * TAMANHO_FACE[1] * 26
+
+
+def memoria_atual_mb():
+    """Memória residente atual do processo (Linux; 0 se indisponível)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def pico_memoria_mb():
+    """Pico de memória residente deste processo e do maior processo filho"""
+    proprio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    filhos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return proprio, filhos
+
+
+def imagens_por_lote(memoria_mb, total_amostras, identidades, processos=1):
+    """
+    Retorna (processos, fotos por lote) dentro do orçamento `memoria_mb`.
+    
+    O processo atual conta com o que já ocupa, o cálculo de uma foto e o
+    que cresce com o modelo (rótulos, somas e um protótipo por identidade).
+    Com `processos` > 1 cada processo do pool é um interpretador completo
+    com OpenCV e NumPy (estimado pelo tamanho do processo atual) calculando
+    uma foto; o pool é reduzido até sobrar espaço para lotes de pelo menos
+    uma foto por processo.
+    """
+    n_bins = PARAMETROS_LBPH['grid_x'] * PARAMETROS_LBPH['grid_y'] * 2 ** PARAMETROS_LBPH['neighbors']
+    atual = memoria_atual_mb() * 1e6
+    principal = atual + BYTES_PROCESSAR_IMAGEM + total_amostras * 12 + identidades * n_bins * 4
+    por_processo = atual + BYTES_PROCESSAR_IMAGEM
+    while processos > 1 and memoria_mb * 1e6 - principal - processos * por_processo < processos * BYTES_POR_IMAGEM_LOTE:
+        processos -= 1
+    fixo = principal + (processos * por_processo if processos > 1 else 0)
+    disponivel = memoria_mb * 1e6 - fixo
+    if disponivel < BYTES_POR_IMAGEM_LOTE:
+        print(f"Aviso: orçamento de {memoria_mb} MB insuficiente "
+              f"(mínimo ~{(fixo + BYTES_POR_IMAGEM_LOTE) / 1e6:.0f} MB), processando uma imagem por vez.")
+        return processos, 1
+    return processos, int(disponivel // BYTES_POR_IMAGEM_LOTE)
+
+
+def treinar_streaming(path='users', modelo='classificador.yml', arquivo_nomes='nomes.json',
+                      arquivo_manifesto=ARQUIVO_MANIFESTO, processos=None, memoria_mb=512, cache=None,
+                      compactar=None):
+    """
+    Treinamento completo com memória limitada a `memoria_mb`.
+
+    As fotos são processadas em lotes de tamanho fixo; os histogramas de
+    cada lote vão para um buffer pré-alocado e dele direto para os arquivos
+    do modelo (.yml e .lbph). Nada cresce com o número de fotos além de
+    rótulos, somas e um protótipo por pessoa. Os usuários são processados
+    em ordem de ID, o que deixa a galeria ordenada por rótulo como o formato
+    binário exige.
+    """
+    print("\n=== Treinamento em Fluxo (memória limitada) ===\n")
+    
+    manifesto_anterior = carregar_manifesto(arquivo_manifesto)
+    encontrados = escanear_usuarios(path)
+    ids_usuarios = atribuir_ids(encontrados, ids_conhecidos(manifesto_anterior, arquivo_nomes))
+    imagens = [(usuario, caminho, h)
+               for usuario in sorted(encontrados, key=ids_usuarios.get)
+               for caminho, h in encontrados[usuario].items()]
+    nomes = {id_usuario: usuario for usuario, id_usuario in sorted(ids_usuarios.items(), key=lambda item: item[1])}
+    total_amostras = len(imagens) * FATOR_AUMENTO
+    
+    pedidos = min(processos or os.cpu_count() or 1, len(imagens) or 1)
+    processos, por_lote = imagens_por_lote(memoria_mb, total_amostras, len(encontrados), pedidos)
+    por_lote = max(1, min(por_lote, len(imagens)))
+    print(f"Total de imagens originais encontradas: {len(imagens)}")
+    print(f"Total de imagens após aumentação ({FATOR_AUMENTO}x): {total_amostras}")
+    reduzido = f' (reduzido de {pedidos} para caber no orçamento)' if processos < pedidos else ''
+    print(f"Orçamento de memória: {memoria_mb} MB | {por_lote} imagens ({por_lote * FATOR_AUMENTO} faces) por lote | "
+          f"{processos} processo(s){reduzido}")
+    
+    motor = criar_motor()
+    escritor_yml = EscritorModeloYml(modelo, motor.raio, motor.vizinhos, motor.grid_x, motor.grid_y, motor.limiar)
+    escritor_binario = EscritorModeloBinario(caminho_binario(modelo), total_amostras, motor.raio, motor.vizinhos,
+                                             motor.grid_x, motor.grid_y, motor.limiar, nomes)
+    
+    # Buffers reaproveitados por todos os lotes
+    histogramas = np.empty((por_lote * FATOR_AUMENTO, motor.n_bins), np.float32)
+    rotulos = np.empty(por_lote * FATOR_AUMENTO, np.int32)
+    # Protótipo (média) de cada identidade para o índice, acumulado em fluxo
+    prototipos, rotulos_prototipos = [], []
+    soma_atual, rotulo_atual, contagem_atual = None, None, 0
+    
+    entradas = []
+    tempos = {}
+    executor, processos = criar_executor(processos, len(imagens) or 1)
+    try:
+        with tqdm(total=len(imagens), desc="Processando imagens", unit="img") as progresso:
+            for inicio_lote in range(0, len(imagens), por_lote):
+                lote = imagens[inicio_lote:inicio_lote + por_lote]
+                n = 0
+                for usuario, caminho_imagem, hash_imagem, histogramas_imagem in iterar_caracteristicas(
+                        lote, cache, executor, processos, tempos):
+                    histogramas[n:n + len(histogramas_imagem)] = histogramas_imagem
+                    rotulos[n:n + len(histogramas_imagem)] = ids_usuarios[usuario]
+                    n += len(histogramas_imagem)
+                    entradas.append({'usuario': usuario, 'arquivo': caminho_imagem, 'hash': hash_imagem,
+                                     'amostras': len(histogramas_imagem)})
+                    progresso.update()
+                
+                inicio = time.perf_counter()
+                escritor_yml.escrever(histogramas[:n], rotulos[:n])
+                escritor_binario.escrever(histogramas[:n], rotulos[:n])
+                for rotulo in np.unique(rotulos[:n]):
+                    linhas = histogramas[:n][rotulos[:n] == rotulo]
+                    if rotulo != rotulo_atual:
+                        if rotulo_atual is not None:
+                            prototipos.append((soma_atual / contagem_atual).astype(np.float32))
+                            rotulos_prototipos.append(rotulo_atual)
+                        soma_atual, rotulo_atual, contagem_atual = np.zeros(motor.n_bins), rotulo, 0
+                    soma_atual += linhas.sum(axis=0, dtype=np.float64)
+                    contagem_atual += linhas.shape[0]
+                registrar_tempo(tempos, 'gravacao', time.perf_counter() - inicio)
+    except BaseException:
+        escritor_yml.descartar()
+        escritor_binario.descartar()
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    if rotulo_atual is not None:
+        prototipos.append((soma_atual / contagem_atual).astype(np.float32))
+        rotulos_prototipos.append(rotulo_atual)
+    
+    escritor_yml.fechar()
+    escritor_binario.fechar()
+    imprimir_tempos(tempos)
+    if cache is not None:
+        print(cache.resumo())
+    print(f"\n✓ Modelo salvo em {modelo}")
+    print(f"✓ Modelo binário salvo em {caminho_binario(modelo)}")
+    
+    # Índice de identidades a partir dos protótipos acumulados (sem reler a galeria)
+    indice = IndiceIdentidades(MotorLBPH.carregar_binario(caminho_binario(modelo)))
+    if prototipos:
+        indice.prototipos = np.stack(prototipos)
+        indice.rotulos_prototipos = np.asarray(rotulos_prototipos, np.int32)
+    indice.salvar(caminho_indice(modelo))
+    print(f"✓ Índice de identidades salvo em {caminho_indice(modelo)}")
+    salvar_nomes(nomes, total_amostras, arquivo_nomes)
+    
+    manifesto = novo_manifesto(parametros_treino())
+    manifesto['usuarios'] = ids_usuarios
+    manifesto['imagens'] = entradas
+    # O .yml e o binário têm as mesmas linhas, na mesma ordem (lotes ordenados por rótulo)
+    manifesto['assinatura'] = assinatura_galeria(indice.motor)
+    salvar_manifesto(manifesto, arquivo_manifesto)
+    print(f"✓ Manifesto salvo em {arquivo_manifesto}")
+    publicar(modelo, 'streaming', nomes, total_amostras, compactar)
+    
+    proprio, filhos = pico_memoria_mb()
+    pool = f' | {filhos:.0f} MB (maior processo do pool, total até {proprio + processos * filhos:.0f} MB)'
+    print(f"\nPico de memória: {proprio:.0f} MB (processo principal){pool if processos > 1 else ''}"
+          f" | orçamento: {memoria_mb} MB")
+    print(f"Treinamento concluído! Pessoas cadastradas: {len(nomes)}")
+    return motor, nomes
+
+
+MODOS_TREINO = ('completo', 'incremental', 'streaming')
+
+
+def treinar(path='users', modelo='classificador.yml', arquivo_nomes='nomes.json',
+            arquivo_manifesto=ARQUIVO_MANIFESTO, modo='completo', processos=None, memoria_mb=512,
+            pasta_cache=PASTA_CACHE, cache_mb=2048, usar_cache=True, compactar=None):
+    """
+    Treina o reconhecedor e publica o resultado; pode ser chamado de outro
+    processo ou serviço (o `main` é só a interface de linha de comando).
+    
+    `modo` escolhe o treinamento do zero ('completo'), só das imagens
+    novas/alteradas ('incremental') ou em lotes com memória limitada a
+    `memoria_mb` ('streaming'). Todos os arquivos são gravados de forma
+    atômica e o selo de versão (`publicacao`) só é gravado no fim, então um
+    detector em execução troca de modelo sem ver arquivos pela metade.
+    
+    Com `compactar` (número de protótipos por pessoa) a galeria é
+    compactada antes da publicação (ver compactacao.py) e o modelo
+    publicado já é o compacto. Como a galeria compacta não corresponde mais
+    ao manifesto, o próximo treinamento incremental com mudanças vira um
+    completo (com os histogramas do cache).
+    
+    Retorna (motor, nomes, selo); o selo é o da versão publicada (o anterior,
+    se o treinamento incremental não encontrou nada a fazer).
+    """
+    if modo not in MODOS_TREINO:
+        raise ValueError(f"Modo de treinamento inválido: {modo} (use {', '.join(MODOS_TREINO)})")
+    cache = CacheCaracteristicas(parametros_treino(), pasta_cache, cache_mb) if usar_cache else None
+    if modo == 'streaming':
+        motor, nomes = treinar_streaming(path, modelo, arquivo_nomes, arquivo_manifesto, processos, memoria_mb,
+                                         cache, compactar)
+    elif modo == 'incremental':
+        motor, nomes = treinar_incremental(path, modelo, arquivo_nomes, arquivo_manifesto, processos, cache,
+                                           compactar)
+    else:
+        motor, nomes = treinar_completo(path, modelo, arquivo_nomes, arquivo_manifesto, processos, cache, compactar)
+    METRICAS.incrementar('treinamentos', modo=modo)
+    if compactar:
+        # O motor do treinamento ainda tem a galeria completa
+        motor = MotorLBPH.carregar_binario(caminho_binario(modelo))
+    return motor, nomes, ler_versao(modelo)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Treinamento do reconhecedor LBPH")
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument('--incremental', action='store_true',
+                      help="Processa só imagens novas/alteradas desde o último treinamento (usa o manifesto)")
+    modo.add_argument('--streaming', action='store_true',
+                      help="Treinamento completo em lotes, com a memória limitada por --memoria-mb")
+    # Diretório onde estão as pastas dos usuários com as fotos
+    parser.add_argument('--usuarios', default='users', help="Pasta com uma subpasta de fotos por usuário ou base empacotada (base_faces.py)")
+    parser.add_argument('--modelo', default='classificador.yml')
+    parser.add_argument('--nomes', default='nomes.json')
+    parser.add_argument('--manifesto', default=ARQUIVO_MANIFESTO)
+    parser.add_argument('--processos', type=int, default=None,
+                        help="Processos usados no pré-processamento/aumento (padrão: todos os núcleos)")
+    parser.add_argument('--memoria-mb', type=int, default=512,
+                        help="Orçamento de memória do modo --streaming, em MB (padrão: 512)")
+    parser.add_argument('--cache', default=PASTA_CACHE, help="Pasta do cache de histogramas por foto")
+    parser.add_argument('--cache-mb', type=int, default=2048, help="Tamanho máximo do cache, em MB (padrão: 2048)")
+    parser.add_argument('--sem-cache', action='store_true', help="Recalcula todos os histogramas, sem usar o cache")
+    parser.add_argument('--compactar', type=int, default=None, metavar='N',
+                        help="Compacta a galeria em até N amostras por pessoa antes de publicar (ver compactacao.py)")
+    parser.add_argument('--porta-metricas', type=int, default=None,
+                        help="Expõe as métricas em http://127.0.0.1:PORTA/metrics durante o treinamento")
+    parser.add_argument('--metricas-json', default=None, help="Grava as métricas de cada etapa neste arquivo JSON")
+    args = parser.parse_args(argv)
+    
+    servidor = servir(args.porta_metricas) if args.porta_metricas else None
+    modo = 'streaming' if args.streaming else 'incremental' if args.incremental else 'completo'
+    try:
+        treinar(args.usuarios, args.modelo, args.nomes, args.manifesto, modo, args.processos, args.memoria_mb,
+                args.cache, args.cache_mb, not args.sem_cache, args.compactar)
+    finally:
+        if servidor is not None:
+            servidor.shutdown()
+        if args.metricas_json:
+            METRICAS.salvar_json(args.metricas_json)
+            print(f"✓ Métricas salvas em {args.metricas_json}")
+
+
+if __name__ == '__main__':
+    main()